@@ -1,7 +1,12 @@
 # core modulleri
 from . import config
+from .frame_ring import FrameRing, FrameRef
 from .camera import Camera, CameraThread
-from .detector import Detector
+from .detector import Detector, create_detector
+from .motion import SceneChangeGate
+from .tracker import Tracker
+from .inference_worker import InferenceWorker
+from .image_writer import ImageWriter, RetentionManager
 from . import gpio
 
-__all__ = ["config", "Camera", "CameraThread", "Detector", "gpio"]
+__all__ = ["config", "Camera", "CameraThread", "FrameRing", "FrameRef", "Detector", "create_detector", "SceneChangeGate", "Tracker", "InferenceWorker", "ImageWriter", "RetentionManager", "gpio"]
@@ -3,10 +3,16 @@ import cv2
 import numpy as np
 import time
 import threading
+from app.core import config
+from app.core.frame_ring import FrameRing
 
 class CameraThread:
-    """Thread-safe asenkron kamera yakalama sinifi (RULE 1 uyumlu)"""
-    def __init__(self, width=640, height=480, fps=30, use_pi=True):
+    """Thread-safe asenkron kamera yakalama sinifi (RULE 1 uyumlu)
+
+    Kareler onceden ayrilmis bir FrameRing'e yazilir; tuketiciler
+    `acquire_frame()` ile kopyasiz, salt-okunur referans alir.
+    """
+    def __init__(self, width=640, height=480, fps=30, use_pi=True, ring_slots=None):
         self.width = width
         self.height = height
         self.fps = fps
@@ -14,8 +20,7 @@ class CameraThread:
         self.cap = None  # OpenCV fallback
         self.error_msg = "Unknown Error"
         
-        self._lock = threading.Lock()
-        self._frame = None
+        self.ring = FrameRing(ring_slots or config.FRAME_RING_SLOTS, (self.height, self.width, 3))
         self._running = False
         self._stop_event = threading.Event()
         
@@ -81,22 +86,34 @@ class CameraThread:
     def _capture_loop(self):
         """Asenkron frame toplama döngüsü."""
         while self._running:
-            frame = self._read_raw()
+            claimed = self.ring.claim()
+            if claimed is None:
+                # Tum slotlar tuketicilerde, bu kareyi atla
+                self._stop_event.wait(0.005)
+                continue
+
+            index, slot = claimed
+            frame = self._read_raw(out=slot)
             if frame is not None:
-                with self._lock:
-                    self._frame = frame
+                self.ring.publish(index, frame, timestamp=time.time())
             else:
+                self.ring.abandon(index)
                 # Olası bir donma durumunu engellemek için küçük bir bekleme
                 self._stop_event.wait(0.01)
 
-    def _read_raw(self):
-        """Doğrudan cihazdan veya fallback'ten fiziksel frame okur."""
+    def _read_raw(self, out=None):
+        """Doğrudan cihazdan veya fallback'ten fiziksel frame okur.
+
+        `out` verilirse ve boyutu uyuyorsa kare dogrudan bu diziye yazilir.
+        """
         # 1. Pi kamera
         if self.picam is not None:
             try:
                 frame = self.picam.capture_array()
                 if frame is not None:
                      # Picamera2 default olarak RGB verir, bunu OpenCV'nin istedigi BGR'ye ceviriyoruz
+                     if out is not None and out.shape == frame.shape:
+                         return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=out)
                      bgr_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
                      return bgr_frame
                 return None
@@ -108,7 +125,7 @@ class CameraThread:
         # 2. OpenCV fallback
         if self.cap is not None:
             try:
-                ret, frame = self.cap.read()
+                ret, frame = self.cap.read(out) if out is not None else self.cap.read()
                 if ret and frame is not None:
                     return frame
                 return None
@@ -118,21 +135,29 @@ class CameraThread:
                 return None
         
         # 3. Hic kamera yoksa hata frame'i goster
-        error_frame = self.blank_frame.copy()
+        if out is not None and out.shape == self.blank_frame.shape:
+            error_frame = out
+            error_frame[:] = 0
+        else:
+            error_frame = self.blank_frame.copy()
         cv2.putText(error_frame, "KAMERA HATASI!", (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3)
         cv2.putText(error_frame, self.error_msg, (50, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
         cv2.putText(error_frame, "Lutfen Terminal ve Kablolari Kontrol Edin", (50, 350), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         self._stop_event.wait(0.5) # Bu ekran saniyede 2 kere guncellense yeter, CPU'yu yemeyelim
         return error_frame
 
+    def acquire_frame(self, after_seq=None):
+        """Son kareye kopyasiz referans (FrameRef) dondur, isi bitince release() edilmeli"""
+        return self.ring.acquire_latest(after_seq)
+
     def get_frame(self):
-        """Thread-safe son okunan kareyi döndür"""
-        with self._lock:
-            if self._frame is not None:
-                return self._frame.copy()
+        """Thread-safe son okunan karenin kopyasini döndür (geriye uyumluluk)"""
+        ref = self.ring.acquire_latest()
+        if ref is None:
             return None
+        with ref:
+            return ref.frame.copy()
 
-    
     def stop(self):
         """Arka plan işlemini durdurur"""
         self._running = False
@@ -9,23 +9,91 @@ ROOT_DIR = Path(__file__).parent.parent.parent
 MODEL_PATH = ROOT_DIR / "models" / "pufferfish_pi_int8.onnx"
 CONF_THRESH = 0.60
 DETECTOR_IMGSZ = 640 # Model ONNX olarak 640x640 boyutunda sabit (fixed) ihraç edildiği için değiştirilemez.
+# Tespit motoru: 'onnx' (dogrudan onnxruntime, torch/ultralytics gerektirmez) veya 'ultralytics'
+DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'onnx')
+DETECTOR_IOU = 0.7  # NMS IoU esigi (ultralytics varsayilani ile ayni)
+DETECTOR_MAX_DET = 300
+# Batch inference (kayitli dalis videosu / coklu kamera): 1 = kapali
+INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 1))
+INFERENCE_BATCH_TIMEOUT = 0.05  # Batch doldurmak icin ilk frame'den sonra max bekleme (saniye)
+MODEL_PATH_DYNAMIC = ROOT_DIR / "models" / "pufferfish_pi_int8_dynamic.onnx"  # Dinamik batch boyutlu export
+# Dashboard inference'i ayri process'te calistirir (frame'ler shared memory ile aktarilir)
+INFERENCE_WORKER = os.environ.get('INFERENCE_WORKER', '0') == '1'
+INFERENCE_WORKER_TIMEOUT = 5.0  # Tek istek icin max bekleme; asilirsa worker yeniden baslatilir
+INFERENCE_WORKER_START_TIMEOUT = 60.0  # Model yukleme suresi
 
 # GIS & Veritabanı
 GPS_PORT = "/dev/ttyAMA0"
 GPS_BAUDRATE = 9600
+# GPS kaynagi: seri port yolu veya serial:// tcp://host:port gpsd://host:port replay:///log.nmea?speed=10
+GPS_SOURCE = os.environ.get('GPS_SOURCE', GPS_PORT)
 DB_PATH = ROOT_DIR / "spatial_log.sqlite"
 MAX_MAP_POINTS = 5000
+# Arka plan SpatiaLite yazicisi (tek WAL baglantisi, toplu commit)
+DB_WRITER_BATCH_SIZE = 50  # Tek transaction'daki max satir
+DB_WRITER_FLUSH_INTERVAL = 0.5  # Ilk satirdan sonra commit'e kadar max bekleme (saniye)
+DB_WRITER_QUEUE_SIZE = 1000  # Kuyruk doluysa yeni tespitler DB'ye yazilmadan atlanir
+# Okuma baglanti havuzu (harita / export sorgulari, SpatiaLite yuklu)
+DB_POOL_SIZE = 4
+DB_POOL_TIMEOUT = 5.0  # Tum baglantilar doluyken max bekleme (saniye)
+BBOX_PAGE_SIZE = 500  # /api/detections/bbox sayfa basina max satir
+MAP_TILE_MAX_ZOOM = 14  # detection_tiles'ta tutulan en yuksek zoom (ustu icin bbox sorgusu)
 GPS_STALE_TIMEOUT = 10.0  # GPS verisinin geçerlilik süresi (saniye)
+GPS_POLL_INTERVAL = 0.05  # Seri portta veri yokken bekleme (okuma bloklamaz)
+GPS_HISTORY_SIZE = 600  # Fix gecmisi halkasi (1 Hz'de 10 dk)
+GPS_INTERP_MAX_GAP = 3.0  # Bu sureden uzak iki fix arasinda ara deger yerine en yakin fix (saniye)
+GPS_EXTRAPOLATE_MAX = 1.0  # Son fix'ten sonra hizla ileri tahmin suresi (saniye)
 
 # Kamera
 CAM_WIDTH = 640
 CAM_HEIGHT = 480
 TARGET_FPS = 30
-SKIP_FRAMES = 5  # her N frame'de tespit yap
+SKIP_FRAMES = 5  # en fazla N frame'de bir tespit yap (CLI; kapi acikken de tavan)
+# Sahne degisimi kapisi: statik sahnede inference atlanir
+MOTION_GATE_ENABLED = True
+MOTION_THRESHOLD = 4.0  # Kucultulmus gri karede ortalama mutlak fark (0-255)
+MOTION_MAX_INTERVAL = 2.0  # Degisim olmasa bile en az bu kadar saniyede bir inference
+MOTION_GATE_SIZE = (64, 48)  # Karsilastirma cozunurlugu (genislik, yukseklik)
+# Nesne takibi: inference arasi kutular Kalman ile ilerletilir, her balik bir kez loglanir
+TRACK_ENABLED = True
+TRACK_IOU = 0.3  # Iz-tespit eslestirme icin min IoU
+TRACK_MAX_AGE = 1.0  # Bu kadar saniye eslesmeyen iz silinir
+TRACK_MIN_HITS = 2  # Izin gosterilmesi icin gereken eslesme sayisi
+TRACK_CONF_DECAY = 0.6  # Eslesmeyen izin guveni saniye basina bu oranla azalir
+TRACK_MIN_CONF = 0.4  # Guven bunun altina dusunce inference zorlanir
+TRACK_REINFER_INTERVAL = 0.5  # Iz varken en gec bu kadar saniyede bir inference
+FRAME_RING_SLOTS = 12  # Kamera halkasindaki onceden ayrilmis slot sayisi (kuyruk + tuketiciler + 1)
 
 # Kayit
 DETECTION_DIR = ROOT_DIR / "detections"
 THUMB_DIR = DETECTION_DIR / "thumbs"
+IMAGE_WRITER_WORKERS = 1  # Arka plan JPEG yazici sayisi (SD kartta 1 yeterli)
+IMAGE_WRITER_QUEUE_SIZE = 16  # Doluysa en eski bekleyen goruntu atilir
+IMAGE_JPEG_QUALITY = 90
+DETECTION_MAX_FILES = 1000  # detections/ icindeki kanit/snapshot kotasi (eskiler silinir)
+DETECTION_MAX_BYTES = 500 * 1024 * 1024
+THUMB_MAX_FILES = 5000  # detections/thumbs kotasi
+CSV_LOG_MAX_BYTES = 16 * 1024 * 1024  # Bu boyuta ulasan CSV log yeni segmente doner (0: boyuttan donmez)
+CSV_LOG_ROTATE_DAILY = True  # Gun degisince de yeni segment
+CSV_LOG_FLUSH_ROWS = 50  # Tamponda bu kadar satir birikince diske yazilir
+CSV_LOG_FLUSH_INTERVAL = 1.0  # Ilk tamponlanan satirdan en gec bu kadar saniye sonra yazilir
+CSV_LOG_FSYNC_INTERVAL = 30.0  # En fazla bu siklikta fsync (None: hic, 0: her yazimda)
+EXPORT_CACHE_DIR = DETECTION_DIR / "exports"  # Artimli guncellenen export dosyalari (ETag ile sunulur)
+ARCHIVE_DIR = DETECTION_DIR / "archive"  # Gun bazli sutunlu arsiv (analiz icin)
+ARCHIVE_COMPACT_INTERVAL = 3600  # Dashboard yeni kayitlari bu kadar saniyede bir arsivler
+ARCHIVE_MAX_PARTS = 24  # Bir gunde bundan fazla parca olursa tek parcada birlestirilir
+# Webhook bildirimleri: sabit worker havuzu, keep-alive baglantilar, kalici yeniden deneme kuyrugu
+WEBHOOK_WORKERS = 2
+WEBHOOK_QUEUE_SIZE = 100  # Bellek ici is kuyrugu; doluysa bildirim diske (retry kuyruguna) yazilir
+WEBHOOK_TIMEOUT = 10.0  # Tek istek icin baglanti / okuma zaman asimi (saniye)
+WEBHOOK_RETRY_DB = ROOT_DIR / "webhook_retry.sqlite"  # Baglanti yokken bekleyen bildirimler
+WEBHOOK_RETRY_BASE_DELAY = 30.0  # Ilk yeniden deneme; her hatada iki katina cikar (saniye)
+WEBHOOK_RETRY_MAX_DELAY = 3600.0  # Geri cekilme ust siniri (saniye)
+WEBHOOK_RETRY_MAX_AGE = 86400.0  # Bundan eski uyarilar gonderilmeden silinir (saniye)
+WEBHOOK_RETRY_MAX_ROWS = 10000  # Kuyruk siniri; asilirsa en eskiler atilir
+WEBHOOK_RETRY_POLL = 5.0  # Bos worker'in yeniden deneme kuyruguna bakma araligi (saniye)
+WEBHOOK_BREAKER_THRESHOLD = 5  # Art arda bu kadar hatada hedefin devresi acilir
+WEBHOOK_BREAKER_RESET = 60.0  # Acik devre bu sure sonra tek istekle denenir (saniye)
 
 # Dashboard
 DASHBOARD_PORT = 5000
@@ -39,12 +107,26 @@ if ALLOWED_ORIGINS:
 
 STREAM_FPS = 15
 JPEG_QUALITY = 70
-WS_STREAM_QUALITY = 50  # WebSocket base64 stream JPEG kalitesi
+WS_STREAM_QUALITY = 50  # WebSocket stream JPEG kalitesi
+WS_BINARY_FRAMES = True  # WebSocket stream'i binary JPEG olarak gonder (False: eski base64 JSON)
+# Uyarlanabilir stream: istemci basina (JPEG kalitesi, boyut, FPS) seviyeleri, dusukten yuksege
+# (raw/clahe MJPEG akislarinda stream_settings varsayilanina kirpilir)
+STREAM_LEVELS = [
+    (35, (320, 240), 3),
+    (45, (320, 240), 8),
+    (55, (480, 360), 12),
+    (JPEG_QUALITY, None, STREAM_FPS),
+]
+STREAM_TARGET_LATENCY = 0.3  # Istemci basina hedef gecikme (saniye)
+STREAM_MAX_BACKLOG = 2  # Ack beklenen max WS karesi; dolunca kare atlanir
+STREAM_ACK_TIMEOUT = 3.0  # Bu surede ack gelmeyen kare kayip sayilir
 DASHBOARD_SAVE_INTERVAL = 1.0  # Max 1 detection log/save per second
 
 # CLAHE
 CLAHE_CLIP = 3.0
 CLAHE_GRID = (8, 8)
+# ONNX backend on isleme: CLAHE'nin uygulanacagi luminans uzayi ('ycrcb' hizli, 'lab' apply_clahe ile birebir)
+PREPROCESS_CLAHE_SPACE = 'ycrcb'
 
 # Asenkron Motor
 EVENTLET_ENABLED = True
@@ -1,37 +1,27 @@
 # YOLO tespit modulu
-from ultralytics import YOLO
 import cv2
 from app.core import config
 from app.utils.image import apply_clahe
+from app.core.onnx_detector import OnnxDetector, tune_session_options
 import onnxruntime as ort
 
 # --- ONNX Runtime Optimizasyonlari (Pi 5 icin XNNPACK & Thread Tuning) ---
+# ultralytics kendi oturumunu actigi icin ayarlar InferenceSession uzerinden enjekte edilir
 _original_session = ort.InferenceSession
 
 class PatchedInferenceSession(_original_session):
     def __init__(self, path_or_bytes, sess_options=None, providers=None, provider_options=None, **kwargs):
-        if sess_options is None:
-            sess_options = ort.SessionOptions()
-        
-        # Pi 5 cekirdek sayisi (4)
-        sess_options.intra_op_num_threads = 4
-        # Spinning mekanizmasini devre disi birakarak gereksiz CPU %100 kullanimini ve isinmayi engelle (Throttle onleyici)
-        sess_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
-        
-        # XNNPACKExecutionProvider'i aktif et
-        if providers is None:
-            providers = ['XNNPACKExecutionProvider', 'CPUExecutionProvider']
-        elif 'XNNPACKExecutionProvider' not in providers:
-            # En yuksek oncelikli olarak eklendi
-            providers.insert(0, 'XNNPACKExecutionProvider')
-            
+        sess_options, providers = tune_session_options(sess_options, providers)
         super().__init__(path_or_bytes, sess_options=sess_options, providers=providers, provider_options=provider_options, **kwargs)
 
 ort.InferenceSession = PatchedInferenceSession
 # --------------------------------------------------------------------------
 
 class Detector:
+    """ultralytics.YOLO tabanli tespit motoru (torch + ultralytics gerektirir)"""
     def __init__(self, model_path):
+        # Agir import: sadece bu backend secildiginde yuklenir
+        from ultralytics import YOLO
         # Profilleme sonrasi ONNX uyarisini kaldirmak icin provider kurgusu yapildi
         self.model = YOLO(str(model_path), task='detect')
         print(f"Model yuklendi: {model_path} (Cozunurluk: {config.DETECTOR_IMGSZ}x{config.DETECTOR_IMGSZ})")
@@ -73,3 +63,17 @@ class Detector:
             confs.append(c)
         
         return boxes, confs
+
+    def detect_batch(self, frames, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        """Frame listesi icin [(boxes, confs), ...] dondur (sabit batch modelde tek tek)"""
+        return [self.detect(f, conf, use_clahe, clahe_clip) for f in frames]
+
+
+def create_detector(model_path, backend=None):
+    """Ayarlardaki backend'e gore tespit motoru olustur ('onnx' veya 'ultralytics')"""
+    backend = (backend or config.DETECTOR_BACKEND).lower()
+    if backend == 'onnx':
+        return OnnxDetector(model_path)
+    if backend == 'ultralytics':
+        return Detector(model_path)
+    raise ValueError(f"Bilinmeyen detector backend: {backend}")
@@ -0,0 +1,155 @@
+# Sifir kopyali frame halkasi (ring buffer)
+# Kamera onceden ayrilmis slotlara yazar, okuyucular referans sayimli salt-okunur view alir.
+import threading
+import time
+import numpy as np
+
+
+class FrameRef:
+    """Halkadaki tek bir slota referans sayimli, salt-okunur erisim.
+
+    `release()` cagrilana kadar slot kamera tarafindan uzerine yazilmaz.
+    Context manager olarak da kullanilabilir:
+
+        with ring.acquire_latest() as ref:
+            process(ref.frame)
+    """
+    __slots__ = ('_ring', '_index', 'frame', 'seq', 'timestamp', '_released')
+
+    def __init__(self, ring, index, frame, seq, timestamp):
+        self._ring = ring
+        self._index = index
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+        self._released = False
+
+    @classmethod
+    def detached(cls, frame, seq=0, timestamp=None):
+        """Halkaya bagli olmayan (release gerektirmeyen) referans"""
+        return cls(None, -1, frame, seq, timestamp if timestamp is not None else time.time())
+
+    def retain(self):
+        """Ayni slota yeni bir referans dondur (ornegin kuyruga koymak icin)"""
+        if self._ring is None:
+            return FrameRef.detached(self.frame, self.seq, self.timestamp)
+        return self._ring._retain(self._index, self.frame, self.seq, self.timestamp)
+
+    def release(self):
+        """Referansi birak (birden fazla cagri guvenlidir)"""
+        if self._released:
+            return
+        self._released = True
+        if self._ring is not None:
+            self._ring._release(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class FrameRing:
+    """Onceden ayrilmis, sira numarali frame slotlari.
+
+    Tek yazici (kamera thread'i) `claim()` ile bos bir slot alir, icine yazar ve
+    `publish()` eder. Okuyucular `acquire_latest()` ile en son yayinlanan slota
+    referans alir. Referansi olan ya da en guncel olan slot asla yeniden yazilmaz;
+    tum slotlar doluysa yeni kare dusurulur (`dropped`).
+    """
+
+    def __init__(self, slots, shape, dtype=np.uint8):
+        if slots < 2:
+            raise ValueError("FrameRing en az 2 slot gerektirir")
+        self._lock = threading.Lock()
+        self._arrays = [np.empty(shape, dtype=dtype) for _ in range(slots)]
+        self._refcounts = [0] * slots
+        self._seqs = [0] * slots
+        self._stamps = [0.0] * slots
+        self._writing = -1
+        self._latest = -1
+        self.sequence = 0
+        self.dropped = 0
+
+    @property
+    def slots(self):
+        return len(self._arrays)
+
+    def claim(self):
+        """Yazmak icin bos bir slot ayir. (index, array) veya None dondurur"""
+        with self._lock:
+            for i in range(len(self._arrays)):
+                if i != self._latest and self._refcounts[i] == 0 and i != self._writing:
+                    self._writing = i
+                    return i, self._arrays[i]
+            self.dropped += 1
+            return None
+
+    def abandon(self, index):
+        """Ayrilan slotu yayinlamadan geri birak (okuma basarisiz oldugunda)"""
+        with self._lock:
+            if self._writing == index:
+                self._writing = -1
+
+    def publish(self, index, frame=None, timestamp=None):
+        """Slotu en guncel kare olarak yayinla.
+
+        `frame` slotun kendi dizisi degilse (ornegin surucu yeni bir dizi dondurdu)
+        kopyalanmadan slota devralinir; boyut farkliysa slot bu diziyle degisir.
+        """
+        with self._lock:
+            if frame is not None and frame is not self._arrays[index]:
+                self._arrays[index] = frame
+            self.sequence += 1
+            self._seqs[index] = self.sequence
+            self._stamps[index] = timestamp if timestamp is not None else time.time()
+            self._latest = index
+            if self._writing == index:
+                self._writing = -1
+            return self.sequence
+
+    def write(self, frame, timestamp=None):
+        """Hazir bir kareyi halkaya kopyala (tek kopya). Sira numarasi veya None dondurur"""
+        claimed = self.claim()
+        if claimed is None:
+            return None
+        index, slot = claimed
+        if slot.shape == frame.shape and slot.dtype == frame.dtype:
+            np.copyto(slot, frame)
+            return self.publish(index, timestamp=timestamp)
+        return self.publish(index, frame.copy(), timestamp=timestamp)
+
+    def acquire_latest(self, after_seq=None):
+        """En son kareye referans al. `after_seq` verilirse daha yeni kare yoksa None"""
+        with self._lock:
+            index = self._latest
+            if index < 0:
+                return None
+            seq = self._seqs[index]
+            if after_seq is not None and seq <= after_seq:
+                return None
+            self._refcounts[index] += 1
+            view = self._arrays[index].view()
+            view.flags.writeable = False
+            return FrameRef(self, index, view, seq, self._stamps[index])
+
+    def _retain(self, index, frame, seq, timestamp):
+        with self._lock:
+            self._refcounts[index] += 1
+        return FrameRef(self, index, frame, seq, timestamp)
+
+    def _release(self, index):
+        with self._lock:
+            if self._refcounts[index] > 0:
+                self._refcounts[index] -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slots': len(self._arrays),
+                'sequence': self.sequence,
+                'dropped': self.dropped,
+                'in_use': sum(1 for c in self._refcounts if c > 0),
+            }
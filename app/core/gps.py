@@ -1,87 +1,296 @@
+import collections
 import threading
 import time
-import serial
-import pynmea2
+import numpy as np
 from app.core import config
 
+
+# -- NMEA --
+class NMEAFix:
+    """GGA/RMC cumlesinden cikan konum (pynmea2 mesajiyla ayni alan adlari)"""
+    __slots__ = ('latitude', 'longitude', 'altitude', 'num_sats', 'horizontal_dil', 'utc')
+
+    def __init__(self, latitude, longitude, altitude=None, num_sats=None, horizontal_dil=None, utc=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.num_sats = num_sats
+        self.horizontal_dil = horizontal_dil
+        self.utc = utc
+
+
+def _coord(value, hemisphere):
+    """NMEA (d)ddmm.mmmm + N/S/E/W -> ondalik derece"""
+    dot = value.index(b'.') if b'.' in value else len(value)
+    degrees = float(value[:dot - 2])
+    minutes = float(value[dot - 2:])
+    coord = degrees + minutes / 60.0
+    return -coord if hemisphere in (b'S', b'W') else coord
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_sentence(line):
+    """Tek bir NMEA cumlesi (bytes) -> NMEAFix; konum icermiyorsa / bozuksa None"""
+    line = line.strip()
+    if not line.startswith(b'$'):
+        return None
+    body, star, checksum = line[1:].partition(b'*')
+    if star:
+        calc = 0
+        for byte in body:
+            calc ^= byte
+        try:
+            if calc != int(checksum[:2], 16):
+                raise ValueError("checksum")
+        except ValueError:
+            raise ValueError(f"NMEA checksum hatasi: {line[:20]!r}")
+    fields = body.split(b',')
+    kind = fields[0][2:]
+    try:
+        if kind == b'GGA' and len(fields) >= 10:
+            if fields[6] in (b'', b'0') or not fields[2] or not fields[4]:
+                return None  # Fix yok
+            return NMEAFix(_coord(fields[2], fields[3]), _coord(fields[4], fields[5]),
+                           altitude=_number(fields[9]), num_sats=_number(fields[7], int),
+                           horizontal_dil=_number(fields[8]), utc=fields[1].decode('ascii'))
+        if kind == b'RMC' and len(fields) >= 7:
+            if fields[2] != b'A' or not fields[3] or not fields[5]:
+                return None  # V: gecersiz
+            return NMEAFix(_coord(fields[3], fields[4]), _coord(fields[5], fields[6]),
+                           utc=fields[1].decode('ascii'))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"NMEA alan hatasi: {line[:20]!r}")
+    return None
+
+
+class NMEAStream:
+    """Bayt akisindan tam NMEA cumlelerini ayiran artimli parser.
+
+    `feed()` seri porttan o an gelen baytlari alir; yarim kalan cumle bir sonraki
+    cagriya tamponda kalir. Satir sonu gelmeden `max_line` asilirsa tampon atilir.
+    """
+    def __init__(self, max_line=164):
+        self.max_line = max_line
+        self._buf = b''
+        self.sentences = 0
+        self.errors = 0
+
+    def feed(self, data):
+        self._buf += data
+        *lines, self._buf = self._buf.split(b'\n')
+        if len(self._buf) > self.max_line:
+            self._buf = b''
+            self.errors += 1
+        fixes = []
+        for line in lines:
+            if not line.strip():
+                continue
+            self.sentences += 1
+            try:
+                fix = parse_sentence(line)
+            except ValueError:
+                self.errors += 1
+                continue
+            if fix is not None and (fix.latitude != 0.0 or fix.longitude != 0.0):
+                fixes.append(fix)
+        return fixes
+
+
+# -- Fix gecmisi --
+class FixRing:
+    """Son `capacity` fix'in (zaman, enlem, boylam) halkasi; zaman sirali numpy dizisi.
+
+    Tek yazici (GPS thread'i) varsayilir. Okuyucular kilit almaz: yazim sirasinda tek
+    sayiya gecen `_seq` sayaci degistiyse kopya tekrar alinir (seqlock).
+    """
+    def __init__(self, capacity):
+        self._data = np.full((capacity, 3), np.nan)
+        self._next = 0
+        self._count = 0
+        self._seq = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, ts, lat, lon):
+        if self._count and ts < self._data[(self._next - 1) % len(self._data), 0]:
+            return False  # Saat geri gitti; sira bozulmasin
+        self._seq += 1
+        self._data[self._next] = (ts, lat, lon)
+        self._next = (self._next + 1) % len(self._data)
+        self._count = min(self._count + 1, len(self._data))
+        self._seq += 1
+        return True
+
+    def window(self):
+        """Kayitli fix'ler, eskiden yeniye (kopya)"""
+        while True:
+            seq = self._seq
+            if seq % 2:
+                time.sleep(0)  # Yazim suruyor
+                continue
+            if self._count < len(self._data):
+                data = self._data[:self._count].copy()
+            else:
+                data = np.roll(self._data, -self._next, axis=0)
+            if self._seq == seq:
+                return data
+
+    def position_at(self, ts, max_gap, max_extrapolate):
+        """`ts` anindaki konum: (lat, lon, dayanak fix zamani); fix yoksa None.
+
+        Iki fix arasi `max_gap`'ten kisaysa dogrusal ara deger, son fix'ten sonra
+        en fazla `max_extrapolate` sn son hizla ileri tahmin; aksi halde en yakin fix.
+        """
+        data = self.window()
+        if not len(data):
+            return None
+        t = data[:, 0]
+        i = int(np.searchsorted(t, ts))
+        if i == 0:
+            return data[0, 1], data[0, 2], t[0]
+        if i == len(t):
+            dt = ts - t[-1]
+            if len(t) >= 2 and dt <= max_extrapolate and 0 < t[-1] - t[-2] <= max_gap:
+                v = (data[-1, 1:] - data[-2, 1:]) / (t[-1] - t[-2])
+                lat, lon = data[-1, 1:] + v * dt
+                return lat, lon, ts
+            return data[-1, 1], data[-1, 2], t[-1]
+        t0, t1 = t[i - 1], t[i]
+        if t1 - t0 > max_gap:
+            j = i - 1 if ts - t0 <= t1 - ts else i
+            return data[j, 1], data[j, 2], t[j]
+        w = (ts - t0) / (t1 - t0)
+        lat, lon = data[i - 1, 1:] + w * (data[i, 1:] - data[i - 1, 1:])
+        return lat, lon, ts
+
+
+class GPSSnapshot(collections.namedtuple(
+        'GPSSnapshot', 'latitude longitude altitude satellites hdop timestamp valid_until')):
+    """GPS thread'inin yayinladigi degismez durum.
+
+    Gecerlilik sonu (`valid_until` = fix zamani + GPS_STALE_TIMEOUT) yayinlanirken
+    hesaplanir; okuma tarafinda sadece bir karsilastirma kalir.
+    """
+    __slots__ = ()
+
+    def is_valid(self, now=None):
+        return self.valid_until is not None and (time.time() if now is None else now) <= self.valid_until
+
+
+_NO_FIX = GPSSnapshot(None, None, None, None, None, None, None)
+
+
 class GPSState:
-    """Thread-safe GPS state container"""
-    def __init__(self):
+    """Thread-safe GPS state container.
+
+    Yazici her fix'te yeni bir GPSSnapshot olusturup `snapshot` referansini degistirir
+    (CPython'da atomik); okuyucular kilit almadan tek referans okur ve tutarli bir
+    goruntu gorur. `lock` sadece yazicilari siralar.
+    """
+    def __init__(self, history=None):
         self.lock = threading.Lock()
-        self.latitude = None
-        self.longitude = None
-        self.altitude = None
-        self.satellites = None
-        self.hdop = None
-        self.timestamp = None
-        self.is_valid = False
+        self.snapshot = _NO_FIX
+        self.history = FixRing(history or getattr(config, 'GPS_HISTORY_SIZE', 600))
+        self._last_utc = None
 
     def update(self, lat, lon, ts, msg=None):
         with self.lock:
-            self.latitude = lat
-            self.longitude = lon
-            self.timestamp = ts
-            if msg:
-                self.altitude = getattr(msg, 'altitude', None)
-                self.satellites = getattr(msg, 'num_sats', None)
-                self.hdop = getattr(msg, 'horizontal_dil', None)
-            self.is_valid = True
-
-    def get(self):
-        with self.lock:
-            # Check staleness
-            valid = self.is_valid and self.timestamp is not None and (time.time() - self.timestamp <= getattr(config, 'GPS_STALE_TIMEOUT', 10.0))
-            return self.latitude, self.longitude, self.timestamp, valid
-            
-    def get_dict(self):
-        with self.lock:
-            valid = self.is_valid and self.timestamp is not None and (time.time() - self.timestamp <= getattr(config, 'GPS_STALE_TIMEOUT', 10.0))
-            return {
-                'latitude': self.latitude,
-                'longitude': self.longitude,
-                'altitude': self.altitude,
-                'satellites': self.satellites,
-                'hdop': self.hdop,
-                'timestamp': self.timestamp,
-                'is_valid': valid
-            }
+            prev = self.snapshot
+            # RMC'de olmayan alanlar son GGA degerini korur
+            altitude = getattr(msg, 'altitude', None)
+            satellites = getattr(msg, 'num_sats', None)
+            hdop = getattr(msg, 'horizontal_dil', None)
+            altitude = altitude if altitude is not None else prev.altitude
+            satellites = satellites if satellites is not None else prev.satellites
+            hdop = hdop if hdop is not None else prev.hdop
+            valid_until = ts + getattr(config, 'GPS_STALE_TIMEOUT', 10.0) if ts is not None else None
+            self.snapshot = GPSSnapshot(lat, lon, altitude, satellites, hdop, ts, valid_until)
+            # Ayni fix'in GGA + RMC cumleleri gecmise bir kez girer
+            utc = getattr(msg, 'utc', None)
+            if utc is None or utc != self._last_utc:
+                self.history.push(ts, lat, lon)
+            self._last_utc = utc
+
+    def get(self, now=None):
+        """(lat, lon, ts, valid); kilitsiz. `now` verilirse saat tekrar okunmaz"""
+        snap = self.snapshot
+        return snap.latitude, snap.longitude, snap.timestamp, snap.is_valid(now)
+
+    def position_at(self, ts=None):
+        """Frame yakalama anindaki konum (fix'ler arasi ara deger).
+
+        get() ile ayni sekilde (lat, lon, fix_ts, valid) dondurur. Ara deger / kisa ileri
+        tahminde fix_ts == ts; aksi halde kullanilan en yakin fix'in zamanidir ve
+        ts'ten GPS_STALE_TIMEOUT'tan uzaksa sonuc gecersizdir.
+        """
+        ts = time.time() if ts is None else ts
+        pos = self.history.position_at(ts, getattr(config, 'GPS_INTERP_MAX_GAP', 3.0),
+                                       getattr(config, 'GPS_EXTRAPOLATE_MAX', 1.0))
+        if pos is None:
+            return None, None, None, False
+        lat, lon, fix_ts = pos
+        valid = bool(abs(ts - fix_ts) <= getattr(config, 'GPS_STALE_TIMEOUT', 10.0))
+        return float(lat), float(lon), float(fix_ts), valid
+
+    def get_dict(self, now=None):
+        snap = self.snapshot
+        return {
+            'latitude': snap.latitude,
+            'longitude': snap.longitude,
+            'altitude': snap.altitude,
+            'satellites': snap.satellites,
+            'hdop': snap.hdop,
+            'timestamp': snap.timestamp,
+            'is_valid': snap.is_valid(now),
+            'history': len(self.history)
+        }
 
 # Global GPS State object
 gps_state = GPSState()
 
-def gps_reader_thread():
-    """Asynchronous daemon thread to read GPS data without blocking YOLO."""
+def gps_reader_thread(source=None, state=None):
+    """Asynchronous daemon thread to read GPS data without blocking YOLO.
+
+    The transport (serial, TCP NMEA, gpsd or log replay) comes from GPS_SOURCE and
+    is polled without blocking; every fix is stamped with its arrival time.
+    Returns when a non-looping replay reaches the end of its log.
+    """
+    from app.core.gps_transport import open_transport
+    state = state or gps_state
     while True:
+        transport = None
         try:
-            # Setup serial connection
-            # Timeout is important to avoid blocking forever
-            ser = serial.Serial(config.GPS_PORT, baudrate=config.GPS_BAUDRATE, timeout=1.0)
-            print(f"GPS connected on {config.GPS_PORT}")
-            
+            transport = open_transport(source)
+            print(f"GPS connected: {transport}")
+
             while True:
-                line = ser.readline().decode('ascii', errors='replace').strip()
-                if line.startswith(('$GPGGA', '$GNGGA', '$GPRMC', '$GNRMC')):
-                    try:
-                        msg = pynmea2.parse(line)
-                        if hasattr(msg, 'latitude') and hasattr(msg, 'longitude') and msg.latitude != 0.0:
-                            # Parse out the valid latitude and longitude
-                            lat = msg.latitude
-                            lon = msg.longitude
-                            ts = time.time()
-                            gps_state.update(lat, lon, ts, msg)
-                    except pynmea2.ParseError:
-                        pass
-                
-        except serial.SerialException as e:
-            print(f"GPS Serial Error: {e}, retrying in 5 seconds...")
-            time.sleep(5)
-        except (pynmea2.ParseError, ValueError, UnicodeDecodeError) as e:
-            print(f"GPS Data Error: {e}")
+                fixes = transport.read()
+                if fixes is None:
+                    print(f"GPS source finished: {transport}")
+                    return
+                if not fixes:
+                    time.sleep(config.GPS_POLL_INTERVAL)
+                    continue
+                for ts, fix in fixes:
+                    state.update(fix.latitude, fix.longitude, ts, fix)
+
+        except ValueError as e:
+            print(f"GPS source error: {e}")
+            return
+        except OSError as e:
+            # serial.SerialException ve soket hatalari OSError'dur
+            print(f"GPS Error: {e}, retrying in 5 seconds...")
             time.sleep(5)
         finally:
             try:
-                if 'ser' in locals() and ser.is_open:
-                    ser.close()
+                if transport is not None:
+                    transport.close()
             except:
                 pass
-
@@ -0,0 +1,227 @@
+# GPS kaynaklari: seri port, TCP uzerinden NMEA, gpsd JSON soketi ve kayitli NMEA log'unun tekrari
+# Hepsi bloklamaz; gps_reader_thread GPS_SOURCE'a gore birini acar.
+import json
+import socket
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import serial
+from app.core import config
+from app.core.gps import NMEAFix, NMEAStream
+
+
+class Transport:
+    """Ortak arayuz: `read()` -> [(alis_zamani, fix)]; veri yoksa [], kaynak bittiyse None"""
+    def __init__(self):
+        self.stream = NMEAStream()
+
+    def _fixes(self, data, ts=None):
+        ts = time.time() if ts is None else ts
+        return [(ts, fix) for fix in self.stream.feed(data)]
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SerialTransport(Transport):
+    """UART / USB GPS (pyserial, timeout=0)"""
+    def __init__(self, port, baudrate=None):
+        super().__init__()
+        self.port = port
+        self.ser = serial.Serial(port, baudrate=baudrate or config.GPS_BAUDRATE, timeout=0)
+
+    def read(self):
+        data = self.ser.read(self.ser.in_waiting or 1)
+        return self._fixes(data) if data else []
+
+    def close(self):
+        if self.ser.is_open:
+            self.ser.close()
+
+    def __str__(self):
+        return f"serial {self.port}"
+
+
+class _SocketTransport(Transport):
+    """Bloklamayan TCP istemcisi; karsi taraf kapatirsa ConnectionError"""
+    def __init__(self, host, port, timeout=5.0):
+        super().__init__()
+        self.host, self.port = host, port
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setblocking(False)
+
+    def _recv(self):
+        try:
+            data = self.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return b''
+        if not data:
+            raise ConnectionError(f"{self.host}:{self.port} baglantiyi kapatti")
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+class TCPTransport(_SocketTransport):
+    """Ham NMEA yayinlayan TCP soketi (gps_simulator --tcp, ag koprusu)"""
+    def read(self):
+        data = self._recv()
+        return self._fixes(data) if data else []
+
+    def __str__(self):
+        return f"tcp {self.host}:{self.port}"
+
+
+class GpsdTransport(_SocketTransport):
+    """gpsd JSON protokolu: WATCH ile TPV (konum) ve SKY (uydu / HDOP) nesneleri"""
+    WATCH = b'?WATCH={"enable":true,"json":true};\n'
+
+    def __init__(self, host, port, timeout=5.0):
+        super().__init__(host, port, timeout)
+        self.sock.setblocking(True)
+        self.sock.sendall(self.WATCH)
+        self.sock.setblocking(False)
+        self._buf = b''
+        self._sats = None
+        self._hdop = None
+
+    def read(self):
+        data = self._recv()
+        if not data:
+            return []
+        ts = time.time()
+        *lines, self._buf = (self._buf + data).split(b'\n')
+        fixes = []
+        for line in lines:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                self.stream.errors += 1
+                continue
+            kind = msg.get('class')
+            if kind == 'SKY':
+                self._hdop = msg.get('hdop', self._hdop)
+                used = msg.get('uSat')
+                if used is None and 'satellites' in msg:
+                    used = sum(1 for s in msg['satellites'] if s.get('used'))
+                self._sats = used if used is not None else self._sats
+            elif kind == 'TPV' and msg.get('mode', 0) >= 2 and 'lat' in msg and 'lon' in msg:
+                fixes.append((ts, NMEAFix(msg['lat'], msg['lon'], altitude=msg.get('altMSL', msg.get('alt')),
+                                          num_sats=self._sats, horizontal_dil=self._hdop, utc=msg.get('time'))))
+        return fixes
+
+    def __str__(self):
+        return f"gpsd {self.host}:{self.port}"
+
+
+def _utc_seconds(line):
+    """NMEA cumlesindeki hhmmss(.ss) alani -> gun icindeki saniye; yoksa None"""
+    fields = line.split(b',', 2)
+    if len(fields) < 2 or fields[0][3:6] not in (b'GGA', b'RMC') or len(fields[1]) < 6:
+        return None
+    value = fields[1]
+    try:
+        return int(value[0:2]) * 3600 + int(value[2:4]) * 60 + float(value[4:])
+    except ValueError:
+        return None
+
+
+class ReplayTransport(Transport):
+    """Kayitli NMEA log'unu cumlelerdeki UTC zamanlarina gore `speed` kat hizla oynat.
+
+    speed=0 beklemeden, her read'de en fazla `batch` satir verir. Fix'ler oynatmanin
+    duvar saatiyle damgalanir (position_at ile frame zamanlari ayni eksende kalir).
+    `loop` verilirse dosya sonunda basa doner; aksi halde read() None dondurur.
+    """
+    def __init__(self, path, speed=1.0, loop=False, batch=1000, clock=time.time):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.batch = batch
+        self.clock = clock
+        self.replayed = 0
+        self._file = open(path, 'rb')
+        self._rewind()
+
+    def _rewind(self):
+        self._file.seek(0)
+        self._start = self.clock()
+        self._t0 = None
+        self._last = None
+        self._day = 0.0
+        self._pending = None
+
+    def _due(self, line):
+        """Satirin oynatilacagi duvar saati (zamansiz cumleler onceki cumleyle gider)"""
+        t = _utc_seconds(line)
+        if t is not None:
+            t += self._day
+            if self._last is not None and t < self._last - 43200:
+                self._day += 86400.0  # Gece yarisi
+                t += 86400.0
+            if self._t0 is None:
+                self._t0 = t
+            self._last = t
+        if self.speed <= 0 or self._t0 is None:
+            return self._start
+        return self._start + (self._last - self._t0) / self.speed
+
+    def read(self):
+        now = self.clock()
+        out = []
+        for _ in range(self.batch):
+            if self._pending is None:
+                line = self._file.readline()
+                if not line:
+                    if out:
+                        break
+                    if not self.loop:
+                        return None
+                    self._rewind()
+                    continue
+                self._pending = (self._due(line), line)
+            due, line = self._pending
+            if due > now:
+                break
+            self._pending = None
+            self.replayed += 1
+            # Fix, kayittaki zamanlamasina denk gelen duvar saatiyle damgalanir
+            out.extend(self._fixes(line if line.endswith(b'\n') else line + b'\n',
+                                   due if self.speed > 0 else now))
+        return out
+
+    def close(self):
+        self._file.close()
+
+    def __str__(self):
+        return f"replay {self.path} x{self.speed:g}"
+
+
+def open_transport(source=None):
+    """GPS_SOURCE tanimindan acik bir transport.
+
+        /dev/ttyAMA0 | serial:///dev/ttyUSB0?baud=115200
+        tcp://127.0.0.1:9090
+        gpsd://127.0.0.1:2947
+        replay:///path/to/log.nmea?speed=10&loop=1
+    """
+    source = source or config.GPS_SOURCE
+    if '://' not in source:
+        return SerialTransport(source)
+    url = urlsplit(source)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    if url.scheme == 'serial':
+        return SerialTransport(url.path, int(query['baud']) if 'baud' in query else None)
+    if url.scheme == 'tcp':
+        return TCPTransport(url.hostname or '127.0.0.1', url.port or 9090)
+    if url.scheme == 'gpsd':
+        return GpsdTransport(url.hostname or '127.0.0.1', url.port or 2947)
+    if url.scheme == 'replay':
+        return ReplayTransport(url.netloc + url.path, speed=float(query.get('speed', 1.0)),
+                               loop=query.get('loop', '0') not in ('0', 'false', ''))
+    raise ValueError(f"Bilinmeyen GPS kaynagi: {source}")
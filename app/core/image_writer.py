@@ -0,0 +1,199 @@
+# Arka planda JPEG yazimi: SD kart yazma takilmalari tespit dongusunde FPS dususu yapmaz
+# Kuyruk sinirli; doluyken en eski bekleyen goruntu atilir. Disk kotasi artimli tutulur.
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+from app.core import config
+
+
+class RetentionManager:
+    """Bir klasordeki .jpg dosyalari icin dosya sayisi / toplam boyut kotasi.
+
+    Klasor sadece ilk kullanimda bir kez taranir; sonra her yeni dosya `add` ile
+    sirali path -> boyut tablosunun sonuna eklenir ve kota asildikca en eskiler silinir
+    (her kayitta listdir + mtime siralamasi yok). Ayni adla yeniden yazilan dosya
+    ikinci kez sayilmaz: eski boyutu dusulur ve en yeni konuma tasinir.
+    """
+    def __init__(self, directory, max_files=None, max_bytes=None, suffix='.jpg'):
+        self.directory = str(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._files = None  # path -> size, eskiden yeniye
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.removed = 0
+
+    def _scan(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    if e.is_file() and e.name.endswith(self.suffix):
+                        st = e.stat()
+                        entries.append((st.st_mtime, os.path.abspath(e.path), st.st_size))
+        except OSError:
+            pass
+        entries.sort()
+        self._files = collections.OrderedDict((path, size) for _, path, size in entries)
+        self._bytes = sum(self._files.values())
+
+    def add(self, path, size=None):
+        """Yeni yazilan dosyayi kaydet ve kota asiliyorsa en eskileri sil"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if self._files is None:
+                self._scan()
+            if size is None:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    return 0
+            # Ustune yazilan dosya: eski kaydi dus, en yeni olarak tekrar ekle
+            self._bytes -= self._files.pop(path, 0)
+            self._files[path] = size
+            self._bytes += size
+            return self._evict()
+
+    def _evict(self):
+        removed = 0
+        while self._files and ((self.max_files and len(self._files) > self.max_files) or
+                               (self.max_bytes and self._bytes > self.max_bytes)):
+            path, size = self._files.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass  # Elle silinmis olabilir; tespiti durdurma
+        self.removed += removed
+        return removed
+
+    def stats(self):
+        return {'files': len(self._files or ()), 'bytes': self._bytes, 'removed': self.removed}
+
+
+class ImageWriter:
+    """Sinirli kuyruklu arka plan goruntu yazicisi.
+
+    `submit()` bloklamaz: goruntu (ve istege bagli `render` fonksiyonu, ornegin kutu
+    cizimi) kuyruga girer, kodlama ve yazma `run()` icinde olur. Her `run()` bir
+    worker'dir; havuz icin birden fazla baslatilir. `executor` blocking isi calistirir;
+    eventlet altinda `eventlet.tpool.execute` verilerek disk I/O native thread'e tasinir.
+    `on_written` geri cagrisi dosya diske indikten sonra worker'da cagrilir.
+    """
+    def __init__(self, maxsize=None, quality=None, executor=None):
+        self.quality = quality or config.IMAGE_JPEG_QUALITY
+        self.executor = executor or (lambda fn, *args: fn(*args))
+        self._queue = queue.Queue(maxsize or config.IMAGE_WRITER_QUEUE_SIZE)
+        self._retention = {}
+        self._running = False
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def retain(self, directory, max_files=None, max_bytes=None):
+        """Klasor icin kota tanimla; o klasore yazilan her dosya kotaya islenir"""
+        manager = RetentionManager(directory, max_files=max_files, max_bytes=max_bytes)
+        self._retention[os.path.abspath(str(directory))] = manager
+        return manager
+
+    def submit(self, path, image, render=None, on_written=None):
+        """Goruntuyu yazma kuyruguna ekle. Kuyruk doluysa en eski bekleyen atilir.
+
+        `image` kuyrukta beklerken degismemeli (halka slotu ise once kopyalanmali).
+        """
+        item = (str(path), image, render, on_written)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        try:
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write(self, path, image, render):
+        """Ciz, kodla, yaz ve kotaya isle (executor icinde calisir)"""
+        try:
+            if render is not None:
+                image = render(image)
+            ok, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                raise ValueError("JPEG kodlanamadi")
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(buf.tobytes())
+            os.replace(tmp, path)  # Yarim dosya hicbir zaman servis edilmez
+            self.written += 1
+            self.bytes += len(buf)
+            manager = self._retention.get(os.path.dirname(os.path.abspath(path)))
+            if manager is not None:
+                manager.add(path, len(buf))
+            return True
+        except Exception as e:
+            print(f"Goruntu yazilamadi ({path}): {e}")
+            self.failed += 1
+            return False
+
+    def run(self):
+        """Worker dongusu (arka plan gorevi / thread olarak baslat)"""
+        self._running = True
+        while self._running or not self._queue.empty():
+            try:
+                path, image, render, on_written = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                if self.executor(self._write, path, image, render) and on_written is not None:
+                    on_written(path)
+            except Exception as e:
+                print(f"Goruntu geri cagri hatasi: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self, workers=None):
+        """Daemon thread'lerle worker havuzunu baslat (dashboard disindaki giris noktalari icin)"""
+        for i in range(workers or config.IMAGE_WRITER_WORKERS):
+            threading.Thread(target=self.run, name=f"image-writer-{i}", daemon=True).start()
+        return self
+
+    def flush(self, timeout=5.0):
+        """Kuyruktaki her goruntu yazilana kadar bekle. Bosaldiysa True"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Kalanlari yaz ve worker'lari durdur"""
+        self._running = False
+        return self.flush(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'mb_written': round(self.bytes / 1e6, 1),
+            'retention': {os.path.basename(d): m.stats() for d, m in self._retention.items()},
+        }
@@ -0,0 +1,215 @@
+# Ayri process'te inference: ONNX cagrisi eventlet dongusunu ve GIL'i bloklamaz
+# Frame'ler shared memory slotlarina yazilir, kutular Pipe uzerinden geri doner.
+import multiprocessing as mp
+import signal
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+from app.core import config
+
+
+def _worker_main(conn, shm_name, slot_bytes, model_path, backend, factory):
+    """Worker process giris noktasi: modeli yukle, istekleri isle"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C'yi ana process yonetir
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        if factory is not None:
+            detector = factory(model_path)
+        else:
+            from app.core.detector import create_detector
+            detector = create_detector(model_path, backend=backend)
+        conn.send(('ready', None, None))
+
+        while True:
+            msg = conn.recv()
+            if msg[0] == 'stop':
+                break
+            _, req_id, frames, conf, use_clahe, clahe_clip = msg
+            views = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+                     for slot, shape in frames]
+            try:
+                if len(views) > 1:
+                    results = detector.detect_batch(views, conf=conf, use_clahe=use_clahe, clahe_clip=clahe_clip)
+                else:
+                    results = [detector.detect(views[0], conf=conf, use_clahe=use_clahe, clahe_clip=clahe_clip)]
+                conn.send(('ok', req_id, results))
+            except Exception as e:
+                conn.send(('error', req_id, str(e)))
+            finally:
+                del views
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception as e:
+        try:
+            conn.send(('error', None, f"Worker baslatilamadi: {e}"))
+        except Exception:
+            pass
+    finally:
+        shm.close()
+
+
+class InferenceWorker:
+    """Detector arayuzunu (`detect`, `detect_batch`) ayri bir process'e tasiyan istemci.
+
+    Beklerken `sleep` ile kontrolu birakir (dashboard'da `socketio.sleep`), boylece
+    web sunucusu ve stream'ler inference sirasinda cevap vermeye devam eder.
+    Worker cokerse veya zaman asimina ugrarsa denetleyici artan bekleme ile yeniden baslatir;
+    bu sirada cagrilar bos sonuc dondurur.
+    """
+    def __init__(self, model_path, frame_shape, slots=2, backend=None, sleep=time.sleep,
+                 timeout=None, start_timeout=None, factory=None, start_method='spawn'):
+        self.model_path = str(model_path)
+        self.backend = backend
+        self.frame_shape = tuple(frame_shape)
+        self.slots = max(1, slots)
+        self.sleep = sleep
+        self.timeout = config.INFERENCE_WORKER_TIMEOUT if timeout is None else timeout
+        self.start_timeout = config.INFERENCE_WORKER_START_TIMEOUT if start_timeout is None else start_timeout
+        self.factory = factory
+        self._ctx = mp.get_context(start_method)
+
+        self.slot_bytes = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slots)
+        self._process = None
+        self._conn = None
+        self._ready = False
+        self._req_id = 0
+        self._next_restart = 0.0
+        self._failures = 0  # art arda yeniden baslatma (backoff icin)
+
+        self.restarts = 0
+        self.errors = 0
+        self.last_latency = 0.0
+
+    # -- Yasam dongusu --
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._shm.name, self.slot_bytes, self.model_path, self.backend, self.factory),
+            name="inference-worker", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+        self._started_at = time.time()
+        print(f"Inference worker baslatildi (pid {self._process.pid})")
+        return self
+
+    def _kill(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.kill()
+            self._process.join(timeout=1.0)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _ensure_alive(self):
+        """Denetleyici: worker olduyse (backoff suresi dolunca) yeniden baslat"""
+        if self._process is None:
+            self.start()
+            return True
+        if self._process.is_alive():
+            return True
+        now = time.time()
+        if now < self._next_restart:
+            return False
+        self._kill()
+        self.restarts += 1
+        self._failures += 1
+        self._next_restart = now + min(2 ** self._failures, 30)
+        print(f"Inference worker yeniden baslatiliyor (#{self.restarts})")
+        self.start()
+        return True
+
+    def stop(self):
+        """Worker'i durdur ve paylasilan bellegi birak (tekrar cagrilabilir)"""
+        if self._shm is None:
+            return
+        if self._conn is not None:
+            try:
+                self._conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=2.0)
+        self._kill()
+        shm, self._shm = self._shm, None
+        shm.close()
+        shm.unlink()
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    # -- Detector arayuzu --
+    def detect(self, frame, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        return self.detect_batch([frame], conf, use_clahe, clahe_clip)[0]
+
+    def detect_batch(self, frames, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        empty = [([], []) for _ in frames]
+        if not frames or not self._ensure_alive():
+            return empty
+
+        # Frame'leri slotlara kopyala (process sinirinda tek kopya); slot sayisini asanlar bos doner
+        layout = []
+        for slot, frame in enumerate(frames[:self.slots]):
+            if frame.nbytes > self.slot_bytes:
+                raise ValueError(f"Frame slottan buyuk: {frame.shape} > {self.frame_shape}")
+            dst = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+            np.copyto(dst, frame)
+            layout.append((slot, frame.shape))
+            del dst
+
+        self._req_id += 1
+        start = time.time()
+        try:
+            self._conn.send(('detect', self._req_id, layout, conf, use_clahe, clahe_clip))
+            status, results = self._wait(self._req_id)
+        except (BrokenPipeError, EOFError, OSError):
+            status, results = 'dead', None
+
+        if status != 'ok':
+            self.errors += 1
+            if status == 'dead':
+                self._kill()  # asili veya cokmus worker; bir sonraki cagrida yeniden baslar
+            return empty
+
+        self.last_latency = time.time() - start
+        self._failures = 0
+        return results + empty[len(results):]
+
+    def _wait(self, req_id):
+        """Cevabi kontrolu birakarak bekle. ('ok', sonuclar), ('error', None) veya ('dead', None)"""
+        sent = time.time()
+        while True:
+            if self._conn.poll(0):
+                kind, rid, payload = self._conn.recv()
+                if kind == 'ready':
+                    self._ready = True
+                    continue
+                if kind == 'error':
+                    print(f"Inference worker hatasi: {payload}")
+                    if rid is None:
+                        return 'dead', None
+                if rid == req_id:
+                    return ('ok', payload) if kind == 'ok' else ('error', None)
+                continue  # zaman asimina ugramis eski istegin cevabi
+
+            # Model yuklenene kadar baslatma suresi de taninir
+            deadline = sent + self.timeout
+            if not self._ready:
+                deadline += max(self._started_at + self.start_timeout - sent, 0)
+            if not self.alive or time.time() > deadline:
+                return 'dead', None
+            self.sleep(0.002)
+
+    def stats(self):
+        return {
+            'alive': self.alive,
+            'pid': self._process.pid if self._process is not None else None,
+            'restarts': self.restarts,
+            'errors': self.errors,
+            'latency_ms': round(self.last_latency * 1000, 1),
+        }
@@ -0,0 +1,81 @@
+# Sahne degisimi kapisi - statik sahnelerde gereksiz inference'i atla
+import time
+import cv2
+import numpy as np
+from app.core import config
+
+
+class SceneChangeGate:
+    """Kucultulmus gri kare farki ile inference kapisi.
+
+    Son inference yapilan kareye gore ortalama mutlak fark (0-255) `threshold`
+    degerini gectiginde veya `max_interval` saniye doldugunda inference'a izin verir.
+    `min_frames` > 1 ise hareketli sahnede bile iki inference arasinda en az bu kadar
+    kare gecer (inference hizi tavani; erken kareler skorlanmadan atlanir).
+    Tum ara tamponlar bir kez ayrilir; kare basina maliyet birkac mikro saniyedir.
+    """
+    def __init__(self, threshold=None, max_interval=None, size=None, enabled=None, min_frames=1):
+        self.threshold = config.MOTION_THRESHOLD if threshold is None else threshold
+        self.max_interval = config.MOTION_MAX_INTERVAL if max_interval is None else max_interval
+        self.size = tuple(size or config.MOTION_GATE_SIZE)
+        self.enabled = config.MOTION_GATE_ENABLED if enabled is None else enabled
+        self.min_frames = max(1, min_frames)
+
+        w, h = self.size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._ref = None
+        self._last_infer = 0.0
+        self._frames = self.min_frames  # Son inference'tan beri gelen kare (ilk kare gecer)
+
+        self.last_score = 0.0
+        self.inferred = 0
+        self.skipped = 0
+
+    def score(self, frame):
+        """Referans kareye gore degisim skoru (referans yoksa inf)"""
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._ref is None:
+            return float('inf')
+        cv2.absdiff(self._gray, self._ref, dst=self._diff)
+        return float(cv2.mean(self._diff)[0])
+
+    def should_infer(self, frame, now=None, force=False):
+        """Bu kare icin inference yapilmali mi? True donerse kare yeni referans olur"""
+        if not self.enabled:
+            self.inferred += 1
+            return True
+
+        now = time.time() if now is None else now
+        self._frames += 1
+        if not force and self._frames < self.min_frames:
+            self.skipped += 1
+            return False
+        self.last_score = self.score(frame)
+
+        if force or self.last_score >= self.threshold or now - self._last_infer >= self.max_interval:
+            if self._ref is None:
+                self._ref = np.empty_like(self._gray)
+            np.copyto(self._ref, self._gray)
+            self._last_infer = now
+            self._frames = 0
+            self.inferred += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        total = self.inferred + self.skipped
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'max_interval': self.max_interval,
+            'min_frames': self.min_frames,
+            'last_score': round(self.last_score, 2) if self.last_score != float('inf') else None,
+            'inferred': self.inferred,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,195 @@
+# Dogrudan ONNX Runtime tespit motoru (ultralytics / torch gerektirmez)
+import numpy as np
+import onnxruntime as ort
+from app.core import config
+from app.utils.image import Preprocessor
+
+
+def tune_session_options(sess_options=None, providers=None):
+    """Pi 5 icin ONNX Runtime ayarlari (XNNPACK & thread tuning).
+
+    (sess_options, providers) dondurur. Kurulu olmayan provider'lar listeden cikarilir.
+    """
+    if sess_options is None:
+        sess_options = ort.SessionOptions()
+
+    # Pi 5 cekirdek sayisi (4)
+    sess_options.intra_op_num_threads = 4
+    # Spinning mekanizmasini devre disi birakarak gereksiz CPU %100 kullanimini ve isinmayi engelle (Throttle onleyici)
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+    # XNNPACKExecutionProvider'i en yuksek oncelikle aktif et
+    if providers is None:
+        providers = ['XNNPACKExecutionProvider', 'CPUExecutionProvider']
+    elif 'XNNPACKExecutionProvider' not in providers:
+        providers = ['XNNPACKExecutionProvider'] + list(providers)
+
+    available = set(ort.get_available_providers())
+    providers = [p for p in providers if (p[0] if isinstance(p, tuple) else p) in available] or ['CPUExecutionProvider']
+    return sess_options, providers
+
+
+def create_session(model_path):
+    """Ayarlanmis bir InferenceSession olustur"""
+    sess_options, providers = tune_session_options()
+    return ort.InferenceSession(str(model_path), sess_options=sess_options, providers=providers)
+
+
+def nms(boxes, scores, iou_thresh):
+    """Vektorize greedy NMS. boxes: (N, 4) xyxy, skor sirasina gore tutulan indeksleri dondurur"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thresh]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def is_end2end(session):
+    """Model ciktisi NMS'li (end-to-end) mi? Karar satir sayisindan degil model bilgisinden verilir.
+
+    Once ultralytics'in ONNX metadata'si ('end2end', args icinde 'nms'), yoksa cikti
+    seklinin statik son boyutu (M, 6) kullanilir. Sahte / eksik oturumlarda False.
+    """
+    try:
+        meta = session.get_modelmeta().custom_metadata_map
+    except AttributeError:
+        meta = {}
+    if 'end2end' in meta:
+        return meta['end2end'].strip().lower() == 'true'
+    if "'nms': True" in meta.get('args', ''):
+        return True
+    try:
+        shape = session.get_outputs()[0].shape
+    except AttributeError:
+        return False
+    return len(shape) == 3 and shape[2] == 6 and shape[1] != 6
+
+
+def decode_predictions(pred, conf_thresh, iou_thresh=0.7, max_det=300, end2end=False):
+    """YOLO ham ciktisini (4+nc, N) kutulara cevir.
+
+    end2end=True: NMS'li ciktilar (M, 6) [x1, y1, x2, y2, skor, sinif] (bkz. is_end2end).
+    (boxes (K, 4) xyxy, scores (K,)) dondurur, model piksel koordinatlarinda, skor azalan sirada.
+    """
+    pred = np.asarray(pred)
+
+    # End-to-end export: NMS model icinde yapilmis
+    if end2end:
+        pred = pred[pred[:, 4] >= conf_thresh]
+        pred = pred[np.argsort(-pred[:, 4], kind='stable')][:max_det]
+        return pred[:, :4].astype(np.float32), pred[:, 4].astype(np.float32)
+
+    # Ham cikti: (4+nc, N); bazi exportlarda (N, 4+nc)
+    if pred.shape[0] > pred.shape[1]:
+        pred = pred.T
+
+    class_scores = pred[4:]
+    if class_scores.shape[0] == 1:
+        scores = class_scores[0]
+        classes = None
+    else:
+        classes = class_scores.argmax(0)
+        scores = class_scores[classes, np.arange(class_scores.shape[1])]
+
+    mask = scores >= conf_thresh
+    if not mask.any():
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32)
+
+    cx, cy, w, h = pred[:4, mask]
+    scores = scores[mask].astype(np.float32)
+    boxes = np.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), axis=1).astype(np.float32)
+
+    # Sinif bazli NMS: kutulari sinif indeksine gore kaydirarak tek seferde yap
+    if classes is not None:
+        offsets = classes[mask].astype(np.float32)[:, None] * 4096.0
+        keep = nms(boxes + offsets, scores, iou_thresh)
+    else:
+        keep = nms(boxes, scores, iou_thresh)
+
+    keep = keep[:max_det]
+    return boxes[keep], scores[keep]
+
+
+class OnnxDetector:
+    """ultralytics.YOLO yerine ONNX oturumunu dogrudan kullanan tespit motoru.
+
+    Giris tensoru (NCHW, float32 veya uint8) bir kez ayrilir ve her karede yeniden kullanilir;
+    Preprocessor resize + CLAHE sonucunu dogrudan bu tensore yazar.
+    `detect()` arayuzu Detector ile aynidir.
+    """
+    def __init__(self, model_path, session=None, iou=None, max_det=None, end2end=None):
+        self.session = session if session is not None else create_session(model_path)
+        self.model = self.session
+        self.imgsz = config.DETECTOR_IMGSZ
+        self.iou = iou if iou is not None else config.DETECTOR_IOU
+        self.max_det = max_det if max_det is not None else config.DETECTOR_MAX_DET
+        # Cikti duzeni (ham / NMS'li) bir kez modelden belirlenir
+        self.end2end = is_end2end(self.session) if end2end is None else end2end
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_dtype = np.uint8 if inp.type == 'tensor(uint8)' else np.float32
+        self._input = np.zeros((1, 3, self.imgsz, self.imgsz), dtype=self.input_dtype)
+        self.preprocessor = Preprocessor(self.imgsz, grid=config.CLAHE_GRID, space=config.PREPROCESS_CLAHE_SPACE)
+        # Sabit batch=1 export'ta shape[0] int 1'dir; dinamik export'ta sembolik (str/None)
+        self.dynamic_batch = bool(inp.shape) and not isinstance(inp.shape[0], int)
+        print(f"Model yuklendi (onnxruntime): {model_path} (Cozunurluk: {self.imgsz}x{self.imgsz})")
+
+    def _prepare(self, frame, index, use_clahe, clahe_clip):
+        self.preprocessor(frame, self._input[index], use_clahe=use_clahe, clip=clahe_clip)
+
+    def detect(self, frame, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        """Tek frame uzerinde tespit yap, (boxes, confs) dondur"""
+        orig_h, orig_w = frame.shape[:2]
+
+        self._prepare(frame, 0, use_clahe, clahe_clip)
+        pred = self.session.run(None, {self.input_name: self._input[:1]})[0]
+
+        boxes, scores = decode_predictions(pred[0], conf, self.iou, self.max_det, self.end2end)
+        return self._to_original(boxes, scores, orig_w, orig_h)
+
+    def detect_batch(self, frames, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        """Birden fazla frame'i tek inference cagrisinda isle, [(boxes, confs), ...] dondur.
+
+        Model sabit batch=1 ile export edildiyse frame'ler tek tek islenir.
+        """
+        if not self.dynamic_batch or len(frames) <= 1:
+            return [self.detect(f, conf, use_clahe, clahe_clip) for f in frames]
+
+        n = len(frames)
+        if self._input.shape[0] < n:
+            # Tensor en buyuk batch'e gore bir kez buyutulur, sonra yeniden kullanilir
+            self._input = np.zeros((n, 3, self.imgsz, self.imgsz), dtype=self.input_dtype)
+        for i, frame in enumerate(frames):
+            self._prepare(frame, i, use_clahe, clahe_clip)
+
+        preds = self.session.run(None, {self.input_name: self._input[:n]})[0]
+
+        results = []
+        for frame, pred in zip(frames, preds):
+            boxes, scores = decode_predictions(pred, conf, self.iou, self.max_det, self.end2end)
+            results.append(self._to_original(boxes, scores, frame.shape[1], frame.shape[0]))
+        return results
+
+    def _to_original(self, boxes, scores, orig_w, orig_h):
+        """Model koordinatlarindaki kutulari orijinal cozunurluge olcekle"""
+        if len(boxes) == 0:
+            return [], []
+        np.clip(boxes, 0, self.imgsz, out=boxes)
+        boxes *= np.array([orig_w, orig_h, orig_w, orig_h], dtype=np.float32) / self.imgsz
+        boxes = boxes.astype(np.int32)
+        return [tuple(int(v) for v in b) for b in boxes], [float(s) for s in scores]
@@ -0,0 +1,174 @@
+# Hafif coklu nesne takibi (SORT benzeri: sabit hizli Kalman + IoU eslestirme)
+# Inference atlanan karelerde kutulari ilerletir ve her baliga kalici bir ID verir.
+import threading
+import time
+import numpy as np
+from app.core import config
+
+# Olcum gurultusu (piksel^2) ve saniye basina surec gurultusu
+_R = np.diag([10.0, 10.0, 10.0, 10.0])
+_Q_POS = 25.0
+_Q_VEL = 2500.0
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4, 1e4])
+
+
+def _to_cxcywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+def iou_matrix(a, b):
+    """(N, 4) ve (M, 4) xyxy kutular arasi IoU matrisi (N, M)"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = w * h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class Track:
+    """Tek bir balik izi. Durum: [cx, cy, w, h, vx, vy, vw, vh] (hizlar piksel/saniye).
+
+    `box` / `conf` son eslesen tespitin degerleridir; `logged` tuketici tarafindan
+    isaretlenir (her iz bir kez loglanir).
+    """
+    def __init__(self, track_id, box, conf, timestamp):
+        self.id = track_id
+        self.x = np.zeros(8)
+        self.x[:4] = _to_cxcywh(box)
+        self.P = _P0.copy()
+        self.box = tuple(int(v) for v in box)
+        self.conf = float(conf)
+        self.timestamp = timestamp  # son eslesme zamani
+        self._t = timestamp  # filtrenin bulundugu zaman
+        self.hits = 1
+        self.logged = False
+
+    def predict(self, timestamp):
+        """Filtreyi `timestamp` anina ilerlet"""
+        dt = timestamp - self._t
+        if dt <= 0:
+            return
+        F = np.eye(8)
+        F[range(4), range(4, 8)] = dt
+        Q = np.diag([_Q_POS * dt] * 4 + [_Q_VEL * dt] * 4)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+        self._t = timestamp
+
+    def update(self, box, conf, timestamp):
+        """Eslesen tespitle filtreyi duzelt"""
+        self.predict(timestamp)
+        S = self.P[:4, :4] + _R
+        K = self.P[:, :4] @ np.linalg.inv(S)
+        self.x = self.x + K @ (_to_cxcywh(box) - self.x[:4])
+        self.P = self.P - K @ self.P[:4, :]
+        self.box = tuple(int(v) for v in box)
+        self.conf = float(conf)
+        self.timestamp = timestamp
+        self.hits += 1
+
+    def box_at(self, timestamp):
+        """Filtreyi degistirmeden `timestamp` anindaki tahmini kutu (int xyxy)"""
+        dt = max(timestamp - self._t, 0.0)
+        cx, cy, w, h = self.x[:4] + self.x[4:] * dt
+        w, h = max(w, 1.0), max(h, 1.0)
+        return (int(cx - w / 2), int(cy - h / 2), int(cx + w / 2), int(cy + h / 2))
+
+    def conf_at(self, timestamp, decay):
+        """Son eslesmeden bu yana saniye basina `decay` ile azalan guven"""
+        return self.conf * decay ** max(timestamp - self.timestamp, 0.0)
+
+
+class Tracker:
+    """SORT benzeri takipci: greedy IoU eslestirme, sabit hizli Kalman tahmini.
+
+    Detection thread'i `update()`, render thread'i `predict()` cagirir.
+    `needs_inference()` yeni izlerin dogrulanmasi veya guvenin dusmesi icin
+    tam model calistirilmasi gerektigini bildirir.
+    """
+    def __init__(self, iou_thresh=None, max_age=None, min_hits=None,
+                 conf_decay=None, min_conf=None, reinfer_interval=None):
+        self.iou_thresh = config.TRACK_IOU if iou_thresh is None else iou_thresh
+        self.max_age = config.TRACK_MAX_AGE if max_age is None else max_age
+        self.min_hits = config.TRACK_MIN_HITS if min_hits is None else min_hits
+        self.conf_decay = config.TRACK_CONF_DECAY if conf_decay is None else conf_decay
+        self.min_conf = config.TRACK_MIN_CONF if min_conf is None else min_conf
+        self.reinfer_interval = config.TRACK_REINFER_INTERVAL if reinfer_interval is None else reinfer_interval
+
+        self._lock = threading.Lock()
+        self._tracks = []
+        self._next_id = 1
+        self._last_update = None
+
+    def update(self, boxes, confs, timestamp=None):
+        """Yeni inference sonuclariyla izleri guncelle, dogrulanmis izleri dondur"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for track in self._tracks:
+                track.predict(timestamp)
+
+            predicted = [t.box_at(timestamp) for t in self._tracks]
+            ious = iou_matrix(predicted, boxes)
+            matched_tracks, matched_dets = set(), set()
+
+            # Greedy: en yuksek IoU'dan baslayarak esle
+            while ious.size:
+                t, d = np.unravel_index(np.argmax(ious), ious.shape)
+                if ious[t, d] < self.iou_thresh:
+                    break
+                self._tracks[t].update(boxes[d], confs[d], timestamp)
+                matched_tracks.add(t)
+                matched_dets.add(d)
+                ious[t, :] = -1
+                ious[:, d] = -1
+
+            for d, (box, conf) in enumerate(zip(boxes, confs)):
+                if d not in matched_dets:
+                    self._tracks.append(Track(self._next_id, box, conf, timestamp))
+                    self._next_id += 1
+
+            # Uzun suredir eslesmeyen izleri dusur
+            self._tracks = [t for t in self._tracks if timestamp - t.timestamp <= self.max_age]
+            self._last_update = timestamp
+            return [t for t in self._tracks if t.hits >= self.min_hits]
+
+    def predict(self, timestamp=None):
+        """Inference olmayan kare icin ilerletilmis kutular: (boxes, confs, ids)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes, confs, ids = [], [], []
+        with self._lock:
+            for track in self._tracks:
+                if track.hits < self.min_hits:
+                    continue
+                boxes.append(track.box_at(timestamp))
+                confs.append(track.conf_at(timestamp, self.conf_decay))
+                ids.append(track.id)
+        return boxes, confs, ids
+
+    def needs_inference(self, timestamp=None):
+        """Izler icin tam model calistirilmali mi?"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if not self._tracks:
+                return False
+            if timestamp - self._last_update >= self.reinfer_interval:
+                return True
+            for track in self._tracks:
+                # Dogrulanmamis iz veya guveni dusen iz
+                if track.hits < self.min_hits or track.conf_at(timestamp, self.conf_decay) < self.min_conf:
+                    return True
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': sum(1 for t in self._tracks if t.hits >= self.min_hits),
+                'tentative': sum(1 for t in self._tracks if t.hits < self.min_hits),
+                'total': self._next_id - 1,
+            }
@@ -0,0 +1,128 @@
+# Istemci basina uyarlanabilir stream kalitesi (cozunurluk / JPEG kalitesi / FPS)
+import threading
+import time
+from app.core import config
+
+
+class AdaptiveController:
+    """Tek bir izleyici baglantisi icin seviye secici.
+
+    Gecikme ornekleri (WS: ack RTT, MJPEG: chunk gonderme suresi) EWMA ile yumusatilir.
+    Gecikme hedefi asarsa veya gonderim kuyrugu birikirse seviye hemen dusurulur;
+    gecikme hedefin yarisinin altinda kaldikca seviye yavasca yukseltilir.
+    """
+    DOWN_HOLD = 1.0  # Iki dusurme arasi min sure (saniye)
+    UP_HOLD = 5.0  # Yukseltmeden once gereken sakin sure
+
+    def __init__(self, client_id, kind='ws', levels=None, target_latency=None,
+                 max_backlog=None, ack_timeout=None, start_level=None):
+        self.client_id = client_id
+        self.kind = kind
+        self.levels = list(levels or config.STREAM_LEVELS)
+        self.target_latency = config.STREAM_TARGET_LATENCY if target_latency is None else target_latency
+        self.max_backlog = config.STREAM_MAX_BACKLOG if max_backlog is None else max_backlog
+        self.ack_timeout = config.STREAM_ACK_TIMEOUT if ack_timeout is None else ack_timeout
+        self.level = len(self.levels) - 1 if start_level is None else start_level
+
+        self.latency = None
+        self.last_seq = 0
+        self.sent = 0
+        self._pending = {}  # seq -> gonderim zamani (ack bekleyen)
+        self._last_sent = float('-inf')
+        self._last_change = 0.0
+
+    def settings(self):
+        """(quality, size, fps)"""
+        return self.levels[self.level]
+
+    @property
+    def backlog(self):
+        return len(self._pending)
+
+    def observe(self, latency, now=None):
+        """Yeni gecikme ornegi ekle ve seviyeyi ayarla"""
+        now = time.time() if now is None else now
+        self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+        self._adjust(now)
+
+    def _adjust(self, now):
+        congested = self.latency > self.target_latency or self.backlog >= self.max_backlog
+        if congested:
+            if self.level > 0 and now - self._last_change >= self.DOWN_HOLD:
+                self.level -= 1
+                self._last_change = now
+        elif (self.latency < self.target_latency / 2 and self.backlog == 0
+              and self.level < len(self.levels) - 1 and now - self._last_change >= self.UP_HOLD):
+            self.level += 1
+            self._last_change = now
+
+    # -- WebSocket: gonderim / ack takibi --
+    def ready_to_send(self, now=None):
+        """FPS limiti ve ack kuyrugu izin veriyor mu? Suresi dolan ack'ler gecikme sayilir"""
+        now = time.time() if now is None else now
+        for seq, sent_at in list(self._pending.items()):
+            if now - sent_at > self.ack_timeout:
+                del self._pending[seq]
+                self.observe(self.ack_timeout, now)
+        if self.backlog >= self.max_backlog:
+            return False
+        return now - self._last_sent >= 1.0 / self.settings()[2]
+
+    def on_sent(self, seq, now=None):
+        now = time.time() if now is None else now
+        self._pending[seq] = now
+        self._last_sent = now
+        self.last_seq = seq
+        self.sent += 1
+
+    def on_ack(self, seq, now=None):
+        now = time.time() if now is None else now
+        sent_at = self._pending.pop(seq, None)
+        if sent_at is None:
+            return
+        # Bu kareden eski ve hala bekleyenler istemcide atlanmistir
+        for old in [s for s in self._pending if s < seq]:
+            del self._pending[old]
+        self.observe(now - sent_at, now)
+
+    def stats(self):
+        quality, size, fps = self.settings()
+        return {
+            'id': self.client_id,
+            'kind': self.kind,
+            'level': self.level,
+            'quality': quality,
+            'size': f"{size[0]}x{size[1]}" if size else 'native',
+            'fps': fps,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'backlog': self.backlog,
+        }
+
+
+class ClientRegistry:
+    """Bagli izleyicilerin controller'lari (Socket.IO sid veya MJPEG baglantisi basina)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def register(self, client_id, kind='ws', **kwargs):
+        with self._lock:
+            ctrl = self._clients.get(client_id)
+            if ctrl is None:
+                ctrl = self._clients[client_id] = AdaptiveController(client_id, kind, **kwargs)
+            return ctrl
+
+    def get(self, client_id):
+        with self._lock:
+            return self._clients.get(client_id)
+
+    def remove(self, client_id):
+        with self._lock:
+            self._clients.pop(client_id, None)
+
+    def clients(self, kind=None):
+        with self._lock:
+            return [c for c in self._clients.values() if kind is None or c.kind == kind]
+
+    def stats(self):
+        return [c.stats() for c in self.clients()]
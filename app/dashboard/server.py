@@ -5,28 +5,35 @@ Flask + SocketIO ile gercek zamanli izleme paneli
 """
 import eventlet
 eventlet.monkey_patch()
+import eventlet.tpool
 
+import atexit
 import os
 import sys
 import time
 import queue
-import json
 import cv2
-import csv
+import itertools
 from datetime import datetime
-from flask import Flask, render_template, Response, request, jsonify, send_from_directory
+from flask import Flask, render_template, Response, request, jsonify, send_from_directory, send_file
 from flask_socketio import SocketIO, emit
 
 # Path ayari
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from app.core import config, Detector
+from app.core import config, create_detector, SceneChangeGate, Tracker, InferenceWorker, ImageWriter
 from app.utils import draw_boxes
-from app.dashboard.stream import FrameBuffer, generate_mjpeg, get_base64_frame
+from app.dashboard.stream import FrameBuffer, generate_mjpeg, get_hub, pack_ws_frame, stream_levels
+from app.dashboard.adaptive import ClientRegistry
 from app.core import Camera # Moved Camera import here as it's no longer from app.core directly
 from app.core.gps import gps_state, gps_reader_thread
-from app.db.spatial import init_db, insert_detection
-from app.export import to_geojson, to_csv_download, to_darwincore_archive, WebhookNotifier
+from app.db.spatial import init_db, query_detections, query_detections_bbox
+from app.db.writer import SpatialWriter
+from app.db.pool import pool_stats
+from app.db.tiles import query_tiles
+from app.db import archive, csvlog
+from app.export import (iter_geojson, iter_csv, iter_darwincore_archive, parse_since,
+                        ExportCache, WebhookNotifier)
 
 # Flask app
 app = Flask(__name__)
@@ -44,28 +51,48 @@ log = []
 # Frame Queue for decoupled inference
 frame_queue = queue.Queue(maxsize=5)
 
+# Sahne degismediginde inference atlanir (esikler stats'ta raporlanir)
+motion_gate = SceneChangeGate()
+# Inference arasi kutulari ilerleten ve baliklara kalici ID veren takipci
+tracker = Tracker()
+# SpatiaLite yazimlari ayri bir tpool thread'inde toplu commit edilir (inference diske beklemez)
+spatial_writer = SpatialWriter(executor=eventlet.tpool.execute)
+# Thumbnail / snapshot JPEG'leri arka planda yazilir; klasor kotalari artimli tutulur
+image_writer = ImageWriter(executor=eventlet.tpool.execute)
+image_writer.retain('detections/thumbs', max_files=config.THUMB_MAX_FILES)
+image_writer.retain('detections', max_files=config.DETECTION_MAX_FILES, max_bytes=config.DETECTION_MAX_BYTES)
+
+# Izleyici basina uyarlanabilir stream seviyeleri (WS sid / MJPEG baglantisi)
+stream_clients = ClientRegistry()
+_mjpeg_ids = itertools.count(1)
+
+# INFERENCE_WORKER acikken ayri process'teki tespit motoru (stats icin)
+inference_worker = None
+
 # Init CSV logger
 CSV_LOG_FILE = "detections_log.csv"
 csv_log_queue = queue.Queue()
+csv_logger = csvlog.get_logger(CSV_LOG_FILE)
 
 def csv_logger_thread():
-    # Write header if file doesn't exist
-    if not os.path.exists(CSV_LOG_FILE):
-        with open(CSV_LOG_FILE, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
-
-    with open(CSV_LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
+    """Kuyruktaki satirlari tamponlu yazar; bosta kalinca da en gec flush araliginda diske iner"""
+    while True:
+        try:
+            row = csv_log_queue.get(timeout=csv_logger.flush_interval)
+        except queue.Empty:
+            csv_logger.flush()
+            continue
+        rows = [row]
         while True:
-            row = csv_log_queue.get()
-            writer.writerow(row)
-            f.flush()
+            try:
+                rows.append(csv_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        csv_logger.write_rows(rows)
+        if csv_logger.due():
+            csv_logger.flush()
 
-if not os.path.exists(CSV_LOG_FILE):
-    with open(CSV_LOG_FILE, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
+csvlog.ensure_header(CSV_LOG_FILE)
 
 
 # -- Sistem bilgileri --
@@ -84,14 +111,47 @@ def get_stats():
     return stats
 
 
+def _build_stats():
+    """Dashboard'a gonderilen tum istatistikler"""
+    stats = get_stats()
+    stats['fps'] = round(buffer.fps, 1)
+    stats['detections'] = buffer.count
+    stats['gps'] = gps_state.get_dict()
+    confs = [d[4] for d in buffer.detections]
+    stats['confidence'] = max(confs) if confs else 0.0
+    stats['motion_gate'] = motion_gate.stats()
+    stats['tracker'] = tracker.stats() if config.TRACK_ENABLED else None
+    stats['inference_worker'] = inference_worker.stats() if inference_worker is not None else None
+    stats['streams'] = get_hub(buffer).stats()
+    stats['clients'] = stream_clients.stats()
+    stats['spatial_writer'] = spatial_writer.stats()
+    stats['db_pool'] = pool_stats()
+    stats['csv_log'] = csv_logger.stats()
+    stats['image_writer'] = image_writer.stats()
+    stats['webhooks'] = webhook_notifier.get_stats()
+    return stats
+
+
 # -- Routes --
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def _adaptive_mjpeg(stream_type, client_id):
+    """Baglanti suresince izleyiciyi kayitli tutan MJPEG generator"""
+    ctrl = stream_clients.register(client_id, kind='mjpeg', levels=stream_levels(stream_type))
+    try:
+        yield from generate_mjpeg(buffer, stream_type, controller=ctrl)
+    finally:
+        stream_clients.remove(client_id)
+
+
 @app.route('/video/<stream_type>')
 def video(stream_type):
-    return Response(generate_mjpeg(buffer, stream_type),
+    if stream_type not in FrameBuffer.STREAMS:
+        return jsonify({'status': 'error', 'message': f"Bilinmeyen akis: {stream_type}"}), 404
+    client_id = f"mjpeg:{request.remote_addr}:{next(_mjpeg_ids)}"
+    return Response(_adaptive_mjpeg(stream_type, client_id),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/api/config', methods=['GET', 'POST'])
@@ -103,16 +163,20 @@ def api_config():
             conf_thresh = float(data['confidence'])
         if 'clahe_clip' in data:
             clahe_clip = float(data['clahe_clip'])
+        if 'motion_threshold' in data:
+            motion_gate.threshold = float(data['motion_threshold'])
+        if 'motion_max_interval' in data:
+            motion_gate.max_interval = float(data['motion_max_interval'])
         return jsonify({'status': 'ok'})
-    return jsonify({'confidence': conf_thresh, 'clahe_clip': clahe_clip, 'recording': is_recording})
+    return jsonify({'confidence': conf_thresh, 'clahe_clip': clahe_clip, 'recording': is_recording,
+                    'motion_threshold': motion_gate.threshold, 'motion_max_interval': motion_gate.max_interval})
 
 @app.route('/api/snapshot', methods=['POST'])
 def snapshot():
     frame = buffer.get('detection')
     if frame is not None:
-        os.makedirs('detections', exist_ok=True)
         name = f"snap_{datetime.now().strftime('%H%M%S')}.jpg"
-        cv2.imwrite(f"detections/{name}", frame)
+        image_writer.submit(f"detections/{name}", frame.copy())
         return jsonify({'status': 'ok', 'file': name})
     return jsonify({'status': 'error'})
 
@@ -127,38 +191,115 @@ def serve_file(name):
     return send_from_directory('detections', name)
 
 
+# -- Detection Queries --
+def _page(rows, limit):
+    """Sayfa + sonraki sayfanin keyset imleci (son satirin timestamp/id'si)"""
+    nxt = None
+    if len(rows) == limit:
+        nxt = {'after_timestamp': rows[-1]['timestamp'], 'after_id': rows[-1]['id']}
+    return {'items': rows, 'next': nxt}
+
+@app.route('/api/detections/bbox')
+def api_detections_bbox():
+    """Harita gorunumundeki tespitler (spatial index, sayfali)"""
+    args = request.args
+    try:
+        bbox = [float(args[k]) for k in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+        limit = max(1, min(int(args.get('limit', config.BBOX_PAGE_SIZE)), config.BBOX_PAGE_SIZE))
+        after_ts = args.get('after_timestamp', type=float)
+        after_id = args.get('after_id', type=int)
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'min_lat, min_lon, max_lat, max_lon gerekli'}), 400
+    rows = query_detections_bbox(*bbox, limit=limit, after_timestamp=after_ts, after_id=after_id)
+    return jsonify(_page(rows, limit))
+
+@app.route('/api/detections/history')
+def api_detections_history():
+    """Tespit gecmisi, yeniden eskiye (timestamp indeksi, keyset sayfalama)"""
+    args = request.args
+    try:
+        limit = max(1, min(int(args.get('limit', config.BBOX_PAGE_SIZE)), config.BBOX_PAGE_SIZE))
+        after_ts = args.get('after_timestamp', type=float)
+        after_id = args.get('after_id', type=int)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'limit sayi olmali'}), 400
+    rows = query_detections(limit, after_timestamp=after_ts, after_id=after_id, species=args.get('species'))
+    return jsonify(_page(rows, limit))
+
+@app.route('/api/map/tiles')
+def api_map_tiles():
+    """Zoom seviyesine gore karo basina tespit sayilari (ham nokta yerine isi haritasi icin)"""
+    args = request.args
+    try:
+        zoom = int(args['z'])
+        bbox = [float(args[k]) for k in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'z, min_lat, min_lon, max_lat, max_lon gerekli'}), 400
+    zoom, tiles = query_tiles(zoom, *bbox)
+    return jsonify({'zoom': zoom, 'tiles': tiles, 'max_count': max((t['count'] for t in tiles), default=0)})
+
+@app.route('/api/analytics/summary')
+def api_analytics_summary():
+    """Sezonluk analiz: sutunlu arsiv uzerinden guven dagilimi, saat deseni, yogunluk"""
+    args = request.args
+    try:
+        start = parse_since(args.get('start'))
+        end = parse_since(args.get('end'))
+        min_conf = args.get('min_conf', type=float)
+        cell = float(args.get('cell', 0.01))
+        bbox = None
+        if 'min_lat' in args:
+            bbox = [float(args[k]) for k in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'start/end Unix zamani veya ISO 8601, bbox sayi olmali'}), 400
+    if cell <= 0:
+        return jsonify({'status': 'error', 'message': 'cell pozitif olmali'}), 400
+    result = eventlet.tpool.execute(archive.summary, start, end, species=args.get('species'),
+                                    min_conf=min_conf, bbox=bbox, cell_deg=cell)
+    return jsonify(result)
+
 # -- Export / Data Sharing Endpoints --
-webhook_notifier = WebhookNotifier(rate_limit_seconds=60)
+webhook_notifier = WebhookNotifier(rate_limit_seconds=60, retry_path=config.WEBHOOK_RETRY_DB)
+
+# get() tpool thread'inde calisir: DB'yi yesil havuz yerine kendi baglantisiyla okur.
+# Istekler greenlet tarafinda siralanir; tpool thread'leri cache kilidinde cekismez.
+export_cache = ExportCache(config.EXPORT_CACHE_DIR, CSV_LOG_FILE, str(config.DB_PATH), direct=True)
+_export_lock = eventlet.semaphore.Semaphore()
+
+def _export_response(kind, stream, mimetype, filename):
+    """Tam export: onbellekteki dosya (ETag / If-None-Match -> 304).
+    since= verilirse sadece o andan sonraki kayitlar chunked akitilir (GBIF/OBIS delta senkronu)."""
+    since = request.args.get('since')
+    if since:
+        try:
+            since = parse_since(since)
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'since Unix zamani veya ISO 8601 olmali'}), 400
+        return Response(
+            stream(CSV_LOG_FILE, str(config.DB_PATH), since),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    # Ilk uretim / rotasyon sonrasi yeniden uretim tum DB'yi okur: event loop'u dondurmasin
+    with _export_lock:
+        path, etag = eventlet.tpool.execute(export_cache.get, kind)
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename,
+                     etag=etag, conditional=True, max_age=0)
 
 @app.route('/api/export/geojson')
 def export_geojson():
     """GeoJSON export — harita servisleri, QGIS, Leaflet uyumlu"""
-    data = to_geojson(CSV_LOG_FILE, str(config.DB_PATH))
-    return Response(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        mimetype='application/geo+json',
-        headers={'Content-Disposition': 'attachment; filename=pufferfish_detections.geojson'}
-    )
+    return _export_response('geojson', iter_geojson, 'application/geo+json', 'pufferfish_detections.geojson')
 
 @app.route('/api/export/csv')
 def export_csv():
     """CSV download — araştırmacılar için"""
-    csv_data = to_csv_download(CSV_LOG_FILE, str(config.DB_PATH))
-    return Response(
-        csv_data,
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=pufferfish_detections.csv'}
-    )
+    return _export_response('csv', iter_csv, 'text/csv', 'pufferfish_detections.csv')
 
 @app.route('/api/export/darwincore')
 def export_darwincore():
     """DarwinCore Archive (ZIP) — GBIF / OBIS uyumlu"""
-    zip_data = to_darwincore_archive(CSV_LOG_FILE, str(config.DB_PATH))
-    return Response(
-        zip_data,
-        mimetype='application/zip',
-        headers={'Content-Disposition': 'attachment; filename=pufferfish_dwca.zip'}
-    )
+    return _export_response('dwca', iter_darwincore_archive, 'application/zip', 'pufferfish_dwca.zip')
 
 @app.route('/api/webhooks', methods=['GET', 'POST', 'DELETE'])
 def api_webhooks():
@@ -190,13 +331,29 @@ def api_webhooks():
 def on_connect():
     emit('config', {'confidence': conf_thresh, 'clahe_clip': clahe_clip, 'recording': is_recording})
 
+@socketio.on('disconnect')
+def on_disconnect(*args):
+    stream_clients.remove(request.sid)
+
+@socketio.on('ws_stream')
+def on_ws_stream(data):
+    """WebSocket stream'i sadece isteyen istemcilere gonderilir (zayif Wi-Fi'da bant tasarrufu)"""
+    if data and data.get('enabled'):
+        stream_clients.register(request.sid, kind='ws')
+    else:
+        stream_clients.remove(request.sid)
+
+@socketio.on('ws_ack')
+def on_ws_ack(data):
+    """Istemci kareyi gosterdi: RTT ve kuyruk olcumu icin"""
+    ctrl = stream_clients.get(request.sid)
+    if ctrl is not None and data and 'seq' in data:
+        ctrl.on_ack(int(data['seq']))
+
+
 @socketio.on('get_stats')
 def on_stats():
-    stats = get_stats()
-    stats['fps'] = buffer.fps
-    stats['detections'] = buffer.count
-    stats['gps'] = gps_state.get_dict()
-    emit('stats', stats)
+    emit('stats', _build_stats())
 
 
 # -- Producer Thread: Sadece Kameradan Oku --
@@ -211,30 +368,33 @@ def camera_producer():
         return
 
     prev_time = time.time()
+    last_seq = None
     while True:
         try:
-            frame = cam.get_frame()
-            if frame is None:
-                socketio.sleep(0.01)
+            # Kopyasiz referans: ayni kare tekrar kuyruga konmaz
+            ref = cam.acquire_frame(after_seq=last_seq)
+            if ref is None:
+                socketio.sleep(0.005)
                 continue
+            last_seq = ref.seq
 
             now = time.time()
-            # Yalnızca kare değiştiğinde FPS hesabını güncellemek için kaba bir koruma
-            # Ancak wait vs kullanılmadığı için her döngüde frame alınabilir, bu yüzden uyuma ekliyoruz.
             buffer.fps = 1.0 / (now - prev_time) if now > prev_time else 0
             prev_time = now
 
-            # Display buffer update
-            buffer.update(raw=frame)
+            # Display buffer update (buffer kendi referansini tutar)
+            buffer.update(raw=ref)
 
             # Send latest raw frame to inference queue
+            queued = ref.retain()
             try:
                 # Drop oldest frame if queue full to keep real-time
                 if frame_queue.full():
-                    frame_queue.get_nowait()
-                frame_queue.put_nowait(frame.copy())
+                    frame_queue.get_nowait().release()
+                frame_queue.put_nowait(queued)
             except:
-                pass
+                queued.release()
+            ref.release()
 
             # CPU döngü koruması, 30fps ~= 33ms
             socketio.sleep(1.0 / config.TARGET_FPS)
@@ -245,12 +405,132 @@ def camera_producer():
 
 
 # -- Consumer Thread: Sadece Tespit Yap --
-def detection_loop():
-    global is_recording
+def _log_detection(frame, box, c, frame_ts=None):
+    """Tek bir tespiti thumbnail, CSV, GIS ve webhook yollarina gonder.
+
+    Konum `frame_ts` (frame yakalama ani) icin GPS fix'leri arasindan hesaplanir.
+    """
+    x1, y1, x2, y2 = box
+    now_time = time.time()
+    frame_ts = frame_ts or now_time
+    now_dt = datetime.now()
+    ts = now_dt.strftime('%H%M%S_%f')
+
+    # 1. Bildirim Icin Thumbnail
+    thumb = frame[max(0,y1-10):y2+10, max(0,x1-10):x2+10]
+    if thumb.size > 0:
+        thumbnail_name = f"t_{ts}.jpg"
+        path = f"detections/thumbs/{thumbnail_name}"
+        event = {
+            'timestamp': now_dt.strftime('%H:%M:%S'),
+            'confidence': round(c, 2),
+            'thumbnail': thumbnail_name
+        }
+        # resize kopya uretir (halka slotu serbest kalabilir); olay dosya diske inince gider
+        image_writer.submit(path, cv2.resize(thumb, (100, 100)),
+                            on_written=lambda _: socketio.emit('detection', event))
+
+    # 2. Kalici Veri Sistikcasi Icin CSV Kayit
+    csv_log_queue.put([
+        ts, now_dt.strftime('%Y-%m-%d'), now_dt.strftime('%H:%M:%S'),
+        round(c, 4), x1, y1, x2, y2
+    ])
+
+    # 3. Canli GIS Loglama: Eger GPS verisi gecerliyse
+    lat, lon, gps_ts, is_valid = gps_state.position_at(frame_ts)
+    if is_valid:
+        try:
+            # SpatiaLite Log (kuyruga eklenir, bloklamaz)
+            spatial_writer.submit("Pufferfish", c, lat, lon, frame_ts)
+
+            # Frontend'e event yolla
+            socketio.emit('gis_detection', {
+                'lat': lat,
+                'lon': lon,
+                'confidence': round(c, 2),
+                'timestamp': now_dt.strftime('%H:%M:%S')
+            })
+            # Kritik: CPU context switch izin vermesi icin eventlet sleep
+            socketio.sleep(0)
+        except Exception as spatial_err:
+            print(f"Spatial Log Hata: {spatial_err}")
+
+    # 4. Webhook bildirimi (arka planda, ana thread'i bloklamaz)
+    webhook_notifier.notify_async(
+        species="Lagocephalus sceleratus",
+        confidence=round(c, 4),
+        lat=lat if is_valid else None,
+        lon=lon if is_valid else None,
+        timestamp=now_dt.strftime('%Y-%m-%d %H:%M:%S')
+    )
+    return now_time
+
+
+def _process_detections(frame, boxes, confs, last_save_time, tracks=None, frame_ts=None):
+    """Tek bir frame'in tespit sonuclarini loglama, thumbnail ve GIS yollarina dagit.
+
+    `frame_ts` frame'in yakalanma zamanidir (GPS ara degeri icin). `tracks` verilirse (takip acik) her iz yalnizca bir kez loglanir; aksi halde
+    DASHBOARD_SAVE_INTERVAL ile hiz sinirlamasi yapilir. Guncel `last_save_time` degerini dondurur.
+    """
+    if not is_recording:
+        return last_save_time
+
+    if tracks is not None:
+        # Ayni balik kadrajda kaldigi surece tekrar loglanmaz
+        for track in tracks:
+            if not track.logged and track.conf >= conf_thresh:
+                last_save_time = _log_detection(frame, track.box, track.conf, frame_ts)
+                track.logged = True
+        return last_save_time
+
+    # Olay bazli islemler
+    for box, c in zip(boxes, confs):
+        if c >= conf_thresh: # Dashboard slider esigini kullan
+            # Rate limiting: Ziplamalari ve disk yorgunlugunu engelle
+            if time.time() - last_save_time >= config.DASHBOARD_SAVE_INTERVAL:
+                last_save_time = _log_detection(frame, box, c, frame_ts)
+            break # Bu frame icin ilk gecerli objeyi (en yuksek guven) loglamak yeterlidir
+
+    return last_save_time
+
+
+def _collect_batch(max_size, timeout):
+    """Kuyruktan en fazla `max_size` frame topla; ilk frame'den sonra en fazla `timeout` sn bekle"""
+    refs = [frame_queue.get()]
+    deadline = time.time() + timeout
+    while len(refs) < max_size:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            refs.append(frame_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return refs
+
 
-    # Model yukle
+def detection_loop():
+    global is_recording, inference_worker
+
+    # Batch modu icin dinamik batch boyutlu model gerekir (training/export_quantize.py --dynamic-batch)
+    batch_size = max(1, int(config.INFERENCE_BATCH_SIZE))
+    model_path = config.MODEL_PATH
+    if batch_size > 1:
+        if config.MODEL_PATH_DYNAMIC.exists():
+            model_path = config.MODEL_PATH_DYNAMIC
+        else:
+            print(f"Dinamik batch modeli yok ({config.MODEL_PATH_DYNAMIC}), frame'ler tek tek islenecek")
+
+    # Model yukle: ya bu process'te ya da ayri worker process'te (event loop bloklanmaz)
     try:
-        detector = Detector(config.MODEL_PATH)
+        if config.INFERENCE_WORKER:
+            detector = InferenceWorker(model_path, (config.CAM_HEIGHT, config.CAM_WIDTH, 3),
+                                       slots=max(2, batch_size), sleep=socketio.sleep).start()
+            inference_worker = detector
+            # Cikista worker process'i ve /dev/shm segmentini birak
+            atexit.register(detector.stop)
+        else:
+            detector = create_detector(model_path)
     except Exception as e:
         print(f"Model hatasi: {e}")
         return
@@ -260,74 +540,44 @@ def detection_loop():
     last_save_time = 0.0
 
     while True:
+        refs = []
         try:
-            # Wait for next frame
-            frame = frame_queue.get()
+            # Wait for next frame(s) (FrameRing referanslari, salt-okunur)
+            if batch_size > 1:
+                refs = _collect_batch(batch_size, config.INFERENCE_BATCH_TIMEOUT)
+            else:
+                refs = [frame_queue.get()]
+
+            # Sahne degismediyse inference atla; kutular takipci ile ilerletilir.
+            # Yeni/guveni dusen izler varsa takipci inference'i zorlar.
+            active = [ref for ref in refs if motion_gate.should_infer(
+                ref.frame, now=ref.timestamp,
+                force=config.TRACK_ENABLED and tracker.needs_inference(ref.timestamp))]
+            if not active:
+                for ref in refs:
+                    ref.release()
+                socketio.sleep(0)
+                continue
+            frames = [ref.frame for ref in active]
 
             # Tespit (CLAHE sadece inference edilen frame'e ve kucultulmus tensore uygulanacak)
-            boxes, confs = detector.detect(frame, conf=conf_thresh, use_clahe=True, clahe_clip=clahe_clip)
-
-            # Olay bazli islemler
-            for (x1, y1, x2, y2), c in zip(boxes, confs):
-                if c >= conf_thresh and is_recording: # Kayit acikken, dashboard slider esigini kullan
-                    now_time = time.time()
-
-                    # Rate limiting: Ziplamalari ve disk yorgunlugunu engelle
-                    if now_time - last_save_time >= config.DASHBOARD_SAVE_INTERVAL:
-                        now_dt = datetime.now()
-                        ts = now_dt.strftime('%H%M%S_%f')
-
-                        # 1. Bildirim Icin Thumbnail
-                        thumb = frame[max(0,y1-10):y2+10, max(0,x1-10):x2+10]
-                        if thumb.size > 0:
-                            thumbnail_name = f"t_{ts}.jpg"
-                            path = f"detections/thumbs/{thumbnail_name}"
-                            cv2.imwrite(path, cv2.resize(thumb, (100, 100)))
-                            socketio.emit('detection', {
-                                'timestamp': now_dt.strftime('%H:%M:%S'),
-                                'confidence': round(c, 2),
-                                'thumbnail': thumbnail_name
-                            })
-
-                        # 2. Kalici Veri Sistikcasi Icin CSV Kayit
-                        csv_log_queue.put([
-                            ts, now_dt.strftime('%Y-%m-%d'), now_dt.strftime('%H:%M:%S'),
-                            round(c, 4), x1, y1, x2, y2
-                        ])
-
-                        # 3. Canli GIS Loglama: Eger GPS verisi gecerliyse
-                        lat, lon, gps_ts, is_valid = gps_state.get()
-                        if is_valid:
-                            try:
-                                # SpatiaLite Log
-                                insert_detection("Pufferfish", c, lat, lon, now_time)
-
-                                # Frontend'e event yolla
-                                socketio.emit('gis_detection', {
-                                    'lat': lat,
-                                    'lon': lon,
-                                    'confidence': round(c, 2),
-                                    'timestamp': now_dt.strftime('%H:%M:%S')
-                                })
-                                # Kritik: CPU context switch izin vermesi icin eventlet sleep
-                                socketio.sleep(0)
-                            except Exception as spatial_err:
-                                print(f"Spatial Log Hata: {spatial_err}")
-
-                        last_save_time = now_time
-
-                        # 4. Webhook bildirimi (arka planda, ana thread'i bloklamaz)
-                        webhook_notifier.notify_async(
-                            species="Lagocephalus sceleratus",
-                            confidence=round(c, 4),
-                            lat=lat if is_valid else None,
-                            lon=lon if is_valid else None,
-                            timestamp=now_dt.strftime('%Y-%m-%d %H:%M:%S')
-                        )
-
-                        break # Bu frame icin ilk gecerli objeyi (en yuksek guven) loglamak yeterlidir
-
-            # Buffer'i guncelle (Diger asenkron thread cizecek)
+            if len(frames) > 1:
+                results = detector.detect_batch(frames, conf=conf_thresh, use_clahe=True, clahe_clip=clahe_clip)
+            else:
+                results = [detector.detect(frames[0], conf=conf_thresh, use_clahe=True, clahe_clip=clahe_clip)]
+
+            # Sonuclari frame bazinda loglama / thumbnail / GIS yollarina dagit
+            for ref, (boxes, confs) in zip(active, results):
+                tracks = tracker.update(boxes, confs, ref.timestamp) if config.TRACK_ENABLED else None
+                last_save_time = _process_detections(ref.frame, boxes, confs, last_save_time, tracks=tracks,
+                                                     frame_ts=ref.timestamp)
+
+            # Slotlari kameraya geri ver
+            for ref in refs:
+                ref.release()
+
+            # Buffer'i guncelle (Diger asenkron thread cizecek); en guncel frame'in sonuclari
+            boxes, confs = results[-1]
             dets = [(x1, y1, x2, y2, c) for (x1, y1, x2, y2), c in zip(boxes, confs)]
             buffer.update(detections=dets)
 
@@ -336,6 +586,8 @@ def detection_loop():
 
         except Exception as e:
             print(f"Consumer Hata: {e}")
+            for ref in refs:
+                ref.release()
             socketio.sleep(0.1)
 
 
@@ -343,39 +595,83 @@ def detection_loop():
 def render_loop():
     while True:
         try:
-            raw = buffer.get('raw')
-            if raw is not None:
-                # Kutulari bellekteki guncel durumdan ciz
-                det_frame = draw_boxes(raw.copy(), [d[:4] for d in buffer.detections], [d[4] for d in buffer.detections])
+            ref = buffer.acquire('raw')
+            if ref is not None:
+                # Kutulari ciz (draw_boxes kendi kopyasini alir). Takip aciksa kutular
+                # karenin yakalanma anina ilerletilir, boylece model yavas olsa da akici hareket eder.
+                with ref:
+                    if config.TRACK_ENABLED:
+                        boxes, confs, ids = tracker.predict(ref.timestamp)
+                    else:
+                        dets = buffer.detections
+                        boxes, confs, ids = [d[:4] for d in dets], [d[4] for d in dets], None
+                    det_frame = draw_boxes(ref.frame, boxes, confs, ids=ids)
                 buffer.update(detection=det_frame)
             socketio.sleep(0.03) # 30fps render limit
         except:
              socketio.sleep(0.1)
 
 # -- WS Base64 Stream Loop --
+def _send_ws_frames(hub, now=None):
+    """Son detection karesini her WS izleyicisine kendi seviyesinde gonder.
+
+    Ayni (kalite, boyut) seviyesindeki izleyiciler ayni kodlanmis kareyi paylasir;
+    FPS limiti dolmamis veya ack kuyrugu dolu istemciler bu kareyi atlar.
+    """
+    now = time.time() if now is None else now
+    packets = {}
+    for ctrl in stream_clients.clients('ws'):
+        if not ctrl.ready_to_send(now):
+            continue
+        quality, size, _ = ctrl.settings()
+        key = (min(quality, config.WS_STREAM_QUALITY), size)
+        if key not in packets:
+            entry = hub.get('detection', key[0], size, timeout=0)
+            if entry is None:
+                packets[key] = None
+            elif config.WS_BINARY_FRAMES:
+                # Ham JPEG binary ek olarak gider: base64 (%33) ve JSON maliyeti yok
+                packets[key] = (entry.seq, 'ws_frame_bin', pack_ws_frame('detection', entry))
+            else:
+                packets[key] = (entry.seq, 'ws_frame', {'image': entry.b64, 'type': 'detection', 'seq': entry.seq})
+        packet = packets[key]
+        if packet is None or packet[0] == ctrl.last_seq:
+            continue
+        seq, event, payload = packet
+        socketio.emit(event, payload, to=ctrl.client_id)
+        ctrl.on_sent(seq, now)
+
+
 def ws_stream_loop():
-    """Base64 kodlanmış frameleri WebSocket üzerinden gönderir (Alternatif Stream)"""
-    interval = 1.0 / config.STREAM_FPS
+    """Detection karelerini WebSocket izleyicilerine gönderir (Alternatif Stream)"""
+    hub = get_hub(buffer)
+    last_seq = 0
     while True:
         try:
-            # Şimdilik sadece detection stream'ini gönderiyoruz
-            frame_b64 = get_base64_frame(buffer, stream_type='detection', quality=config.WS_STREAM_QUALITY)
-            if frame_b64:
-                socketio.emit('ws_frame', {'image': frame_b64, 'type': 'detection'})
-            socketio.sleep(interval)
+            # Yeni kare gelene kadar bekle (polling yok), sonra izleyicilere dagit
+            seq = buffer.wait_for('detection', last_seq, timeout=1.0)
+            if seq is not None:
+                last_seq = seq
+                _send_ws_frames(hub)
+            socketio.sleep(0)
         except Exception as e:
             socketio.sleep(0.1)
 
+# -- Sutunlu arsiv --
+def archive_loop():
+    """Yeni tespitleri periyodik olarak gun bazli arsive sikistirir"""
+    while True:
+        try:
+            eventlet.tpool.execute(archive.compact, CSV_LOG_FILE, str(config.DB_PATH), direct=True)
+        except Exception as e:
+            print(f"Arsiv hatasi: {e}")
+        socketio.sleep(config.ARCHIVE_COMPACT_INTERVAL)
+
+
 # -- Stats emitter --
 def stats_loop():
     while True:
-        stats = get_stats()
-        stats['fps'] = round(buffer.fps, 1)
-        stats['detections'] = buffer.count
-        stats['gps'] = gps_state.get_dict()
-        confs = [d[4] for d in buffer.detections]
-        stats['confidence'] = max(confs) if confs else 0.0
-        socketio.emit('stats', stats)
+        socketio.emit('stats', _build_stats())
         socketio.sleep(1)
 
 
@@ -404,6 +700,20 @@ def main():
     # Arka plan CSV loglama thread'i
     socketio.start_background_task(csv_logger_thread)
 
+    # Arka plan SpatiaLite yazicisi
+    socketio.start_background_task(spatial_writer.run)
+
+    # Arka plan JPEG yazicilari (thumbnail / snapshot)
+    for _ in range(config.IMAGE_WRITER_WORKERS):
+        socketio.start_background_task(image_writer.run)
+
+    # Webhook worker'lari (keep-alive gonderim + yeniden deneme kuyrugu)
+    for _ in range(config.WEBHOOK_WORKERS):
+        socketio.start_background_task(webhook_notifier.run)
+
+    # Analiz arsivi (detections/archive)
+    socketio.start_background_task(archive_loop)
+
     print(f"http://0.0.0.0:{config.DASHBOARD_PORT}")
     print("=" * 40)
 
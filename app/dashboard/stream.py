@@ -3,11 +3,22 @@ import threading
 import time
 import cv2
 import base64
+import struct
+from app.core import config
+from app.core.frame_ring import FrameRef
 
 class FrameBuffer:
-    """Thread-safe frame storage"""
+    """Thread-safe frame storage
+
+    Kareler kopyalanmadan saklanir. `raw` icin kameranin FrameRing referansi
+    tutulur; uzun sureli okuyucular `acquire()` ile kendi referansini almalidir.
+    Diger akislara verilen diziler buffer'a devredilmis sayilir, sonradan degistirilmemeli.
+    Her akisin kendi sira numarasi vardir; `wait_for()` yeni kareyi polling yapmadan bekler.
+    """
+    STREAMS = ('raw', 'clahe', 'detection')
+
     def __init__(self):
-        self.raw = None
+        self._raw_ref = None
         self.clahe = None
         self.detection = None
         self.lock = threading.Lock()
@@ -16,21 +27,39 @@ class FrameBuffer:
         self.last_conf = 0
         self.count = 0
         self.sequence = 0
+        self.sequences = dict.fromkeys(self.STREAMS, 0)
+        self._conds = {name: threading.Condition(self.lock) for name in self.STREAMS}
+
+    @property
+    def raw(self):
+        ref = self._raw_ref
+        return ref.frame if ref is not None else None
+
+    def _bump(self, stream_type):
+        self.sequences[stream_type] += 1
+        self._conds[stream_type].notify_all()
 
     def update(self, raw=None, clahe=None, detection=None, detections=None):
+        old_ref = None
         with self.lock:
             self.sequence += 1
             if raw is not None:
-                self.raw = raw.copy()
+                old_ref = self._raw_ref
+                self._raw_ref = raw.retain() if isinstance(raw, FrameRef) else FrameRef.detached(raw)
+                self._bump('raw')
             if clahe is not None:
-                self.clahe = clahe.copy()
+                self.clahe = clahe
+                self._bump('clahe')
             if detection is not None:
-                self.detection = detection.copy()
+                self.detection = detection
+                self._bump('detection')
             if detections is not None:
                 self.detections = detections
                 self.count = len(detections)
                 if detections:
                     self.last_conf = max(d[4] for d in detections)
+        if old_ref is not None:
+            old_ref.release()
 
     def get(self, stream_type):
         with self.lock:
@@ -41,70 +70,212 @@ class FrameBuffer:
             else:
                 return self.detection
 
+    def acquire(self, stream_type):
+        """Akisin son karesine referans (FrameRef) dondur, isi bitince release() edilmeli"""
+        with self.lock:
+            return self._acquire(stream_type)
 
-def generate_mjpeg(buffer, stream_type='detection', target_fps=15):
-    """MJPEG stream generator"""
-    interval = 1.0 / target_fps
-    last_time = 0
-    last_sequence = -1
-    last_jpeg_bytes = None
-
-    while True:
-        now = time.time()
-        if now - last_time < interval:
-            time.sleep(0.01)
-            continue
+    def acquire_with_seq(self, stream_type):
+        """(akis sira numarasi, FrameRef veya None) - ikisi ayni anda okunur"""
+        with self.lock:
+            return self.sequences.get(stream_type, 0), self._acquire(stream_type)
 
-        frame = buffer.get(stream_type)
+    def _acquire(self, stream_type):
+        if stream_type == 'raw':
+            return self._raw_ref.retain() if self._raw_ref is not None else None
+        frame = self.clahe if stream_type == 'clahe' else self.detection
         if frame is None:
-            time.sleep(0.05)
-            continue
+            return None
+        return FrameRef.detached(frame, self.sequence)
 
-        current_sequence = buffer.sequence
-        if current_sequence == last_sequence and last_jpeg_bytes is not None:
-            yield last_jpeg_bytes
-            last_time = now
-            continue
+    def wait_for(self, stream_type, after_seq, timeout=None):
+        """Akista `after_seq`'ten yeni bir kare olana kadar bekle.
 
-        last_sequence = current_sequence
+        Yeni sira numarasini, zaman asiminda None dondurur.
+        """
+        cond = self._conds[stream_type]
+        with cond:
+            cond.wait_for(lambda: self.sequences[stream_type] > after_seq, timeout)
+            seq = self.sequences[stream_type]
+        return seq if seq > after_seq else None
 
-        # Kucuk streamler icin resize
-        if stream_type in ['raw', 'clahe']:
-            frame = cv2.resize(frame, (320, 240))
 
-        quality = 60 if stream_type != 'detection' else 70
-        _, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+class JpegFrame:
+    """Bir kez kodlanmis JPEG; MJPEG parcasi ve base64 hali ilk istekte bir kez uretilir"""
+    __slots__ = ('seq', 'jpeg', '_part', '_b64')
 
-        last_jpeg_bytes = (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + jpg.tobytes() + b'\r\n')
+    def __init__(self, seq, jpeg):
+        self.seq = seq
+        self.jpeg = jpeg
+        self._part = None
+        self._b64 = None
 
-        yield last_jpeg_bytes
-        last_time = now
+    @property
+    def part(self):
+        if self._part is None:
+            self._part = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + self.jpeg + b'\r\n'
+        return self._part
 
+    @property
+    def b64(self):
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.jpeg).decode('utf-8')
+        return self._b64
 
-# Cache for base64 encoded frames to avoid re-encoding the same frame multiple times.
-_base64_cache = {}
 
-def get_base64_frame(buffer, stream_type='detection', quality=50):
-    """WebSocket üzerinden gönderim için frame'i base64 string yapar"""
-    frame = buffer.get(stream_type)
-    if frame is None:
-        return None
+class JpegHub:
+    """(stream_type, quality, size) basina tek encoder.
+
+    Yeni kare geldiginde bekleyen tum izleyiciler Condition ile uyanir; ilk uyanan
+    kareyi kodlar, digerleri ayni anahtar kilidinde bekleyip hazir byte'lari alir.
+    Izleyici basina maliyet bir kilit + yield'dir; izleyici yoksa hic kodlama yapilmaz.
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._cache = {}
+        self.encodes = 0
+        self.hits = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, stream_type, quality, size=None, after_seq=0, timeout=None):
+        """`after_seq`'ten yeni kareyi JpegFrame olarak dondur (zaman asimi / kare yoksa None).
+
+        Sira numarasi 0 henuz kare gelmedigi anlamina gelir.
+        """
+        if self.buffer.wait_for(stream_type, after_seq, timeout) is None:
+            return None
+
+        key = (stream_type, quality, size)
+        with self._key_lock(key):
+            seq, ref = self.buffer.acquire_with_seq(stream_type)
+            entry = self._cache.get(key)
+            if entry is not None and entry.seq == seq:
+                if ref is not None:
+                    ref.release()
+                self.hits += 1
+                return entry
+            if ref is None:
+                return None
+
+            with ref:
+                frame = ref.frame
+                if size is not None:
+                    frame = cv2.resize(frame, size)
+                _, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+
+            entry = JpegFrame(seq, jpg.tobytes())
+            self._cache[key] = entry
+            self.encodes += 1
+            return entry
+
+    def stats(self):
+        return {'encodes': self.encodes, 'hits': self.hits, 'encoders': len(self._cache)}
 
-    current_sequence = buffer.sequence
-    cache_key = f"{id(buffer)}_{stream_type}_{quality}"
 
-    if cache_key in _base64_cache:
-        cached_seq, cached_b64 = _base64_cache[cache_key]
-        if cached_seq == current_sequence:
-            return cached_b64
+_hubs = {}
 
-    # Need to generate new base64
+def get_hub(buffer):
+    """Buffer'a ait paylasilan JpegHub"""
+    hub = _hubs.get(id(buffer))
+    if hub is None or hub.buffer is not buffer:
+        hub = _hubs[id(buffer)] = JpegHub(buffer)
+    return hub
+
+
+def stream_settings(stream_type):
+    """Akis turune gore varsayilan (quality, size)"""
     if stream_type in ['raw', 'clahe']:
-        frame = cv2.resize(frame, (320, 240))
+        return 60, (320, 240)  # Kucuk streamler icin resize
+    return 70, None
+
+
+def stream_levels(stream_type, levels=None):
+    """Uyarlanabilir seviyeler, akis turunun varsayilanini asmayacak sekilde kirpilmis.
+
+    raw/clahe gibi kucuk akislarda hicbir seviye stream_settings()'ten buyuk boyut
+    veya yuksek kalite istemez; kirpma sonrasi ayni kalan seviyeler birlesir.
+    """
+    max_quality, max_size = stream_settings(stream_type)
+    capped = []
+    for quality, size, fps in levels or config.STREAM_LEVELS:
+        quality = min(quality, max_quality)
+        if max_size is not None and (size is None or size[0] * size[1] > max_size[0] * max_size[1]):
+            size = max_size
+        if capped and capped[-1][:2] == (quality, size):
+            capped[-1] = (quality, size, max(fps, capped[-1][2]))
+        else:
+            capped.append((quality, size, fps))
+    return capped
+
+
+def generate_mjpeg(buffer, stream_type='detection', target_fps=15, controller=None):
+    """MJPEG stream generator (kodlama JpegHub ile tum izleyiciler arasinda paylasilir).
+
+    `controller` (AdaptiveController, seviyeleri stream_levels() ile) verilirse
+    kalite/boyut/FPS her karede ondan alinir ve chunk'in soket'e yazilma suresi
+    gecikme ornegi olarak bildirilir.
+    """
+    hub = get_hub(buffer)
+    quality, size = stream_settings(stream_type)
+    interval = 1.0 / target_fps
+    last_seq = 0
+    last_part = None
+
+    while True:
+        start = time.time()
+        if controller is not None:
+            quality, size, fps = controller.settings()
+            interval = 1.0 / fps
+        entry = hub.get(stream_type, quality, size, after_seq=last_seq, timeout=1.0)
+        if entry is None:
+            # Yeni kare yok: kopan istemciyi fark etmek icin son kareyi tekrar gonder
+            if last_part is not None:
+                yield last_part
+            continue
+
+        last_seq = entry.seq
+        last_part = entry.part
+        sent_at = time.time()
+        yield last_part  # WSGI sunucusu chunk'i yazana kadar burada kalinir
+        if controller is not None:
+            controller.observe(time.time() - sent_at)
+
+        delay = interval - (time.time() - start)
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Binary WebSocket cercevesi: [surum u8][akis u8][sira u32, big-endian] + JPEG byte'lari
+WS_FRAME_VERSION = 1
+WS_STREAM_CODES = {'raw': 0, 'clahe': 1, 'detection': 2}
+_WS_HEADER = struct.Struct('!BBI')
+
 
-    _, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
-    b64_str = base64.b64encode(jpg).decode('utf-8')
+def pack_ws_frame(stream_type, entry):
+    """JpegFrame'i binary WebSocket paketine cevir (base64/JSON yok)"""
+    header = _WS_HEADER.pack(WS_FRAME_VERSION, WS_STREAM_CODES[stream_type], entry.seq & 0xFFFFFFFF)
+    return header + entry.jpeg
 
-    _base64_cache[cache_key] = (current_sequence, b64_str)
-    return b64_str
+
+def unpack_ws_frame(packet):
+    """Binary paketi (surum, akis, sira, jpeg) olarak coz"""
+    version, code, seq = _WS_HEADER.unpack_from(packet)
+    if version != WS_FRAME_VERSION:
+        raise ValueError(f"Desteklenmeyen frame surumu: {version}")
+    stream_type = next(name for name, c in WS_STREAM_CODES.items() if c == code)
+    return version, stream_type, seq, bytes(packet[_WS_HEADER.size:])
+
+
+def get_base64_frame(buffer, stream_type='detection', quality=50):
+    """WebSocket üzerinden gönderim için frame'i base64 string yapar"""
+    _, size = stream_settings(stream_type)
+    entry = get_hub(buffer).get(stream_type, quality, size, timeout=0)
+    return entry.b64 if entry is not None else None
@@ -0,0 +1,312 @@
+"""Columnar detection archive for season-scale analytics.
+
+`compact()` rolls new rows from `spatial_log` (or the CSV log when the DB has
+no detections) into compressed column files partitioned by UTC date:
+
+    ARCHIVE_DIR/date=2026-06-01/part-00001.npz   (or .parquet with pyarrow)
+
+Each part holds the columns in COLUMNS as typed arrays. A JSON state file keeps
+the source (db/csv) and the last archived DB id / CSV byte offset, so every run
+only reads new rows; partitions with more than ARCHIVE_MAX_PARTS parts are
+merged into one. Like the export cache, the archive is rebuilt from scratch
+when the source changes (e.g. the first GPS fix lands in the DB), so rows are
+never counted from both sources; from then on it mirrors `spatial_log`, i.e.
+detections with a GPS fix, the same set the exports contain.
+
+`load()` prunes partitions by date and filters with NumPy masks; the
+aggregate helpers below work on the returned column dict.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.core import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+COLUMNS = {
+    'id': np.int64,            # DB id, CSV satirlari icin -1
+    'timestamp': np.float64,
+    'confidence': np.float32,
+    'latitude': np.float64,    # GPS yoksa NaN
+    'longitude': np.float64,
+    'species': np.str_,
+}
+STATE_FILE = '_state.json'
+DEFAULT_SPECIES = 'Lagocephalus sceleratus'
+
+_lock = threading.Lock()
+
+
+def _float(value, default=np.nan):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _partition(ts):
+    return 'date=' + datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _to_columns(records):
+    """(id, ts, conf, lat, lon, species) tuples -> typed column arrays"""
+    cols = list(zip(*records)) if records else [()] * len(COLUMNS)
+    return {name: np.asarray(values, dtype=dtype) for (name, dtype), values in zip(COLUMNS.items(), cols)}
+
+
+# -- Part files --
+def _write_part(directory, columns):
+    os.makedirs(directory, exist_ok=True)
+    ext = '.parquet' if pq is not None else '.npz'
+    n = 1 + sum(1 for name in os.listdir(directory) if name.startswith('part-'))
+    path = os.path.join(directory, f"part-{n:05d}{ext}")
+    tmp = path + '.tmp'
+    if pq is not None:
+        pq.write_table(pa.table(columns), tmp, compression='zstd')
+    else:
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **columns)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_part(path, columns=None):
+    names = list(columns or COLUMNS)
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError(f"{path} icin pyarrow gerekli")
+        table = pq.read_table(path, columns=names)
+        return {name: table.column(name).to_numpy().astype(COLUMNS[name]) for name in names}
+    with np.load(path) as data:
+        return {name: data[name] for name in names}
+
+
+def _parts(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith('part-') and not name.endswith('.tmp'))
+
+
+def _concat(chunks, names):
+    if not chunks:
+        return {name: np.asarray([], dtype=COLUMNS[name]) for name in names}
+    return {name: np.concatenate([c[name] for c in chunks]) for name in names}
+
+
+def _merge_partition(directory):
+    """Partition'daki parcalari zaman sirali tek parcaya birlestir"""
+    parts = _parts(directory)
+    merged = _concat([_read_part(p) for p in parts], COLUMNS)
+    order = np.lexsort((merged['id'], merged['timestamp']))
+    merged = {name: values[order] for name, values in merged.items()}
+    ext = '.parquet' if pq is not None else '.npz'
+    tmp = os.path.join(directory, f"merged{ext}.tmp")
+    if pq is not None:
+        pq.write_table(pa.table(merged), tmp, compression='zstd')
+    else:
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **merged)
+    # Once birlesik parca yerine konur: arada cokulurse gun kaybolmaz (en kotu ihtimal tekrar)
+    target = os.path.join(directory, f"part-00001{ext}")
+    os.replace(tmp, target)
+    for p in parts:
+        if p != target:
+            os.remove(p)
+
+
+# -- Compaction --
+def _load_state(archive_dir):
+    try:
+        with open(os.path.join(archive_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _new_state()
+
+
+def _new_state(source=None):
+    return {'source': source, 'last_id': 0, 'csv_offset': 0, 'csv_inode': None, 'rows': 0}
+
+
+def _save_state(archive_dir, state):
+    path = os.path.join(archive_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def _reset(archive_dir, source):
+    """Kaynak degisti: tum partition'lari sil, imlecleri sifirla"""
+    for day in os.listdir(archive_dir):
+        if day.startswith('date='):
+            shutil.rmtree(os.path.join(archive_dir, day))
+    state = _new_state(source)
+    _save_state(archive_dir, state)
+    return state
+
+
+def _new_records(state, csv_path, db_path, pool=None):
+    """State'teki imlecten sonraki kayitlar; imlec yerinde ilerletilir"""
+    from app.export import formats
+    from app.db import csvlog
+
+    if state['source'] == 'db':
+        for row in formats._iter_detections_db(db_path, after_id=state['last_id'], pool=pool):
+            state['last_id'] = row['id']
+            yield (row['id'], _float(row.get('timestamp')), _float(row.get('confidence'), 0.0),
+                   _float(row.get('latitude')), _float(row.get('longitude')),
+                   row.get('species') or DEFAULT_SPECIES)
+        return
+
+    # Log donmusse once eski segmentin kalani okunur; arsiv hicbir zaman silinmez
+    cursor = {'inode': state.get('csv_inode'), 'offset': state['csv_offset']}
+    for row in csvlog.read_new(csv_path, cursor):
+        state['csv_inode'], state['csv_offset'] = cursor['inode'], cursor['offset']
+        ts = formats._csv_row_time(row)
+        if ts is None:
+            continue
+        yield (-1, ts, _float(row.get('Confidence'), 0.0), np.nan, np.nan, DEFAULT_SPECIES)
+    state['csv_inode'], state['csv_offset'] = cursor['inode'], cursor['offset']
+
+
+def compact(csv_path, db_path=None, archive_dir=None, max_parts=None, direct=False):
+    """Archive rows added since the last run. Returns the number of new rows.
+
+    direct=True reads the DB through a private connection instead of the shared
+    (green) pool; use it when calling from an eventlet.tpool thread.
+    """
+    from app.db.pool import DirectConnection
+    archive_dir = str(archive_dir or config.ARCHIVE_DIR)
+    if direct:
+        with DirectConnection(db_path) as pool:
+            return _compact(csv_path, db_path, archive_dir, max_parts, pool)
+    return _compact(csv_path, db_path, archive_dir, max_parts, None)
+
+
+def _compact(csv_path, db_path, archive_dir, max_parts, pool):
+    from app.export.cache import db_last_id
+    max_parts = max_parts or config.ARCHIVE_MAX_PARTS
+    with _lock:
+        os.makedirs(archive_dir, exist_ok=True)
+        state = _load_state(archive_dir)
+        source = 'db' if db_last_id(db_path, pool=pool) is not None else 'csv'
+        if state.get('source') != source:
+            if state.get('source') is not None:
+                print(f"Arsiv: kaynak {state['source']} -> {source}, yeniden olusturuluyor")
+            state = _reset(archive_dir, source)
+        by_day = {}
+        for record in _new_records(state, csv_path, db_path, pool):
+            if np.isnan(record[1]):
+                continue
+            by_day.setdefault(_partition(record[1]), []).append(record)
+
+        for day, records in sorted(by_day.items()):
+            directory = os.path.join(archive_dir, day)
+            _write_part(directory, _to_columns(records))
+            if len(_parts(directory)) > max_parts:
+                _merge_partition(directory)
+        added = sum(len(r) for r in by_day.values())
+        state['rows'] += added
+        _save_state(archive_dir, state)
+    if added:
+        print(f"Arsiv: {added} kayit {len(by_day)} gune eklendi")
+    return added
+
+
+# -- Read API --
+def load(start=None, end=None, columns=None, species=None, min_conf=None, bbox=None, archive_dir=None):
+    """Archived detections as a dict of column arrays.
+
+    start/end are Unix times (inclusive/exclusive); bbox is
+    (min_lat, min_lon, max_lat, max_lon). Partitions outside the time range
+    are skipped without being opened.
+    """
+    archive_dir = str(archive_dir or config.ARCHIVE_DIR)
+    names = list(columns or COLUMNS)
+    needed = set(names) | {'timestamp'}
+    if species is not None:
+        needed.add('species')
+    if min_conf is not None:
+        needed.add('confidence')
+    if bbox is not None:
+        needed |= {'latitude', 'longitude'}
+    needed = [name for name in COLUMNS if name in needed]
+
+    first_day = _partition(start) if start is not None else None
+    last_day = _partition(end) if end is not None else None
+    chunks = []
+    if os.path.isdir(archive_dir):
+        for day in sorted(os.listdir(archive_dir)):
+            if not day.startswith('date='):
+                continue
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            chunks.extend(_read_part(p, needed) for p in _parts(os.path.join(archive_dir, day)))
+    data = _concat(chunks, needed)
+
+    mask = np.ones(len(data['timestamp']), dtype=bool)
+    if start is not None:
+        mask &= data['timestamp'] >= start
+    if end is not None:
+        mask &= data['timestamp'] < end
+    if species is not None:
+        mask &= data['species'] == species
+    if min_conf is not None:
+        mask &= data['confidence'] >= min_conf
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        lat, lon = data['latitude'], data['longitude']
+        mask &= (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return {name: data[name][mask] for name in names}
+
+
+def confidence_histogram(data, bins=10):
+    """(counts, edges) of the confidence column over [0, 1]"""
+    counts, edges = np.histogram(data['confidence'], bins=bins, range=(0.0, 1.0))
+    return counts, edges
+
+
+def hourly_counts(data):
+    """Detections per UTC hour of day (24 counts)"""
+    hours = (data['timestamp'] // 3600 % 24).astype(np.int64)
+    return np.bincount(hours, minlength=24)
+
+
+def density(data, cell_deg=0.01, top=None):
+    """Detection counts per lat/lon grid cell, busiest first.
+
+    Returns a list of (lat, lon, count) with lat/lon at the cell centre.
+    """
+    lat, lon = data['latitude'], data['longitude']
+    ok = ~(np.isnan(lat) | np.isnan(lon))
+    if not ok.any():
+        return []
+    cells = np.stack([np.floor(lat[ok] / cell_deg), np.floor(lon[ok] / cell_deg)], axis=1).astype(np.int64)
+    uniq, counts = np.unique(cells, axis=0, return_counts=True)
+    order = np.argsort(-counts, kind='stable')[:top]
+    return [((uniq[i, 0] + 0.5) * cell_deg, (uniq[i, 1] + 0.5) * cell_deg, int(counts[i])) for i in order]
+
+
+def summary(start=None, end=None, species=None, min_conf=None, bbox=None, cell_deg=0.01, top=50,
+            archive_dir=None):
+    """Dashboard/API summary: totals, confidence histogram, hourly pattern, densest cells"""
+    data = load(start, end, columns=['timestamp', 'confidence', 'latitude', 'longitude'],
+                species=species, min_conf=min_conf, bbox=bbox, archive_dir=archive_dir)
+    counts, edges = confidence_histogram(data)
+    total = len(data['timestamp'])
+    return {
+        'total': total,
+        'first_ts': float(data['timestamp'].min()) if total else None,
+        'last_ts': float(data['timestamp'].max()) if total else None,
+        'mean_conf': round(float(data['confidence'].mean()), 4) if total else None,
+        'confidence_hist': {'edges': [round(float(e), 2) for e in edges], 'counts': counts.tolist()},
+        'hourly_utc': hourly_counts(data).tolist(),
+        'density': [{'lat': lat, 'lon': lon, 'count': c} for lat, lon, c in density(data, cell_deg, top)],
+    }
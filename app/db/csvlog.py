@@ -0,0 +1,286 @@
+"""Buffered, rotating CSV detection log shared by app.main and the dashboard.
+
+`CsvLogger` keeps the log file open and buffers rows. The buffer is written
+when it holds `flush_rows` rows or when `flush_interval` seconds have passed
+since the first buffered row. The file is fsync'ed at most every
+`fsync_interval` seconds (None: never).
+
+When the file reaches `max_bytes` or the day changes, it is renamed to a
+segment next to it:
+
+    detections_log.csv                    <- current file
+    detections_log.20260601-101500.csv    <- rotated segments
+    detections_log.index.json             <- one entry per segment
+
+Each index entry holds the file name, its first/last write time, row count,
+size and inode. Readers use it to skip segments that are older than a
+`since` time, and to finish reading a segment that was rotated away under
+their cursor.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from app.core import config
+
+_DEFAULT = object()
+
+HEADER = ["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"]
+
+
+def ensure_header(path):
+    """Create the log with its header row if it does not exist yet"""
+    if not os.path.exists(path):
+        with open(path, 'w', newline='') as f:
+            csv.writer(f).writerow(HEADER)
+
+
+def index_path(path):
+    base, _ = os.path.splitext(path)
+    return base + '.index.json'
+
+
+def read_index(path):
+    """Rotated segment entries of the log at `path`, oldest first"""
+    try:
+        with open(index_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def segment_path(path, entry):
+    return os.path.join(os.path.dirname(path), entry['file'])
+
+
+def log_files(path, since=None):
+    """Segments that may hold rows newer than `since`, then the current file"""
+    files = [segment_path(path, e) for e in read_index(path)
+             if since is None or e['last_ts'] > since]
+    files = [f for f in files if os.path.exists(f)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_from(path, offset, pos):
+    """Rows of the CSV at `path` starting at byte `offset`; complete lines only.
+
+    The byte position after the last yielded row is stored in pos['offset'].
+    """
+    pos['offset'] = offset
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+        if not header_line.endswith(b'\n'):
+            return
+        header = next(csv.reader([header_line.decode('utf-8')]))
+        offset = max(offset, f.tell())
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # Yazilmakta olan satir bir sonraki sefere kalir
+            offset += len(line)
+            pos['offset'] = offset
+            for values in csv.reader([line.decode('utf-8')]):
+                yield dict(zip(header, values))
+
+
+def find_segment(path, inode):
+    """Index entry of the segment that used to be the current file (by inode)"""
+    for entry in read_index(path):
+        if entry.get('inode') == inode:
+            return entry
+    return None
+
+
+def read_new(path, cursor):
+    """Rows appended since `cursor` ({'inode', 'offset'}), across rotations.
+
+    An empty cursor reads every segment and the current file. If the current
+    file was rotated since the cursor was taken, the rest of that segment is
+    read first. The cursor is advanced in place as rows are yielded.
+    """
+    try:
+        inode = os.stat(path).st_ino
+    except OSError:
+        inode = None
+    if cursor.get('inode') != inode:
+        entries = read_index(path)
+        if cursor.get('inode') is None:
+            pending = [(e, 0) for e in entries]
+        else:
+            inodes = [e.get('inode') for e in entries]
+            i = inodes.index(cursor['inode']) if cursor['inode'] in inodes else len(entries)
+            pending = [(e, cursor.get('offset', 0) if j == 0 else 0) for j, e in enumerate(entries[i:])]
+        for entry, offset in pending:
+            yield from read_from(segment_path(path, entry), offset, {})
+        cursor['inode'], cursor['offset'] = inode, 0
+    if inode is None:
+        return
+    pos = {}
+    for row in read_from(path, cursor['offset'], pos):
+        cursor['offset'] = pos['offset']
+        yield row
+    cursor['offset'] = pos.get('offset', cursor['offset'])
+
+
+class CsvLogger:
+    """Append-only detection log with batched writes and size/day rotation"""
+    def __init__(self, path, max_bytes=None, rotate_daily=None, flush_rows=None,
+                 flush_interval=None, fsync_interval=_DEFAULT, clock=time.time):
+        self.path = str(path)
+        self.max_bytes = config.CSV_LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.rotate_daily = config.CSV_LOG_ROTATE_DAILY if rotate_daily is None else rotate_daily
+        self.flush_rows = flush_rows or config.CSV_LOG_FLUSH_ROWS
+        self.flush_interval = config.CSV_LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.fsync_interval = config.CSV_LOG_FSYNC_INTERVAL if fsync_interval is _DEFAULT else fsync_interval
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._file = None
+        self._writer = None
+        self._buffer = []
+        self._buffered_since = None
+        self._last_fsync = clock()
+        self._first_ts = None
+        self._last_ts = None
+        self._rows = 0
+
+        self.written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.rotations = 0
+
+    def _open(self):
+        ensure_header(self.path)
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        st = os.fstat(self._file.fileno())
+        if st.st_size > len(','.join(HEADER)) + 2:
+            # Onceki calismadan kalan dosya: zamanlar dosya tarihinden
+            self._first_ts = self._first_ts or st.st_mtime
+            self._last_ts = st.st_mtime
+
+    def write_rows(self, rows):
+        """Buffer rows; writes them out if the flush policy says so"""
+        with self._lock:
+            if not rows:
+                return
+            now = self.clock()
+            if self._buffered_since is None:
+                self._buffered_since = now
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.flush_rows or now - self._buffered_since >= self.flush_interval:
+                self.flush()
+
+    def due(self):
+        """True if buffered rows are older than flush_interval"""
+        return self._buffered_since is not None and self.clock() - self._buffered_since >= self.flush_interval
+
+    def flush(self):
+        """Write buffered rows, fsync if due and rotate if the segment is full"""
+        with self._lock:
+            if not self._buffer:
+                return
+            now = self.clock()
+            if self._file is None:
+                self._open()
+            if self.rotate_daily and self._last_ts is not None and _day(self._last_ts) != _day(now):
+                self.rotate()
+                self._open()
+            self._writer.writerows(self._buffer)
+            self._file.flush()
+            self._first_ts = self._first_ts or now
+            self._last_ts = now
+            self._rows += len(self._buffer)
+            self.written += len(self._buffer)
+            self.flushes += 1
+            self._buffer = []
+            self._buffered_since = None
+
+            if self.fsync_interval is not None and now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+                self.fsyncs += 1
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self.rotate()
+
+    def rotate(self):
+        """Move the current file to a timestamped segment and index it"""
+        with self._lock:
+            if self._file is None:
+                if not os.path.exists(self.path):
+                    return
+                self._open()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            st = os.fstat(self._file.fileno())
+            self._file.close()
+            self._file = self._writer = None
+
+            base, ext = os.path.splitext(self.path)
+            stamp = datetime.fromtimestamp(self._first_ts or self.clock()).strftime('%Y%m%d-%H%M%S')
+            target, n = f"{base}.{stamp}{ext}", 1
+            while os.path.exists(target):
+                n += 1
+                target = f"{base}.{stamp}-{n}{ext}"
+            os.rename(self.path, target)
+
+            entries = read_index(self.path)
+            entries.append({
+                'file': os.path.basename(target),
+                'first_ts': self._first_ts, 'last_ts': self._last_ts or st.st_mtime,
+                'rows': self._rows, 'bytes': st.st_size, 'inode': st.st_ino,
+            })
+            tmp = index_path(self.path) + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(entries, f, indent=1)
+            os.replace(tmp, index_path(self.path))
+            ensure_header(self.path)
+            self._first_ts = self._last_ts = None
+            self._rows = 0
+            self.rotations += 1
+            print(f"CSV log dondu: {os.path.basename(target)}")
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = self._writer = None
+
+    def stats(self):
+        return {
+            'path': self.path, 'written': self.written, 'buffered': len(self._buffer),
+            'flushes': self.flushes, 'fsyncs': self.fsyncs, 'rotations': self.rotations,
+        }
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts).date()
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(path, **kwargs):
+    """Process-wide logger for `path` (one open file per log)"""
+    key = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(key)
+        if logger is None:
+            logger = _loggers[key] = CsvLogger(path, **kwargs)
+        return logger
+
+
+def close_loggers():
+    with _loggers_lock:
+        for logger in _loggers.values():
+            logger.close()
+        _loggers.clear()
@@ -0,0 +1,244 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from app.core import config
+
+# Probed in this order; the first name that loads is reused for every later connection
+SPATIALITE_EXTENSIONS = ('mod_spatialite', 'libspatialite.so', 'mod_spatialite.dylib', 'mod_spatialite.dll')
+
+_UNPROBED = object()
+_extension = _UNPROBED  # Extension name that loaded, or None if none did
+_extension_lock = threading.Lock()
+
+
+def load_spatialite(conn):
+    """Load SpatiaLite into `conn`, probing the extension names only once per process.
+
+    Returns the extension name that is loaded, or None if SpatiaLite is unavailable.
+    """
+    global _extension
+    try:
+        conn.enable_load_extension(True)
+    except AttributeError:
+        # Python built without extension loading support
+        return None
+    try:
+        if _extension is _UNPROBED:
+            with _extension_lock:
+                if _extension is _UNPROBED:
+                    _extension = _probe(conn)
+        elif _extension is not None:
+            conn.execute(f"SELECT load_extension('{_extension}')")
+    finally:
+        conn.enable_load_extension(False)
+    return _extension
+
+
+def _probe(conn):
+    for ext in SPATIALITE_EXTENSIONS:
+        try:
+            conn.execute(f"SELECT load_extension('{ext}')")
+            return ext
+        except sqlite3.OperationalError:
+            pass
+    print("WARNING: Could not load SpatiaLite extension. Spatial indexing will not work.")
+    return None
+
+
+def reset_extension_cache():
+    """Forget the cached extension name (next connection probes again)"""
+    global _extension
+    with _extension_lock:
+        _extension = _UNPROBED
+
+
+class ReadPool:
+    """Bounded pool of read-only SQLite connections with SpatiaLite preloaded.
+
+    Connections are checked out per query rather than bound to a thread: under
+    eventlet every request runs in its own green thread, so thread-local
+    connections would never be reused. Connections are opened lazily up to
+    `size`; when all are busy, `connection()` waits up to `timeout` seconds.
+    """
+    def __init__(self, db_path=None, size=None, timeout=None, connect=None):
+        self.db_path = str(db_path or config.DB_PATH)
+        self.size = size or config.DB_POOL_SIZE
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self.connect = connect or self._connect
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._in_use = 0
+
+        self.checkouts = 0
+        self.waits = 0
+        self.discarded = 0
+        self._wait_total = 0.0
+        self._hold_total = 0.0
+        self._last_hold = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        load_spatialite(conn)
+        conn.execute("PRAGMA query_only=ON")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait(), 0.0
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self.connect(), 0.0
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        start = time.time()
+        self.waits += 1
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free database connection after {self.timeout}s") from None
+        return conn, time.time() - start
+
+    def _discard(self, conn):
+        self.discarded += 1
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for one read; it goes back to the pool afterwards"""
+        conn, waited = self._checkout()
+        self.checkouts += 1
+        self._wait_total += waited
+        self._in_use += 1
+        start = time.time()
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Query errors leave the connection usable; anything else might not
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._in_use -= 1
+                self._discard(conn)
+                raise
+            self._release(conn, start)
+            raise
+        except BaseException:
+            self._in_use -= 1
+            self._discard(conn)
+            raise
+        else:
+            self._release(conn, start)
+
+    def _release(self, conn, start):
+        held = time.time() - start
+        self._hold_total += held
+        self._last_hold = held
+        self._in_use -= 1
+        self._idle.put(conn)
+
+    def close(self):
+        """Close idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        n = self.checkouts or 1
+        return {
+            'path': self.db_path,
+            'size': self.size,
+            'open': self._opened,
+            'in_use': self._in_use,
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'discarded': self.discarded,
+            'avg_wait_ms': round(self._wait_total / n * 1000, 2),
+            'avg_query_ms': round(self._hold_total / n * 1000, 2),
+            'last_query_ms': round(self._last_hold * 1000, 2) if self._last_hold is not None else None,
+            'extension': None if _extension is _UNPROBED else _extension,
+        }
+
+
+class DirectConnection:
+    """One private read connection with the same `connection()` interface as ReadPool.
+
+    Under eventlet.monkey_patch() the pool's lock and idle queue are green objects,
+    which must not be used from eventlet.tpool threads: a contended wait there blocks
+    on a hub that never wakes it. Work handed to tpool opens one of these instead;
+    the connection is opened on first use and closed by close() / the with block.
+    """
+    def __init__(self, db_path=None, connect=None):
+        self.db_path = str(db_path or config.DB_PATH)
+        self.connect = connect or self._connect
+        self._conn = None
+
+    _connect = ReadPool._connect
+
+    @contextmanager
+    def connection(self):
+        if self._conn is None:
+            self._conn = self.connect()
+        try:
+            yield self._conn
+        except sqlite3.Error:
+            self._conn.rollback()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    """Shared pool for a database file (defaults to config.DB_PATH)"""
+    key = str(db_path or config.DB_PATH)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ReadPool(key)
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [p.stats() for p in pools]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close()
@@ -1,31 +1,14 @@
 import sqlite3
 from contextlib import contextmanager
 from app.core import config
+from app.db.pool import get_pool, load_spatialite
+from app.db import tiles
 
 def get_db_connection():
     """Create a thread-local database connection with SpatiaLite enabled"""
     conn = sqlite3.connect(config.DB_PATH, check_same_thread=False)
-    # Enable extension loading
-    conn.enable_load_extension(True)
-    
-    # Try different extension paths depending on the OS / sqlite build
-    try:
-        conn.execute("SELECT load_extension('mod_spatialite')")
-    except sqlite3.OperationalError:
-        try:
-            # Maybe linux format
-            conn.execute("SELECT load_extension('libspatialite.so')")
-        except sqlite3.OperationalError:
-            try:
-                # Maybe macos
-                conn.execute("SELECT load_extension('mod_spatialite.dylib')")
-            except sqlite3.OperationalError:
-                try:
-                    # Windows alternative
-                    conn.execute("SELECT load_extension('mod_spatialite.dll')")
-                except sqlite3.OperationalError:
-                    print("WARNING: Could not load SpatiaLite extension. Spatial indexing will not work.")
-    
+    # The extension name is probed once per process, later connections load it directly
+    load_spatialite(conn)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -39,6 +22,37 @@ def db_session():
         conn.commit()
         conn.close()
 
+# Sema goc adimlari: MIGRATIONS[i], user_version == i iken calisir ve surumu i+1 yapar.
+# Adimlar SQL metni ya da conn alan bir fonksiyon olabilir.
+# Yalnizca sona ekleyin; mevcut spatial_log.sqlite dosyalari init_db() sirasinda guncellenir.
+MIGRATIONS = [
+    # 1: Gecmis sorgulari icin siralama indeksleri (rowid dahil; keyset aramasi indeksten yapilir)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_spatial_log_timestamp ON spatial_log (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_spatial_log_species_ts ON spatial_log (species, timestamp)",
+    ],
+    # 2: Harita icin karo bazli sayim tablosu, mevcut kayitlardan doldurulur
+    [
+        tiles.CREATE_SQL,
+        tiles.backfill,
+    ],
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn):
+    """Bekleyen sema goclerini uygula. Uygulanan goc sayisini dondurur."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        with conn:
+            for step in MIGRATIONS[target - 1]:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {target}")
+        print(f"DB schema migrated to v{target}")
+    return max(0, SCHEMA_VERSION - version)
+
 def init_db():
     """Initialize SpatiaLite database and tables if they don't exist"""
     print(f"Initializing SpatiaLite database at {config.DB_PATH} ...")
@@ -68,6 +82,8 @@ def init_db():
             
             # Create a spatial index
             cursor.execute("SELECT CreateSpatialIndex('spatial_log', 'geom')")
+
+        migrate(conn)
             
     print("Database initialization successful.")
 
@@ -84,31 +100,67 @@ def insert_detection(species, confidence, lat, lon, timestamp):
             VALUES (?, ?, ?, ST_GeomFromText(?, 4326))
         '''
         cursor.execute(query, (species, confidence, timestamp, wkt_point))
+        if tiles.has_tiles(conn):
+            tiles.add(conn, [(confidence, timestamp, lon, lat)])
 
-def query_detections(limit=100):
-    """Son N tespiti döndür. Koordinatları okurken ST_X (lon) ve ST_Y (lat) kullanır."""
-    with db_session() as conn:
-        cursor = conn.cursor()
-        query = '''
-            SELECT id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude
-            FROM spatial_log
-            ORDER BY timestamp DESC
-            LIMIT ?
-        '''
-        cursor.execute(query, (limit,))
+def _keyset(after_timestamp, after_id, params):
+    """(timestamp, id) < (after_timestamp, after_id) — indeksli aralik + esitlikte id karsilastirmasi"""
+    if after_timestamp is None:
+        return ''
+    params += [after_timestamp, after_timestamp, after_id if after_id is not None else -1]
+    return 'AND timestamp <= ? AND (timestamp < ? OR id < ?)'
+
+def query_detections(limit=100, after_timestamp=None, after_id=None, species=None, pool=None):
+    """Son N tespiti döndür. Koordinatları okurken ST_X (lon) ve ST_Y (lat) kullanır.
+
+    Yeniden eskiye sıralıdır; sonraki sayfa için son satırın timestamp/id değerleri
+    after_timestamp/after_id olarak verilir (timestamp / species+timestamp indeksleri).
+    """
+    params = []
+    where = ''
+    if species is not None:
+        where = 'AND species = ?'
+        params.append(species)
+    keyset = _keyset(after_timestamp, after_id, params)
+    params.append(limit)
+    query = f'''
+        SELECT id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude
+        FROM spatial_log
+        WHERE 1 {where} {keyset}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    '''
+    with (pool or get_pool()).connection() as conn:
+        cursor = conn.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
-def query_detections_bbox(min_lat, min_lon, max_lat, max_lon):
-    """Bölgesel sorgu - Bounding box"""
-    with db_session() as conn:
-        cursor = conn.cursor()
-        # SpatiaLite BuildMbr / MbrWithin veya basit lat/lon
-        query = '''
-            SELECT id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude
-            FROM spatial_log
-            WHERE ST_Y(geom) BETWEEN ? AND ?
-              AND ST_X(geom) BETWEEN ? AND ?
-            ORDER BY timestamp DESC
-        '''
-        cursor.execute(query, (min_lat, max_lat, min_lon, max_lon))
+# R*Tree (CreateSpatialIndex) ile aday satirlar secilir; ST_X/ST_Y sadece adaylarda calisir.
+# R*Tree kutulari float32'ye disari dogru yuvarlar, kesin sinir kontrolu bu yuzden korunur.
+BBOX_SQL = '''
+    SELECT id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude
+    FROM spatial_log
+    WHERE ROWID IN (
+        SELECT pkid FROM idx_spatial_log_geom
+        WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+    )
+      AND ST_Y(geom) BETWEEN ? AND ?
+      AND ST_X(geom) BETWEEN ? AND ?
+      {keyset}
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+
+def query_detections_bbox(min_lat, min_lon, max_lat, max_lon, limit=None,
+                          after_timestamp=None, after_id=None, pool=None):
+    """Bölgesel sorgu - Bounding box (spatial index üzerinden, sayfalı).
+
+    Sonuçlar yeniden eskiye sıralıdır. Sonraki sayfa için son satırın timestamp/id
+    değerleri after_timestamp/after_id olarak verilir.
+    """
+    limit = limit or config.BBOX_PAGE_SIZE
+    params = [max_lon, min_lon, max_lat, min_lat, min_lat, max_lat, min_lon, max_lon]
+    keyset = _keyset(after_timestamp, after_id, params)
+    params.append(limit)
+    with (pool or get_pool()).connection() as conn:
+        cursor = conn.execute(BBOX_SQL.format(keyset=keyset), params)
         return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,116 @@
+"""Per-tile detection aggregates for the dashboard map.
+
+Every detection is counted into one slippy-map tile per zoom level
+(0..config.MAP_TILE_MAX_ZOOM) in the `detection_tiles` table. Writers update
+the table in the same transaction as the `spatial_log` insert, so a map view
+at any zoom is a primary-key range read instead of a scan over raw points.
+"""
+import math
+from app.core import config
+from app.db.pool import get_pool
+
+MAX_LAT = 85.05112878  # Web Mercator limit
+
+CREATE_SQL = '''
+    CREATE TABLE IF NOT EXISTS detection_tiles (
+        zoom INTEGER NOT NULL,
+        x INTEGER NOT NULL,
+        y INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        conf_sum REAL NOT NULL,
+        last_ts REAL NOT NULL,
+        PRIMARY KEY (zoom, x, y)
+    ) WITHOUT ROWID
+'''
+
+UPSERT_SQL = '''
+    INSERT INTO detection_tiles (zoom, x, y, count, conf_sum, last_ts)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (zoom, x, y) DO UPDATE SET
+        count = count + excluded.count,
+        conf_sum = conf_sum + excluded.conf_sum,
+        last_ts = MAX(last_ts, excluded.last_ts)
+'''
+
+
+def tile_xy(lat, lon, zoom):
+    """Slippy-map tile (x, y) containing the point"""
+    lat = min(max(lat, -MAX_LAT), MAX_LAT)
+    n = 1 << zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_center(x, y, zoom):
+    """(lat, lon) of the tile centre"""
+    n = 1 << zoom
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return lat, lon
+
+
+def tile_rows(detections, max_zoom=None):
+    """Aggregate (confidence, timestamp, lon, lat) tuples into upsert rows"""
+    max_zoom = config.MAP_TILE_MAX_ZOOM if max_zoom is None else max_zoom
+    acc = {}
+    for conf, ts, lon, lat in detections:
+        if lat is None or lon is None:
+            continue
+        for zoom in range(max_zoom + 1):
+            key = (zoom,) + tile_xy(lat, lon, zoom)
+            entry = acc.get(key)
+            if entry is None:
+                acc[key] = [1, conf, ts]
+            else:
+                entry[0] += 1
+                entry[1] += conf
+                entry[2] = max(entry[2], ts)
+    return [key + tuple(v) for key, v in acc.items()]
+
+
+def has_tiles(conn):
+    """True if the aggregate table exists (schema migration applied)"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='detection_tiles'").fetchone()
+    return row is not None
+
+
+def add(conn, detections, max_zoom=None):
+    """Count detections into their tiles (call inside the insert transaction)"""
+    rows = tile_rows(detections, max_zoom)
+    if rows:
+        conn.executemany(UPSERT_SQL, rows)
+    return len(rows)
+
+
+def backfill(conn, chunk=5000):
+    """Rebuild the aggregates from spatial_log (used by the schema migration)"""
+    conn.execute("DELETE FROM detection_tiles")
+    cursor = conn.execute(
+        "SELECT confidence, timestamp, ST_X(geom), ST_Y(geom) FROM spatial_log WHERE geom IS NOT NULL")
+    while True:
+        batch = cursor.fetchmany(chunk)
+        if not batch:
+            break
+        add(conn, batch)
+
+
+def query_tiles(zoom, min_lat, min_lon, max_lat, max_lon, pool=None):
+    """Tiles with detections inside the bounding box at `zoom` (clamped to the stored range)"""
+    zoom = min(max(int(zoom), 0), config.MAP_TILE_MAX_ZOOM)
+    x0, y0 = tile_xy(max_lat, min_lon, zoom)  # y grows southwards
+    x1, y1 = tile_xy(min_lat, max_lon, zoom)
+    with (pool or get_pool()).connection() as conn:
+        rows = conn.execute('''
+            SELECT x, y, count, conf_sum, last_ts FROM detection_tiles
+            WHERE zoom = ? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?
+        ''', (zoom, x0, x1, y0, y1)).fetchall()
+    tiles = []
+    for x, y, count, conf_sum, last_ts in rows:
+        lat, lon = tile_center(x, y, zoom)
+        tiles.append({
+            'x': x, 'y': y, 'lat': lat, 'lon': lon, 'count': count,
+            'avg_conf': round(conf_sum / count, 3), 'last_ts': last_ts,
+        })
+    return zoom, tiles
@@ -0,0 +1,127 @@
+import queue
+import time
+from app.core import config
+from app.db.spatial import get_db_connection
+from app.db import tiles
+
+INSERT_SQL = '''
+    INSERT INTO spatial_log (species, confidence, timestamp, geom)
+    VALUES (?, ?, ?, MakePoint(?, ?, 4326))
+'''
+
+
+class SpatialWriter:
+    """Background SpatiaLite writer with one long-lived WAL connection.
+
+    `submit()` never blocks: rows go into a bounded queue (and are dropped when it
+    is full). `run()` drains the queue and group-commits rows in batches of
+    `batch_size` or every `flush_interval` seconds, whichever comes first.
+    Map tile aggregates are updated in the same transaction when the
+    `detection_tiles` table exists.
+    `executor` runs the blocking SQLite work; under eventlet pass
+    `eventlet.tpool.execute` so disk I/O happens on a native thread.
+    """
+    def __init__(self, connect=None, batch_size=None, flush_interval=None, maxsize=None, executor=None):
+        self.connect = connect or get_db_connection
+        self.batch_size = batch_size or config.DB_WRITER_BATCH_SIZE
+        self.flush_interval = flush_interval or config.DB_WRITER_FLUSH_INTERVAL
+        self.executor = executor or (lambda fn, *args: fn(*args))
+        self._queue = queue.Queue(maxsize or config.DB_WRITER_QUEUE_SIZE)
+        self._conn = None
+        self._tiles = False
+        self._running = False
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, species, confidence, lat, lon, timestamp):
+        """Queue a detection for writing. Returns False if the queue is full"""
+        try:
+            self._queue.put_nowait((species, confidence, timestamp, lon, lat))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open(self):
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._tiles = tiles.has_tiles(conn)
+        return conn
+
+    def _write(self, rows):
+        """Write one batch in a single transaction (runs inside the executor)"""
+        try:
+            if self._conn is None:
+                self._conn = self._open()
+            with self._conn:
+                self._conn.executemany(INSERT_SQL, rows)
+                if self._tiles:
+                    tiles.add(self._conn, [(conf, ts, lon, lat) for _, conf, ts, lon, lat in rows])
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            print(f"Spatial writer error ({len(rows)} rows dropped): {e}")
+            self.failed += len(rows)
+            self._close()
+
+    def _collect(self):
+        """Wait for the first row, then gather more until the batch or time limit"""
+        try:
+            rows = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return rows
+
+    def run(self):
+        """Writer loop (start as a background task / thread)"""
+        self._running = True
+        while self._running or not self._queue.empty():
+            rows = self._collect()
+            if rows:
+                self.executor(self._write, rows)
+                for _ in rows:
+                    self._queue.task_done()
+        self.executor(self._close)
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued row has been written. Returns True if drained"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Write what is left and close the connection"""
+        self._running = False
+        return self.flush(timeout)
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            finally:
+                self._conn = None
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
@@ -1,4 +1,8 @@
-from .formats import to_geojson, to_csv_download, to_darwincore_archive
+from .formats import (to_geojson, to_csv_download, to_darwincore_archive,
+                      iter_geojson, iter_csv, iter_darwincore_archive, parse_since)
+from .cache import ExportCache
 from .webhook import WebhookNotifier
 
-__all__ = ["to_geojson", "to_csv_download", "to_darwincore_archive", "WebhookNotifier"]
+__all__ = ["to_geojson", "to_csv_download", "to_darwincore_archive",
+           "iter_geojson", "iter_csv", "iter_darwincore_archive", "parse_since",
+           "ExportCache", "WebhookNotifier"]
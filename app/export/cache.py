@@ -0,0 +1,219 @@
+"""
+Export Önbelleği
+- Değişmeyen export'lar diskteki dosyadan ETag ile sunulur (If-None-Match -> 304)
+- Log büyüdükçe sadece yeni satırlar mevcut dosyaya eklenir
+  (DB: son id'den sonrası, CSV log: son okunan bayt ofsetinden sonrası;
+  log dönmüşse önce eski segmentin kalanı)
+"""
+import csv
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.db import csvlog
+from . import formats
+
+KINDS = ('csv', 'geojson', 'dwca')
+_ARTIFACTS = {'csv': 'export.csv', 'geojson': 'export.geojson', 'dwca': 'export.zip'}
+_OCCURRENCE = 'occurrence.tsv'  # dwca için artımlı büyüyen occurrence.csv gövdesi
+
+
+def db_last_id(db_path: Optional[str], require_coords: bool = False, pool=None) -> Optional[int]:
+    """spatial_log'daki en büyük id (DB yok / boş / okunamıyorsa None)"""
+    if not db_path or not os.path.exists(db_path):
+        return None
+    sql = "SELECT MAX(id) FROM spatial_log"
+    if require_coords:
+        sql += " WHERE geom IS NOT NULL"  # GeoJSON sadece koordinatlı kayıtlarla DB'ye geçer
+    try:
+        from app.db.pool import get_pool
+        with (pool or get_pool(db_path)).connection() as conn:
+            return conn.execute(sql).fetchone()[0]
+    except Exception:
+        return None
+
+
+class ExportCache:
+    """Export dosyalarını `cache_dir` altında tutar ve artımlı günceller.
+
+    Her tür için yanında bir .json durum dosyası vardır: kaynak (db/csv),
+    son id / CSV ofseti ve inode'u, satır sayısı ve dosya boyutu. Dosya boyutu
+    durumla uyuşmazsa (yarım kalan yazım), log küçülür ya da segment indeksinde
+    olmayan yeni bir dosyaya geçerse baştan üretilir.
+
+    direct=True: get() eventlet.tpool thread'inde çağrılır; DB paylaşılan (yeşil)
+    havuz yerine her çağrıda açılan kendi bağlantısından okunur.
+    """
+    def __init__(self, cache_dir, csv_path: str, db_path: Optional[str], direct: bool = False):
+        self.cache_dir = str(cache_dir)
+        self.csv_path = csv_path
+        self.db_path = db_path
+        self.direct = direct
+        self._db = None  # get() süresince DirectConnection
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.appends = 0
+        self.rebuilds = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _load_meta(self, kind: str) -> Optional[dict]:
+        try:
+            with open(self._path(f"{kind}.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            if os.path.getsize(self._path(meta['file'])) != meta['size']:
+                return None
+        except OSError:
+            return None
+        return meta
+
+    def _save_meta(self, kind: str, meta: dict):
+        tmp = self._path(f"{kind}.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(f"{kind}.json"))
+
+    @staticmethod
+    def etag(kind: str, meta: dict) -> str:
+        return (f"{kind}-{meta['source']}-{meta['last_id'] or 0}-{meta['csv_inode'] or 0}"
+                f"-{meta['csv_offset']}-{meta['rows']}")
+
+    def get(self, kind: str) -> Tuple[str, str]:
+        """Güncel export dosyasının yolu ve ETag'i"""
+        if kind not in KINDS:
+            raise ValueError(f"Bilinmeyen export türü: {kind}")
+        with self._lock:
+            if self.direct:
+                from app.db.pool import DirectConnection
+                self._db = DirectConnection(self.db_path)
+            try:
+                return self._get(kind)
+            finally:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
+
+    def _get(self, kind: str) -> Tuple[str, str]:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        last_id = db_last_id(self.db_path, require_coords=(kind == 'geojson'), pool=self._db)
+        source = 'db' if last_id is not None else 'csv'
+        csv_size, csv_inode = self._csv_stat()
+        meta = self._load_meta(kind)
+
+        rotated = meta is not None and csv_inode != meta['csv_inode']
+        if meta is None or meta['source'] != source or (
+                source == 'db' and last_id < meta['last_id']) or (
+                source == 'csv' and not rotated and csv_size < meta['csv_offset']) or (
+                source == 'csv' and rotated and csvlog.find_segment(self.csv_path, meta['csv_inode']) is None):
+            meta = self._rebuild(kind, source)
+            self.rebuilds += 1
+        elif (source == 'db' and last_id > meta['last_id']) or (
+                source == 'csv' and (rotated or csv_size > meta['csv_offset'])):
+            added = self._append(kind, meta)
+            self.appends += 1 if added else 0
+        else:
+            self.hits += 1
+        return self._path(meta['file']), self.etag(kind, meta)
+
+    def _csv_stat(self) -> Tuple[int, Optional[int]]:
+        try:
+            st = os.stat(self.csv_path)
+        except OSError:
+            return 0, None
+        return st.st_size, st.st_ino
+
+    # -- Üretim --
+    def _new_rows(self, meta: dict) -> Iterator[Dict[str, Any]]:
+        """Durumdan sonraki yeni satırlar; bitince meta'daki imleç ilerler"""
+        if meta['source'] == 'db':
+            for row in formats._iter_detections_db(self.db_path, after_id=meta['last_id'] or 0, pool=self._db):
+                meta['last_id'] = row['id']
+                meta['rows'] += 1
+                yield row
+        else:
+            cursor = {'inode': meta['csv_inode'], 'offset': meta['csv_offset']}
+            for row in csvlog.read_new(self.csv_path, cursor):
+                meta['rows'] += 1
+                yield row
+            meta['csv_inode'], meta['csv_offset'] = cursor['inode'], cursor['offset']
+
+    def _rebuild(self, kind: str, source: str) -> dict:
+        meta = {'source': source, 'last_id': 0 if source == 'db' else None,
+                'csv_offset': 0, 'csv_inode': None, 'rows': 0, 'file': _ARTIFACTS[kind]}
+        rows = self._new_rows(meta)
+        tmp = self._path(meta['file'] + '.tmp')
+        if kind == 'csv':
+            header = formats.CSV_DB_HEADER if source == 'db' else formats.CSV_LOG_HEADER
+            with open(tmp, 'w', newline='', encoding='utf-8') as f:
+                for chunk in formats._csv_chunks(header, formats._csv_rows(source, rows)):
+                    f.write(chunk)
+        elif kind == 'geojson':
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(formats.GEOJSON_HEAD)
+                for chunk in formats._feature_chunks(formats._features(source, rows)):
+                    f.write(chunk)
+                f.write(formats.GEOJSON_TAIL)
+        else:
+            occ_tmp = self._path(_OCCURRENCE + '.tmp')
+            with open(occ_tmp, 'w', newline='', encoding='utf-8') as f:
+                for chunk in formats._csv_chunks(formats.DWC_HEADER, formats._occurrence_rows(source, rows),
+                                                 delimiter='\t'):
+                    f.write(chunk)
+            os.replace(occ_tmp, self._path(_OCCURRENCE))
+            self._write_zip(tmp)
+        os.replace(tmp, self._path(meta['file']))
+        meta['size'] = os.path.getsize(self._path(meta['file']))
+        self._save_meta(kind, meta)
+        return meta
+
+    def _append(self, kind: str, meta: dict) -> bool:
+        rows = self._new_rows(meta)
+        path = self._path(meta['file'])
+        before = meta['rows']
+        if kind == 'csv':
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerows(formats._csv_rows(meta['source'], rows))
+        elif kind == 'geojson':
+            features = formats._features(meta['source'], rows)
+            head = len(formats.GEOJSON_HEAD.encode('utf-8'))
+            tail = len(formats.GEOJSON_TAIL.encode('utf-8'))
+            first = meta['size'] == head + tail  # Henüz hiç feature yok
+            with open(path, 'r+b') as f:
+                # Kapanışın ("]}") üzerine yeni feature'lar yazılıp kapanış yeniden eklenir
+                f.seek(-tail, os.SEEK_END)
+                for chunk in formats._feature_chunks(features, first=first):
+                    f.write(chunk.encode('utf-8'))
+                f.write(formats.GEOJSON_TAIL.encode('utf-8'))
+                f.truncate()
+        else:
+            with open(self._path(_OCCURRENCE), 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, delimiter='\t')
+                writer.writerows(formats._occurrence_rows(meta['source'], rows))
+            tmp = path + '.tmp'
+            self._write_zip(tmp)
+            os.replace(tmp, path)
+        meta['size'] = os.path.getsize(path)
+        self._save_meta(kind, meta)
+        return meta['rows'] > before
+
+    def _write_zip(self, path: str):
+        """Diskteki occurrence gövdesinden ZIP'i yeniden yaz (DB/CSV tekrar okunmaz)"""
+        def body():
+            with open(self._path(_OCCURRENCE), 'rb') as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        return
+                    yield chunk
+        with open(path, 'wb') as out:
+            for data in formats._zip_darwincore(body()):
+                out.write(data)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'appends': self.appends, 'rebuilds': self.rebuilds}
@@ -3,111 +3,214 @@ Veri Export Formatları
 - GeoJSON (harita servisleri, QGIS, Leaflet)
 - CSV download (araştırmacılar)
 - DarwinCore Archive (GBIF / OBIS uluslararası standart)
+
+iter_* fonksiyonları çıktıyı parça parça üretir (DB imlecinden sayfa sayfa okur);
+sunucu bunları chunked olarak gönderir, sezonluk export RAM'de birikmez.
+to_* fonksiyonları aynı üreticilerin birleştirilmiş halidir.
 """
 import csv
 import io
+import itertools
+import json
 import os
 import zipfile
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
+
+DB_PAGE_SIZE = 500  # DB'den tek seferde okunan satır
+CHUNK_ROWS = 500  # Üretilen her parçadaki satır / feature sayısı
+SOURCE = "antigravity_pufferfish_detector"
 
 
 # ─────────────────────────────────────────────────────────────────
-# Ortak: CSV dosyasından tespitleri oku
+# Ortak: CSV dosyasından / DB'den tespitleri oku
 # ─────────────────────────────────────────────────────────────────
+def parse_since(value) -> Optional[float]:
+    """since= değeri: Unix zamanı ('1767225600') veya ISO 8601 ('2026-01-01T00:00:00Z')"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return dt.timestamp()  # Saat dilimi yoksa yerel saat kabul edilir
+
+
+def _csv_row_time(row: Dict[str, Any]) -> Optional[float]:
+    """CSV log satırının zamanı (Date + Time, yerel saat)"""
+    try:
+        return datetime.strptime(f"{row.get('Date', '')} {row.get('Time', '')}", '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        return None
+
+
+def _iter_detections_csv(csv_path: str, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """CSV log segmentlerindeki tespitleri satır satır oku (since: sadece bu andan sonrakiler)"""
+    from app.db.csvlog import log_files
+    # Dönmüş segmentler indeksten; since'den önce kapananlar hiç açılmaz
+    for path in log_files(csv_path, since):
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if since is not None:
+                    t = _csv_row_time(row)
+                    if t is None or t <= since:
+                        continue
+                yield row
+
+
 def _read_detections_csv(csv_path: str) -> List[Dict[str, Any]]:
     """CSV log dosyasından tüm tespitleri sözlük listesi olarak oku"""
-    rows = []
-    if not os.path.exists(csv_path):
-        return rows
-    with open(csv_path, 'r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rows.append(row)
-    return rows
+    return list(_iter_detections_csv(csv_path))
+
+
+_DB_COLUMNS = "id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude"
+_DB_PAGE_SQL = f'''
+    SELECT {_DB_COLUMNS} FROM spatial_log
+    WHERE timestamp >= ? AND (timestamp > ? OR id > ?)
+    ORDER BY timestamp, id
+    LIMIT ?
+'''
+_DB_ID_PAGE_SQL = f'''
+    SELECT {_DB_COLUMNS} FROM spatial_log
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+_MAX_ID = 2 ** 63 - 1
+
+
+def _iter_detections_db(db_path: str, page_size: Optional[int] = None, since: Optional[float] = None,
+                        after_id: Optional[int] = None, pool=None) -> Iterator[Dict[str, Any]]:
+    """SpatiaLite veritabanından tespitleri (GPS verileriyle) zaman sırasıyla akıt.
+
+    (timestamp, id) keyset sayfalarıyla okunur; bağlantı sayfalar arasında havuza döner.
+    since verilirse sadece o andan sonraki, after_id verilirse id sırasıyla o id'den
+    sonraki kayıtlar gelir. İlk sayfa okunamazsa (DB yok / SpatiaLite yok) hiçbir şey üretmez.
+    pool: tpool thread'lerinde paylaşılan havuz yerine DirectConnection verilir.
+    """
+    if not db_path or not os.path.exists(db_path):
+        return
+    from app.db.pool import get_pool
+    # Paylasilan okuma havuzu: SpatiaLite her export'ta yeniden yuklenmez
+    pool = pool or get_pool(db_path)
+    page_size = page_size or DB_PAGE_SIZE
+    by_id = after_id is not None
+    if since is None:
+        after_ts, last_id = float('-inf'), -1
+    else:
+        after_ts, last_id = since, _MAX_ID  # timestamp > since
+    if by_id:
+        last_id = after_id
+    first = True
+    while True:
+        try:
+            with pool.connection() as conn:
+                if by_id:
+                    rows = conn.execute(_DB_ID_PAGE_SQL, (last_id, page_size)).fetchall()
+                else:
+                    rows = conn.execute(_DB_PAGE_SQL, (after_ts, after_ts, last_id, page_size)).fetchall()
+        except Exception:
+            if first:
+                return
+            raise  # Yarıda kalan export sessizce kısaltılmaz
+        first = False
+        for row in rows:
+            yield dict(row)
+        if len(rows) < page_size:
+            return
+        after_ts, last_id = rows[-1]['timestamp'], rows[-1]['id']
 
 
 def _read_detections_db(db_path: str) -> List[Dict[str, Any]]:
     """SpatiaLite veritabanından tespitleri oku (GPS verileriyle)"""
-    rows = []
-    try:
-        import sqlite3
-        if not os.path.exists(db_path):
-            return rows
-        conn = sqlite3.connect(db_path)
-        conn.enable_load_extension(True)
-        # Try loading spatialite (similar to spatial.py)
-        for ext in ['mod_spatialite', 'libspatialite.so', 'mod_spatialite.dylib', 'mod_spatialite.dll']:
-            try:
-                conn.execute(f"SELECT load_extension('{ext}')")
-                break
-            except sqlite3.OperationalError:
-                pass
-                
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute(
-            "SELECT species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude FROM spatial_log ORDER BY timestamp"
-        )
-        for row in cursor:
-            rows.append(dict(row))
-        conn.close()
-    except Exception:
-        pass
-    return rows
+    return list(_iter_detections_db(db_path))
+
+
+def _has_coords(row: Dict[str, Any]) -> bool:
+    return row.get('latitude') is not None and row.get('longitude') is not None
+
+
+def _db_or_csv(csv_path: str, db_path: Optional[str], require_coords: bool = False,
+               since: Optional[float] = None):
+    """DB'de (koordinatlı) kayıt varsa ('db', satırlar), yoksa ('csv', satırlar).
+
+    Kaynak tüm kayıtlara göre seçilir; since sadece dönen satırları süzer.
+    """
+    rows = _iter_detections_db(db_path) if db_path else iter(())
+    if require_coords:
+        rows = filter(_has_coords, rows)
+    first = next(rows, None)
+    if first is None:
+        return 'csv', _iter_detections_csv(csv_path, since)
+    if since is None:
+        return 'db', itertools.chain([first], rows)
+    rows = _iter_detections_db(db_path, since=since)
+    return 'db', filter(_has_coords, rows) if require_coords else rows
+
+
+def _csv_chunks(header: list, rows: Iterator[list], delimiter: str = ',') -> Iterator[str]:
+    """Satırları CHUNK_ROWS'luk CSV metin parçaları olarak üret"""
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=delimiter)
+    writer.writerow(header)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    tail = output.getvalue()
+    if tail:
+        yield tail
 
 
 # ─────────────────────────────────────────────────────────────────
 # 1. GeoJSON Export
 # ─────────────────────────────────────────────────────────────────
-def to_geojson(csv_path: str, db_path: Optional[str] = None) -> dict:
-    """
-    Tespit verilerini GeoJSON FeatureCollection olarak döndürür.
-    GPS verisi varsa DB'den, yoksa CSV'den (koordinatsız) alır.
-    
-    Uyumlu: Leaflet, QGIS, MapBox, ArcGIS Online, Google Earth
-    """
-    features = []
-
-    # Önce DB'den GPS'li kayıtları dene
-    if db_path:
-        db_rows = _read_detections_db(db_path)
-        for row in db_rows:
-            lat = row.get('latitude')
-            lon = row.get('longitude')
-            if lat is not None and lon is not None:
-                feature = {
-                    "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [float(lon), float(lat)]  # GeoJSON: [lon, lat]
-                    },
-                    "properties": {
-                        "species": row.get('species', 'Lagocephalus sceleratus'),
-                        "confidence": float(row.get('confidence', 0)),
-                        "timestamp": row.get('timestamp', ''),
-                        "source": "antigravity_pufferfish_detector"
-                    }
-                }
-                features.append(feature)
+def _geojson_features(csv_path: str, db_path: Optional[str], since: Optional[float] = None) -> Iterator[dict]:
+    """GPS verisi varsa DB'den, yoksa CSV'den (koordinatsız) feature üret"""
+    source, rows = _db_or_csv(csv_path, db_path, require_coords=True, since=since)
+    yield from _features(source, rows)
 
-    # GPS verisi yoksa CSV'den al (koordinatsız)
-    if not features:
-        csv_rows = _read_detections_csv(csv_path)
-        for i, row in enumerate(csv_rows):
-            feature = {
+
+def _features(source: str, rows: Iterator[Dict[str, Any]]) -> Iterator[dict]:
+    if source == 'db':
+        for row in rows:
+            if not _has_coords(row):
+                continue
+            yield {
                 "type": "Feature",
-                "geometry": None,  # Koordinat yok
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(row['longitude']), float(row['latitude'])]  # GeoJSON: [lon, lat]
+                },
                 "properties": {
-                    "species": "Lagocephalus sceleratus",
-                    "confidence": float(row.get('Confidence', 0)),
-                    "date": row.get('Date', ''),
-                    "time": row.get('Time', ''),
-                    "bbox": f"{row.get('BBox_X1','')},{row.get('BBox_Y1','')},{row.get('BBox_X2','')},{row.get('BBox_Y2','')}",
-                    "source": "antigravity_pufferfish_detector"
+                    "species": row.get('species', 'Lagocephalus sceleratus'),
+                    "confidence": float(row.get('confidence', 0)),
+                    "timestamp": row.get('timestamp', ''),
+                    "source": SOURCE
                 }
             }
-            features.append(feature)
+        return
 
+    # GPS verisi yoksa CSV'den al (koordinatsız)
+    for row in rows:
+        yield {
+            "type": "Feature",
+            "geometry": None,  # Koordinat yok
+            "properties": {
+                "species": "Lagocephalus sceleratus",
+                "confidence": float(row.get('Confidence', 0)),
+                "date": row.get('Date', ''),
+                "time": row.get('Time', ''),
+                "bbox": f"{row.get('BBox_X1','')},{row.get('BBox_Y1','')},{row.get('BBox_X2','')},{row.get('BBox_Y2','')}",
+                "source": SOURCE
+            }
+        }
+
+
+def _geojson_collection(features: list) -> dict:
     return {
         "type": "FeatureCollection",
         "name": "pufferfish_detections",
@@ -119,150 +222,105 @@ def to_geojson(csv_path: str, db_path: Optional[str] = None) -> dict:
     }
 
 
+def to_geojson(csv_path: str, db_path: Optional[str] = None, since: Optional[float] = None) -> dict:
+    """
+    Tespit verilerini GeoJSON FeatureCollection olarak döndürür.
+    GPS verisi varsa DB'den, yoksa CSV'den (koordinatsız) alır.
+    
+    Uyumlu: Leaflet, QGIS, MapBox, ArcGIS Online, Google Earth
+    """
+    return _geojson_collection(list(_geojson_features(csv_path, db_path, since)))
+
+
+GEOJSON_HEAD = json.dumps(_geojson_collection([]), ensure_ascii=False)[:-2] + "\n"
+GEOJSON_TAIL = "]}\n"
+
+
+def _feature_chunks(features: Iterator[dict], first: bool = True) -> Iterator[str]:
+    """Feature'ları virgülle ayrılmış JSON parçaları olarak üret"""
+    parts = []
+    for feature in features:
+        parts.append(("" if first else ",") + json.dumps(feature, ensure_ascii=False) + "\n")
+        first = False
+        if len(parts) >= CHUNK_ROWS:
+            yield "".join(parts)
+            parts = []
+    if parts:
+        yield "".join(parts)
+
+
+def iter_geojson(csv_path: str, db_path: Optional[str] = None, since: Optional[float] = None) -> Iterator[str]:
+    """to_geojson ile aynı belgeyi metin parçaları halinde üretir"""
+    # "features" son anahtar: boş listenin kapanışı ("]}") atılıp feature'lar araya yazılır
+    yield GEOJSON_HEAD
+    yield from _feature_chunks(_geojson_features(csv_path, db_path, since))
+    yield GEOJSON_TAIL
+
+
 # ─────────────────────────────────────────────────────────────────
 # 2. CSV Download
 # ─────────────────────────────────────────────────────────────────
-def to_csv_download(csv_path: str, db_path: Optional[str] = None) -> str:
-    """
-    İndirilebilir CSV string'i döndürür.
-    DB verisi varsa GPS koordinatlarıyla zenginleştirir.
-    """
-    output = io.StringIO()
-    writer = csv.writer(output)
+CSV_DB_HEADER = ["Species", "Confidence", "Timestamp", "Latitude", "Longitude"]
+CSV_LOG_HEADER = ["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"]
 
-    # DB'den GPS'li veriler
-    db_rows = _read_detections_db(db_path) if db_path else []
 
-    if db_rows:
-        writer.writerow(["Species", "Confidence", "Timestamp", "Latitude", "Longitude"])
-        for row in db_rows:
-            writer.writerow([
+def _csv_rows(source: str, rows: Iterator[Dict[str, Any]]) -> Iterator[list]:
+    if source == 'db':
+        for row in rows:
+            yield [
                 row.get('species', 'Lagocephalus sceleratus'),
                 round(float(row.get('confidence', 0)), 4),
                 row.get('timestamp', ''),
                 row.get('latitude', ''),
                 row.get('longitude', '')
-            ])
+            ]
     else:
         # Sadece CSV log
-        csv_rows = _read_detections_csv(csv_path)
-        writer.writerow(["Timestamp", "Date", "Time", "Confidence",
-                         "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
-        for row in csv_rows:
-            writer.writerow([
+        for row in rows:
+            yield [
                 row.get('Timestamp', ''), row.get('Date', ''),
                 row.get('Time', ''), row.get('Confidence', ''),
                 row.get('BBox_X1', ''), row.get('BBox_Y1', ''),
                 row.get('BBox_X2', ''), row.get('BBox_Y2', '')
-            ])
+            ]
 
-    return output.getvalue()
 
+def iter_csv(csv_path: str, db_path: Optional[str] = None, since: Optional[float] = None) -> Iterator[str]:
+    """
+    İndirilebilir CSV'yi parça parça üretir.
+    DB verisi varsa GPS koordinatlarıyla zenginleştirir.
+    """
+    source, rows = _db_or_csv(csv_path, db_path, since=since)
+    header = CSV_DB_HEADER if source == 'db' else CSV_LOG_HEADER
+    yield from _csv_chunks(header, _csv_rows(source, rows))
 
-# ─────────────────────────────────────────────────────────────────
-# 3. DarwinCore Archive (GBIF / OBIS standart format)
-# ─────────────────────────────────────────────────────────────────
-def to_darwincore_archive(csv_path: str, db_path: Optional[str] = None) -> bytes:
+
+def to_csv_download(csv_path: str, db_path: Optional[str] = None, since: Optional[float] = None) -> str:
     """
-    DarwinCore Archive (DwC-A) ZIP dosyası oluşturur.
-    GBIF ve OBIS'e doğrudan yüklenebilir format.
-    
-    İçerik:
-    - occurrence.csv  (Tespit kayıtları)
-    - meta.xml        (Arşiv tanımlayıcı)
-    - eml.xml         (Veri seti metadata)
-    
-    Referans: https://dwc.tdwg.org/terms/
+    İndirilebilir CSV string'i döndürür.
+    DB verisi varsa GPS koordinatlarıyla zenginleştirir.
     """
-    # Veri topla
-    db_rows = _read_detections_db(db_path) if db_path else []
-    csv_rows = _read_detections_csv(csv_path) if not db_rows else []
-
-    # ── occurrence.csv ──
-    occ_output = io.StringIO()
-    occ_writer = csv.writer(occ_output, delimiter='\t')
-
-    # DarwinCore standart sütunları
-    dwc_header = [
-        "occurrenceID", "basisOfRecord", "eventDate",
-        "scientificName", "vernacularName", "kingdom", "phylum",
-        "class", "order", "family", "genus", "specificEpithet",
-        "decimalLatitude", "decimalLongitude",
-        "coordinateUncertaintyInMeters", "geodeticDatum",
-        "occurrenceStatus", "individualCount",
-        "identificationVerificationStatus",
-        "measurementValue", "measurementType", "measurementUnit",
-        "institutionCode", "datasetName", "informationWithheld"
-    ]
-    occ_writer.writerow(dwc_header)
-
-    occurrence_id = 0
-
-    if db_rows:
-        for row in db_rows:
-            occurrence_id += 1
-            ts = row.get('timestamp', '')
-            # Unix timestamp'i ISO formatına çevir
-            try:
-                event_date = datetime.fromtimestamp(float(ts), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-            except (ValueError, TypeError):
-                event_date = str(ts)
+    return "".join(iter_csv(csv_path, db_path, since))
 
-            occ_writer.writerow([
-                f"AG-PF-{occurrence_id:06d}",          # occurrenceID
-                "MachineObservation",                    # basisOfRecord
-                event_date,                              # eventDate
-                "Lagocephalus sceleratus",               # scientificName
-                "Silver-cheeked toadfish",               # vernacularName
-                "Animalia",                              # kingdom
-                "Chordata",                              # phylum
-                "Actinopterygii",                        # class
-                "Tetraodontiformes",                     # order
-                "Tetraodontidae",                        # family
-                "Lagocephalus",                          # genus
-                "sceleratus",                            # specificEpithet
-                row.get('latitude', ''),                 # decimalLatitude
-                row.get('longitude', ''),                # decimalLongitude
-                "10",                                    # coordinateUncertaintyInMeters (GPS ~10m)
-                "WGS84",                                 # geodeticDatum
-                "present",                               # occurrenceStatus
-                "1",                                     # individualCount
-                "MachineLearningPrediction",             # identificationVerificationStatus
-                round(float(row.get('confidence', 0)), 4),  # measurementValue
-                "confidence_score",                      # measurementType
-                "probability",                           # measurementUnit
-                "Antigravity",                           # institutionCode
-                "Pufferfish Detection System",           # datasetName
-                ""                                       # informationWithheld
-            ])
-    else:
-        for row in csv_rows:
-            occurrence_id += 1
-            event_date = row.get('Date', '')
-            event_time = row.get('Time', '')
-            if event_date and event_time:
-                event_date = f"{event_date}T{event_time}Z"
 
-            occ_writer.writerow([
-                f"AG-PF-{occurrence_id:06d}",
-                "MachineObservation",
-                event_date,
-                "Lagocephalus sceleratus",
-                "Silver-cheeked toadfish",
-                "Animalia", "Chordata", "Actinopterygii",
-                "Tetraodontiformes", "Tetraodontidae",
-                "Lagocephalus", "sceleratus",
-                "", "",  # No GPS
-                "", "WGS84",
-                "present", "1",
-                "MachineLearningPrediction",
-                row.get('Confidence', ''),
-                "confidence_score", "probability",
-                "Antigravity", "Pufferfish Detection System", ""
-            ])
+# ─────────────────────────────────────────────────────────────────
+# 3. DarwinCore Archive (GBIF / OBIS standart format)
+# ─────────────────────────────────────────────────────────────────
+# DarwinCore standart sütunları
+DWC_HEADER = [
+    "occurrenceID", "basisOfRecord", "eventDate",
+    "scientificName", "vernacularName", "kingdom", "phylum",
+    "class", "order", "family", "genus", "specificEpithet",
+    "decimalLatitude", "decimalLongitude",
+    "coordinateUncertaintyInMeters", "geodeticDatum",
+    "occurrenceStatus", "individualCount",
+    "identificationVerificationStatus",
+    "measurementValue", "measurementType", "measurementUnit",
+    "institutionCode", "datasetName", "informationWithheld"
+]
 
-    # ── meta.xml ──
-    meta_xml = """<?xml version="1.0" encoding="UTF-8"?>
+# ── meta.xml ──
+DWC_META_XML = """<?xml version="1.0" encoding="UTF-8"?>
 <archive xmlns="http://rs.tdwg.org/dwc/text/"
          xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
          xsi:schemaLocation="http://rs.tdwg.org/dwc/text/ http://rs.tdwg.org/dwc/text/tdwg_dwc_text.xsd">
@@ -297,8 +355,10 @@ def to_darwincore_archive(csv_path: str, db_path: Optional[str] = None) -> bytes
   </core>
 </archive>"""
 
-    # ── eml.xml (Ecological Metadata Language) ──
-    eml_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+
+def _eml_xml() -> str:
+    """eml.xml (Ecological Metadata Language) — tarih alanları oluşturma anına göre"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
 <eml:eml xmlns:eml="eml://ecoinformatics.org/eml-2.1.1"
          xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
          xsi:schemaLocation="eml://ecoinformatics.org/eml-2.1.1 eml.xsd"
@@ -366,11 +426,140 @@ def to_darwincore_archive(csv_path: str, db_path: Optional[str] = None) -> bytes
   </dataset>
 </eml:eml>"""
 
-    # ── ZIP arşivi oluştur ──
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr('occurrence.csv', occ_output.getvalue())
-        zf.writestr('meta.xml', meta_xml)
-        zf.writestr('eml.xml', eml_xml)
 
-    return zip_buffer.getvalue()
+def _occurrence_rows(source: str, rows: Iterator[Dict[str, Any]]) -> Iterator[list]:
+    """occurrence.csv satırları (DB: GPS'li, CSV: koordinatsız).
+
+    occurrenceID kayda bağlıdır (DB id'si / CSV tarih+zaman damgası+kutu), sıraya değil;
+    böylece since= ile alınan delta export'lar GBIF/OBIS'te aynı kaydı günceller.
+    """
+    if source == 'db':
+        for row in rows:
+            occurrence_id = f"AG-PF-{row['id']:06d}"
+            ts = row.get('timestamp', '')
+            # Unix timestamp'i ISO formatına çevir
+            try:
+                event_date = datetime.fromtimestamp(float(ts), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            except (ValueError, TypeError):
+                event_date = str(ts)
+
+            yield [
+                occurrence_id,                           # occurrenceID
+                "MachineObservation",                    # basisOfRecord
+                event_date,                              # eventDate
+                "Lagocephalus sceleratus",               # scientificName
+                "Silver-cheeked toadfish",               # vernacularName
+                "Animalia",                              # kingdom
+                "Chordata",                              # phylum
+                "Actinopterygii",                        # class
+                "Tetraodontiformes",                     # order
+                "Tetraodontidae",                        # family
+                "Lagocephalus",                          # genus
+                "sceleratus",                            # specificEpithet
+                row.get('latitude', ''),                 # decimalLatitude
+                row.get('longitude', ''),                # decimalLongitude
+                "10",                                    # coordinateUncertaintyInMeters (GPS ~10m)
+                "WGS84",                                 # geodeticDatum
+                "present",                               # occurrenceStatus
+                "1",                                     # individualCount
+                "MachineLearningPrediction",             # identificationVerificationStatus
+                round(float(row.get('confidence', 0)), 4),  # measurementValue
+                "confidence_score",                      # measurementType
+                "probability",                           # measurementUnit
+                "Antigravity",                           # institutionCode
+                "Pufferfish Detection System",           # datasetName
+                ""                                       # informationWithheld
+            ]
+    else:
+        for row in rows:
+            occurrence_id = f"AG-PF-{row.get('Date', '').replace('-', '')}-{row.get('Timestamp', '')}"
+            # Aynı karedeki kutular aynı Timestamp'i taşır; kutu koordinatları ID'yi tekil yapar
+            bbox = [row.get(k) or '' for k in ('BBox_X1', 'BBox_Y1', 'BBox_X2', 'BBox_Y2')]
+            if any(bbox):
+                occurrence_id += "-" + "_".join(bbox)
+            event_date = row.get('Date', '')
+            event_time = row.get('Time', '')
+            if event_date and event_time:
+                event_date = f"{event_date}T{event_time}Z"
+
+            yield [
+                occurrence_id,
+                "MachineObservation",
+                event_date,
+                "Lagocephalus sceleratus",
+                "Silver-cheeked toadfish",
+                "Animalia", "Chordata", "Actinopterygii",
+                "Tetraodontiformes", "Tetraodontidae",
+                "Lagocephalus", "sceleratus",
+                "", "",  # No GPS
+                "", "WGS84",
+                "present", "1",
+                "MachineLearningPrediction",
+                row.get('Confidence', ''),
+                "confidence_score", "probability",
+                "Antigravity", "Pufferfish Detection System", ""
+            ]
+
+
+class _ChunkSink:
+    """zipfile'ın yazdığı baytları biriktiren, seek edilemeyen hedef.
+
+    zipfile seek edemeyince yerel başlıkları data descriptor ile yazar;
+    böylece arşiv baştan sona tek geçişte akıtılabilir.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_darwincore_archive(csv_path: str, db_path: Optional[str] = None,
+                            since: Optional[float] = None) -> Iterator[bytes]:
+    """
+    DarwinCore Archive (DwC-A) ZIP dosyasını parça parça üretir.
+    GBIF ve OBIS'e doğrudan yüklenebilir format.
+    
+    İçerik:
+    - occurrence.csv  (Tespit kayıtları)
+    - meta.xml        (Arşiv tanımlayıcı)
+    - eml.xml         (Veri seti metadata)
+    
+    Referans: https://dwc.tdwg.org/terms/
+    """
+    source, rows = _db_or_csv(csv_path, db_path, since=since)
+    chunks = _csv_chunks(DWC_HEADER, _occurrence_rows(source, rows), delimiter='\t')
+    yield from _zip_darwincore(text.encode('utf-8') for text in chunks)
+
+
+def _zip_darwincore(occurrence_chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """occurrence.csv baytlarından DwC-A ZIP'ini tek geçişte akıt"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        # Boyut önceden bilinmediği için zip64 açık (4 GB sınırı yok)
+        with zf.open('occurrence.csv', 'w', force_zip64=True) as occ:
+            for chunk in occurrence_chunks:
+                occ.write(chunk)
+                data = sink.drain()
+                if data:
+                    yield data
+        zf.writestr('meta.xml', DWC_META_XML)
+        zf.writestr('eml.xml', _eml_xml())
+    yield sink.drain()  # Kalan sıkıştırılmış veri + merkezi dizin
+
+
+def to_darwincore_archive(csv_path: str, db_path: Optional[str] = None, since: Optional[float] = None) -> bytes:
+    """
+    DarwinCore Archive (DwC-A) ZIP dosyası oluşturur.
+    GBIF ve OBIS'e doğrudan yüklenebilir format.
+    """
+    return b"".join(iter_darwincore_archive(csv_path, db_path, since))
@@ -8,28 +8,288 @@ import time
 import threading
 import socket
 import ipaddress
+import http.client
+import queue
+import random
+import sqlite3
 from urllib.parse import urlparse
-from typing import Dict, Any
-from urllib.request import Request, urlopen
-from urllib.error import URLError
+from typing import Dict, Any, List, Optional
+
+from app.core import config
+
+USER_AGENT = 'Antigravity-PufferfishDetector/1.0'
+
+
+class ConnectionPool:
+    """
+    Host başına keep-alive HTTP(S) bağlantıları.
+
+    Her bildirimde yeni TCP + TLS el sıkışması yerine boşta bekleyen bağlantı
+    kullanılır. Sunucu boştaki bağlantıyı kapatmışsa istek bir kez yeni
+    bağlantıyla tekrarlanır.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_idle: int = 2):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: Dict[tuple, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _get(self, key: tuple):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.created += 1
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _put(self, key: tuple, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str]) -> int:
+        """POST gönder, HTTP durum kodunu döndür (ağ hatasında exception)"""
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80))
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        for attempt in range(2):
+            conn, reused = self._get(key)
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # Bayat keep-alive bağlantısı
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._put(key, conn)
+            return resp.status
+        raise ConnectionError(url)
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+class CircuitBreaker:
+    """
+    Hedef başına devre kesici.
+
+    Art arda `threshold` hatadan sonra açılır; `reset_timeout` saniye boyunca
+    hedefe hiç istek gitmez (bildirimler yeniden deneme kuyruğunda bekler).
+    Süre dolunca tek bir deneme isteğine izin verilir (yarı açık).
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 60.0, clock=time.time):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.retry_in() == 0 else 'open'
+
+    def retry_in(self) -> float:
+        """Bir sonraki denemeye kalan süre (kapalıysa 0)"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.retry_in() == 0 and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = self.clock()
+
+
+class RetryQueue:
+    """
+    Gönderilemeyen bildirimler için kalıcı yeniden deneme kuyruğu (SQLite).
+
+    Bağlantı yokken bildirim sadece bir satır eklemedir; satırlar üstel geri
+    çekilmeyle (base * 2^deneme, en fazla max_delay, ±%20 jitter) tekrar denenir.
+    `max_attempts` / `max_age` aşılınca bayat uyarı silinir. path=None ise bellekte tutulur.
+    """
+
+    def __init__(self, path=None, base_delay: float = 30.0, max_delay: float = 3600.0,
+                 max_attempts: int = 20, max_age: float = 86400.0, max_rows: int = 10000, clock=time.time):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._path = str(path) if path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        self.expired = 0
+        self.dropped = 0
+
+    def _db(self) -> sqlite3.Connection:
+        """Bağlantıyı ilk kullanımda aç (kilit altında çağrılır)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path or ':memory:', check_same_thread=False)
+            if self._path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS webhook_retry (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL,
+                created REAL NOT NULL,
+                last_error TEXT)''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_webhook_retry_next ON webhook_retry(next_at)")
+            self._conn.commit()
+        return self._conn
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.base_delay * (2 ** max(0, attempts - 1)), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def push(self, target: str, payload: str, attempts: int = 0, error: Optional[str] = None,
+             delay: Optional[float] = None) -> None:
+        now = self.clock()
+        delay = self.backoff(attempts) if delay is None else delay
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO webhook_retry (target, payload, attempts, next_at, created, last_error) VALUES (?, ?, ?, ?, ?, ?)",
+                (target, payload, attempts, now + delay, now, error))
+            # Kuyruk sınırı: en eski uyarılar atılır
+            over = db.execute("SELECT COUNT(*) FROM webhook_retry").fetchone()[0] - self.max_rows
+            if over > 0:
+                db.execute(
+                    "DELETE FROM webhook_retry WHERE id IN (SELECT id FROM webhook_retry ORDER BY id LIMIT ?)", (over,))
+                self.dropped += over
+            db.commit()
+
+    def claim(self, limit: int = 10, lease: float = 60.0) -> List[Dict[str, Any]]:
+        """Zamanı gelmiş satırları al; `lease` süresince başka worker'a verilmez"""
+        now = self.clock()
+        with self._lock:
+            db = self._db()
+            rows = db.execute(
+                "SELECT id, target, payload, attempts, created FROM webhook_retry WHERE next_at <= ? ORDER BY next_at LIMIT ?",
+                (now, limit)).fetchall()
+            if rows:
+                db.executemany("UPDATE webhook_retry SET next_at = ? WHERE id = ?",
+                               [(now + lease, r[0]) for r in rows])
+                db.commit()
+        return [dict(zip(('id', 'target', 'payload', 'attempts', 'created'), r)) for r in rows]
+
+    def done(self, row_id: int) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM webhook_retry WHERE id = ?", (row_id,))
+            db.commit()
+
+    def failed(self, row: Dict[str, Any], error: Optional[str] = None) -> bool:
+        """Başarısız denemeyi işle; tekrar denenecekse True, süresi dolduysa False"""
+        attempts = row['attempts'] + 1
+        if attempts >= self.max_attempts or self.clock() - row['created'] > self.max_age:
+            self.done(row['id'])
+            self.expired += 1
+            return False
+        self.defer(row['id'], self.backoff(attempts), attempts, error)
+        return True
+
+    def defer(self, row_id: int, delay: float, attempts: Optional[int] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            db = self._db()
+            if attempts is None:
+                db.execute("UPDATE webhook_retry SET next_at = ? WHERE id = ?", (self.clock() + delay, row_id))
+            else:
+                db.execute("UPDATE webhook_retry SET next_at = ?, attempts = ?, last_error = ? WHERE id = ?",
+                           (self.clock() + delay, attempts, error, row_id))
+            db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM webhook_retry").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
 
 class WebhookNotifier:
     """
     Thread-safe webhook bildirim yöneticisi.
-    
+
+    `notify_async` thread açmaz: her hedef için iş sınırlı kuyruğa girer ve sabit
+    sayıda worker (`run`) keep-alive bağlantılarla gönderir. Başarısız bildirimler
+    kalıcı yeniden deneme kuyruğuna yazılır; hedef başına devre kesici açıkken o
+    hedefe hiç istek gitmez, uyarılar kuyrukta bekler.
+
     Kullanım:
         notifier = WebhookNotifier()
         notifier.add_target("slack", "https://hooks.slack.com/...")
         notifier.notify(species="Lagocephalus sceleratus", confidence=0.85, lat=36.88, lon=30.70)
     """
 
-    def __init__(self, rate_limit_seconds: float = 60.0):
+    def __init__(self, rate_limit_seconds: float = 60.0, retry_path=None, workers: Optional[int] = None,
+                 queue_size: Optional[int] = None, timeout: Optional[float] = None):
         self._targets: Dict[str, str] = {}
         self._lock = threading.Lock()
         self._last_notify_time: float = 0.0
         self._rate_limit = rate_limit_seconds
-        self._stats = {'sent': 0, 'failed': 0, 'rate_limited': 0}
+        self._stats = {'sent': 0, 'failed': 0, 'rate_limited': 0,
+                       'retried': 0, 'deferred': 0, 'spooled': 0}
+
+        self.workers = workers or config.WEBHOOK_WORKERS
+        self._jobs: queue.Queue = queue.Queue(queue_size or config.WEBHOOK_QUEUE_SIZE)
+        self._pool = ConnectionPool(timeout=timeout or config.WEBHOOK_TIMEOUT)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.retry = RetryQueue(retry_path, base_delay=config.WEBHOOK_RETRY_BASE_DELAY,
+                                max_delay=config.WEBHOOK_RETRY_MAX_DELAY, max_age=config.WEBHOOK_RETRY_MAX_AGE,
+                                max_rows=config.WEBHOOK_RETRY_MAX_ROWS)
+        self._running = False
 
     def _is_safe_url(self, url: str) -> bool:
         """URL'nin güvenli (SSRF'ye karşı korumalı) olup olmadığını kontrol et"""
@@ -72,9 +332,25 @@ class WebhookNotifier:
         with self._lock:
             return dict(self._targets)
 
-    def get_stats(self) -> Dict[str, int]:
+    def get_stats(self) -> Dict[str, Any]:
         """İstatistikleri döndür"""
-        return dict(self._stats)
+        stats = dict(self._stats)
+        stats.update({
+            'queued': self._jobs.qsize(),
+            'retry_pending': len(self.retry),
+            'expired': self.retry.expired + self.retry.dropped,
+            'connections': {'created': self._pool.created, 'reused': self._pool.reused},
+            'breakers': {name: b.state for name, b in self._breakers.items()},
+        })
+        return stats
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(config.WEBHOOK_BREAKER_THRESHOLD,
+                                                                config.WEBHOOK_BREAKER_RESET)
+            return breaker
 
     def _format_payload(self, name: str, data: Dict[str, Any]) -> str:
         """Hedef tipine göre payload formatla"""
@@ -126,57 +402,58 @@ class WebhookNotifier:
         })
 
     def _send_one(self, name: str, url: str, payload: str) -> bool:
-        """Tek bir hedefe gönder"""
+        """Tek bir hedefe gönder (havuzdaki keep-alive bağlantı ile)"""
         try:
-            req = Request(
-                url,
-                data=payload.encode('utf-8'),
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'Antigravity-PufferfishDetector/1.0'
-                },
-                method='POST'
-            )
-            with urlopen(req, timeout=10) as resp:
-                if resp.status < 300:
-                    self._stats['sent'] += 1
-                    return True
-                else:
-                    self._stats['failed'] += 1
-                    return False
-        except (URLError, Exception) as e:
+            status = self._pool.post(url, payload.encode('utf-8'), {
+                'Content-Type': 'application/json',
+                'User-Agent': USER_AGENT,
+            })
+            ok = status < 300
+            if not ok:
+                print(f"Webhook hata [{name}]: HTTP {status}")
+        except Exception as e:
             print(f"Webhook hata [{name}]: {e}")
-            self._stats['failed'] += 1
+            ok = False
+        self._breaker(name).record(ok)
+        self._stats['sent' if ok else 'failed'] += 1
+        return ok
+
+    def _deliver(self, name: str, url: str, payload: str, row: Optional[Dict[str, Any]] = None) -> bool:
+        """Devre kesiciye uyarak gönder; olmazsa yeniden deneme kuyruğuna yaz / ertele"""
+        breaker = self._breaker(name)
+        if not breaker.allow():
+            # Hedef düşük: ağa çıkmadan kuyrukta beklet (deneme sayılmaz)
+            self._stats['deferred'] += 1
+            if row is None:
+                self.retry.push(name, payload, delay=breaker.retry_in())
+            else:
+                self.retry.defer(row['id'], breaker.retry_in())
             return False
+        ok = self._send_one(name, url, payload)
+        if row is not None:
+            if ok:
+                self.retry.done(row['id'])
+                self._stats['retried'] += 1
+            else:
+                self.retry.failed(row)
+        elif not ok:
+            self.retry.push(name, payload, attempts=1)
+        return ok
 
-    def notify(self, **kwargs) -> Dict[str, bool]:
-        """
-        Tüm kayıtlı hedeflere bildirim gönder.
-        Rate limiting uygulanır.
-        
-        Args:
-            species: Tür adı
-            confidence: Güven skoru (0-1)
-            lat: Enlem
-            lon: Boylam
-            timestamp: Zaman damgası
-        
-        Returns:
-            {hedef_adı: başarılı_mı} sözlüğü
-        """
+    def _prepare(self, kwargs: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Rate limit + payload hazırlığı; {hedef_adı: payload} veya gönderilecek yoksa None"""
         now = time.time()
         if now - self._last_notify_time < self._rate_limit:
             self._stats['rate_limited'] += 1
-            return {}
+            return None
 
         with self._lock:
             targets = dict(self._targets)
 
         if not targets:
-            return {}
+            return None
 
         self._last_notify_time = now
-        results = {}
 
         data = {
             'species': kwargs.get('species', 'Lagocephalus sceleratus'),
@@ -185,20 +462,97 @@ class WebhookNotifier:
             'lon': kwargs.get('lon', None),
             'timestamp': kwargs.get('timestamp', time.strftime('%Y-%m-%d %H:%M:%S'))
         }
+        return {name: self._format_payload(name, data) for name in targets}
+
+    def notify(self, **kwargs) -> Dict[str, bool]:
+        """
+        Tüm kayıtlı hedeflere bildirim gönder (çağıran thread'de, sırayla).
+        Rate limiting uygulanır; başarısız hedefler yeniden deneme kuyruğuna girer.
+        
+        Args:
+            species: Tür adı
+            confidence: Güven skoru (0-1)
+            lat: Enlem
+            lon: Boylam
+            timestamp: Zaman damgası
+        
+        Returns:
+            {hedef_adı: başarılı_mı} sözlüğü
+        """
+        payloads = self._prepare(kwargs)
+        if not payloads:
+            return {}
+        targets = self.get_targets()
+        return {name: self._deliver(name, targets[name], payload)
+                for name, payload in payloads.items() if name in targets}
 
-        # Paralel gönderim
-        threads = []
-        for name, url in targets.items():
-            payload = self._format_payload(name, data)
-            t = threading.Thread(target=lambda n=name, u=url, p=payload: results.update({n: self._send_one(n, u, p)}))
-            threads.append(t)
-            t.start()
+    def notify_async(self, **kwargs) -> None:
+        """Arka planda bildirim gönder (ana thread'i bloklamaz, thread açmaz)"""
+        payloads = self._prepare(kwargs)
+        if not payloads:
+            return
+        if not self._running:
+            self.start()
+        for name, payload in payloads.items():
+            try:
+                self._jobs.put_nowait((name, payload))
+            except queue.Full:
+                # Worker'lar yetişemiyor: diske yaz, sonra gönderilir
+                self.retry.push(name, payload, delay=0)
+                self._stats['spooled'] += 1
 
-        for t in threads:
-            t.join(timeout=15)
+    def _drain_retries(self) -> int:
+        """Zamanı gelen yeniden denemeleri gönder; işlenen satır sayısı"""
+        rows = self.retry.claim(limit=10, lease=config.WEBHOOK_TIMEOUT * 3)
+        targets = self.get_targets()
+        for row in rows:
+            url = targets.get(row['target'])
+            if url is None:
+                self.retry.done(row['id'])  # Hedef silinmiş
+                continue
+            self._deliver(row['target'], url, row['payload'], row=row)
+        return len(rows)
 
-        return results
+    def run(self) -> None:
+        """Worker döngüsü (arka plan görevi / thread olarak başlat)"""
+        self._running = True
+        while self._running:
+            try:
+                name, payload = self._jobs.get(timeout=config.WEBHOOK_RETRY_POLL)
+            except queue.Empty:
+                try:
+                    self._drain_retries()
+                except Exception as e:
+                    print(f"Webhook yeniden deneme hatası: {e}")
+                continue
+            try:
+                url = self.get_targets().get(name)
+                if url is not None:
+                    self._deliver(name, url, payload)
+            except Exception as e:
+                print(f"Webhook worker hatası: {e}")
+            finally:
+                self._jobs.task_done()
 
-    def notify_async(self, **kwargs) -> None:
-        """Arka planda bildirim gönder (ana thread'i bloklamaz)"""
-        threading.Thread(target=self.notify, kwargs=kwargs, daemon=True).start()
+    def start(self, workers: Optional[int] = None) -> "WebhookNotifier":
+        """Daemon thread'lerle worker havuzunu başlat (dashboard dışındaki kullanım için)"""
+        self._running = True
+        for i in range(workers or self.workers):
+            threading.Thread(target=self.run, name=f"webhook-{i}", daemon=True).start()
+        return self
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Kuyruktaki işler bitene kadar bekle. Boşaldıysa True"""
+        deadline = time.time() + timeout
+        while self._jobs.unfinished_tasks:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Kuyruğu boşalt, worker'ları durdur ve bağlantıları kapat"""
+        done = self.flush(timeout)
+        self._running = False
+        self._pool.close()
+        return done
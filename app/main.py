@@ -7,15 +7,15 @@ import argparse
 import time
 import os
 import sys
-import csv
 import cv2
 from datetime import datetime
 
 # Proje path ayari
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core import config, Camera, Detector, gpio
+from app.core import config, Camera, create_detector, SceneChangeGate, ImageWriter, gpio
 from app.utils import draw_boxes
+from app.db import csvlog
 
 # CSV log dosyasi
 CSV_LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "detections_log.csv")
@@ -23,34 +23,34 @@ CSV_LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__fi
 
 def _ensure_csv_header():
     """CSV dosyasi yoksa basliklari olustur"""
-    if not os.path.exists(CSV_LOG_FILE):
-        with open(CSV_LOG_FILE, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
+    csvlog.ensure_header(CSV_LOG_FILE)
 
 
 def _log_detection_csv(boxes, confs):
     """Tespitleri CSV'ye yaz"""
     now_dt = datetime.now()
     ts = now_dt.strftime('%H%M%S_%f')
-    with open(CSV_LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for (x1, y1, x2, y2), c in zip(boxes, confs):
-            writer.writerow([
-                ts, now_dt.strftime('%Y-%m-%d'), now_dt.strftime('%H:%M:%S'),
-                round(c, 4), x1, y1, x2, y2
-            ])
+    logger = csvlog.get_logger(CSV_LOG_FILE)
+    logger.write_rows([
+        [ts, now_dt.strftime('%Y-%m-%d'), now_dt.strftime('%H:%M:%S'), round(c, 4), x1, y1, x2, y2]
+        for (x1, y1, x2, y2), c in zip(boxes, confs)
+    ])
+    # Kayit en fazla saniyede bir: her tespit anini hemen diske indir (dosya acik kalir)
+    logger.flush()
+
+
+# Kanit kareleri arka planda cizilip yazilir (run() worker'lari baslatir)
+image_writer = ImageWriter()
 
 
 def save_detection(frame, boxes, confs, save_dir):
-    """Tespit edilen frame'i kaydet"""
-    os.makedirs(save_dir, exist_ok=True)
+    """Tespit edilen frame'i kayit kuyruguna ekle (cizim + JPEG yazimi arka planda)"""
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     path = os.path.join(save_dir, f"fish_{timestamp}.jpg")
-    
-    result = draw_boxes(frame, boxes, confs)
-    cv2.imwrite(path, result)
-    print(f"Kaydedildi: {path}")
+    boxes, confs = list(boxes), list(confs)
+    # Kamera halkasi slotu yeniden kullanilir: kuyruga kopya girer
+    image_writer.submit(path, frame.copy(), render=lambda img: draw_boxes(img, boxes, confs),
+                        on_written=lambda p: print(f"Kaydedildi: {p}"))
     return path
 
 
@@ -64,10 +64,15 @@ def run(use_clahe=True, show_gui=False):
     
     # GPIO baslat
     gpio.init()
+
+    # Kanit yazicisi: disk kotasi artimli tutulur
+    image_writer.retain(config.DETECTION_DIR, max_files=config.DETECTION_MAX_FILES,
+                        max_bytes=config.DETECTION_MAX_BYTES)
+    image_writer.start()
     
     # Detector yukle
     try:
-        detector = Detector(config.MODEL_PATH)
+        detector = create_detector(config.MODEL_PATH)
     except Exception as e:
         print(f"Model yuklenemedi: {e}")
         return
@@ -76,7 +81,7 @@ def run(use_clahe=True, show_gui=False):
     try:
         # Pi'de mi calisiyoruz kontrol et
         is_pi = os.path.exists('/sys/class/thermal/thermal_zone0/temp')
-        cam = Camera(config.CAM_WIDTH, config.CAM_HEIGHT, use_pi=is_pi)
+        cam = Camera(config.CAM_WIDTH, config.CAM_HEIGHT, use_pi=is_pi).start()
     except Exception as e:
         print(f"Kamera hatasi: {e}")
         return
@@ -87,28 +92,42 @@ def run(use_clahe=True, show_gui=False):
     prev_time = time.time()
     last_save = 0
     frame_count = 0
+    boxes, confs = [], []
+    # Hareketli sahnede de inference en fazla SKIP_FRAMES karede bir (CPU / isi tavani)
+    gate = SceneChangeGate(min_frames=config.SKIP_FRAMES)
+    last_seq = None
+    ref = None
     
     try:
         while True:
-            frame = cam.get_frame()
-            if frame is None:
-                time.sleep(0.1)
+            # Onceki kareyi kameraya geri ver, yeni kareye kopyasiz referans al
+            if ref is not None:
+                ref.release()
+            ref = cam.acquire_frame(after_seq=last_seq)
+            if ref is None:
+                time.sleep(0.01)
                 continue
+            last_seq = ref.seq
+            frame = ref.frame
             
             frame_count += 1
             
-            # Her N frame'de tespit yap (performans icin)
-            boxes, confs = [], []
-            if frame_count % config.SKIP_FRAMES == 0:
+            # En fazla N frame'de bir; kapi aciksa sadece sahne degistiginde tespit yap
+            if config.MOTION_GATE_ENABLED:
+                inferred = gate.should_infer(frame, now=ref.timestamp)
+            else:
+                inferred = frame_count % config.SKIP_FRAMES == 0
+                boxes, confs = [], []
+            if inferred:
                 boxes, confs = detector.detect(frame, config.CONF_THRESH, use_clahe=use_clahe, clahe_clip=config.CLAHE_CLIP)
             
-            # Tespit varsa
+            # Tespit varsa (statik sahnede son sonuc gecerli kalir)
             if len(boxes) > 0:
                 gpio.on()
                 
-                # Saniyede max 1 kayit
+                # Saniyede max 1 kayit, sadece yeni inference sonucundan
                 now = time.time()
-                if now - last_save >= 1.0:
+                if inferred and now - last_save >= 1.0:
                     save_detection(frame, boxes, confs, str(config.DETECTION_DIR))
                     _log_detection_csv(boxes, confs)
                     last_save = now
@@ -129,13 +148,17 @@ def run(use_clahe=True, show_gui=False):
             
             if frame_count % 30 == 0:  # her saniye logla
                 status = "TESPIT!" if len(boxes) > 0 else "Araniyor"
-                print(f"FPS: {fps:.1f} | {status}")
+                print(f"FPS: {fps:.1f} | {status} | Atlanan: {gate.skipped}")
     
     except KeyboardInterrupt:
         print("\nDurduruluyor...")
     finally:
+        if ref is not None:
+            ref.release()
         cam.release()
         gpio.off()
+        image_writer.stop()
+        csvlog.close_loggers()
         if show_gui:
             cv2.destroyAllWindows()
         print("Sistem kapatildi.")
@@ -5,6 +5,9 @@ import sys
 from datetime import datetime
 from ultralytics import YOLO
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.core import ImageWriter
+
 # Try importing GPIO
 try:
     from gpiozero import LED
@@ -26,21 +29,23 @@ def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-def cleanup_old_detections(directory, max_files):
-    """🛡️ SECURITY: Remove oldest detection files to prevent disk exhaustion."""
-    try:
-        files = sorted(
-            [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.jpg')],
-            key=os.path.getmtime
-        )
-        while len(files) >= max_files:
-            os.remove(files.pop(0))
-    except OSError:
-        pass  # Fail silently - don't crash detection on cleanup error
+def draw_evidence(frame, boxes):
+    """Draw (x1, y1, x2, y2, conf) boxes on the frame (runs in the image writer)"""
+    for x1, y1, x2, y2, conf in boxes:
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        cv2.putText(frame, f"Pufferfish: {conf:.2f}", (x1, y1-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    return frame
 
 def main():
     print("--- Pufferfish Detection System (STABLE HEADLESS MODE) ---")
     ensure_dir(DETECTION_DIR)
+
+    # Evidence JPEGs are drawn/encoded/written on a background thread.
+    # 🛡️ SECURITY: Disk quota is tracked incrementally (no listdir + sort per save)
+    writer = ImageWriter()
+    writer.retain(DETECTION_DIR, max_files=MAX_DETECTION_FILES)
+    writer.start()
     
     # 1. Load Model
     try:
@@ -114,25 +119,17 @@ def main():
                 # Save Evidence (Max 1 per second)
                 current_time = time.time()
                 if current_time - last_save_time >= 1.0:
-                    # 🛡️ SECURITY: Clean up old files before saving new one
-                    cleanup_old_detections(DETECTION_DIR, MAX_DETECTION_FILES)
-                    
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     filename = f"fish_{timestamp}.jpg"
                     save_path = os.path.join(DETECTION_DIR, filename)
-                    
-                    # Draw boxes on the frame before saving
-                    save_frame = frame.copy()
+
+                    evidence = []
                     for box in boxes:
                         x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        conf = float(box.conf)
-                        cv2.rectangle(save_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                        cv2.putText(save_frame, f"Pufferfish: {conf:.2f}", (x1, y1-10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                    
-                    cv2.imwrite(save_path, save_frame)
-                    print(f"📸 Evidence saved: {save_path}")
+                        evidence.append((int(x1), int(y1), int(x2), int(y2), float(box.conf)))
+
+                    writer.submit(save_path, frame.copy(), render=lambda img, b=evidence: draw_evidence(img, b),
+                                  on_written=lambda p: print(f"📸 Evidence saved: {p}"))
                     last_save_time = current_time
             else:
                 # No Detection
@@ -147,6 +144,7 @@ def main():
         print("\n🛑 Stopping...")
     finally:
         cap.release()
+        writer.stop()
         if GPIO_AVAILABLE:
             led.off()
         print("System Shutdown Complete.")
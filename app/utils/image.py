@@ -1,5 +1,6 @@
 # Goruntu isleme yardimcilari
 import cv2
+import numpy as np
 
 _clahe_cache = None
 _last_clip = None
@@ -25,12 +26,69 @@ def apply_clahe(img, clip=3.0, grid=(8, 8)):
     
     return cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2BGR)
 
-def draw_boxes(frame, boxes, confs, color=(0, 0, 255)):
-    """Tespit kutularini ciz"""
+def draw_boxes(frame, boxes, confs, color=(0, 0, 255), ids=None):
+    """Tespit kutularini ciz (ids verilirse iz numarasi da yazilir)"""
     result = frame.copy()
-    for (x1, y1, x2, y2), conf in zip(boxes, confs):
+    for i, ((x1, y1, x2, y2), conf) in enumerate(zip(boxes, confs)):
         c = (0, 0, 255) if conf > 0.85 else (0, 255, 255)
+        label = f"#{ids[i]} {conf:.2f}" if ids is not None else f"{conf:.2f}"
         cv2.rectangle(result, (x1, y1), (x2, y2), c, 2)
-        cv2.putText(result, f"{conf:.2f}", (x1, y1-10), 
+        cv2.putText(result, label, (x1, y1-10), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, c, 2)
     return result
+
+
+# Luminans kanali tek basina islenen renk uzaylari: (ileri, geri) donusum
+_LUMA_SPACES = {
+    'ycrcb': (cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2RGB),
+    'lab': (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2RGB),
+}
+
+
+class Preprocessor:
+    """Resize + CLAHE + RGB/NCHW donusumunu tek adimda yapan on isleyici.
+
+    Tum ara tamponlar bir kez ayrilir; CLAHE sadece luminans kanalina uygulanir
+    (split/merge yok) ve sonuc dogrudan modelin giris tensorune yazilir.
+    """
+    def __init__(self, size, grid=(8, 8), space='ycrcb'):
+        if space not in _LUMA_SPACES:
+            raise ValueError(f"Bilinmeyen renk uzayi: {space}")
+        self.size = size
+        self.grid = grid
+        self.space = space
+        self._to_luma, self._to_rgb = _LUMA_SPACES[space]
+
+        self._resized = np.empty((size, size, 3), dtype=np.uint8)
+        self._luma = np.empty((size, size, 3), dtype=np.uint8)
+        self._channel = np.empty((size, size), dtype=np.uint8)
+        self._equalized = np.empty((size, size), dtype=np.uint8)
+        self._rgb = np.empty((size, size, 3), dtype=np.uint8)
+        self._clahe = None
+        self._clip = None
+
+    def _get_clahe(self, clip):
+        if self._clahe is None or self._clip != clip:
+            self._clahe = cv2.createCLAHE(clipLimit=clip, tileGridSize=self.grid)
+            self._clip = clip
+        return self._clahe
+
+    def __call__(self, frame, out, use_clahe=True, clip=3.0):
+        """BGR frame'i `out` (3, size, size) tensor dilimine yaz (uint8 veya float32, 0-1)"""
+        cv2.resize(frame, (self.size, self.size), dst=self._resized)
+
+        if use_clahe:
+            cv2.cvtColor(self._resized, self._to_luma, dst=self._luma)
+            cv2.extractChannel(self._luma, 0, dst=self._channel)
+            self._get_clahe(clip).apply(self._channel, dst=self._equalized)
+            cv2.insertChannel(self._equalized, self._luma, 0)
+            cv2.cvtColor(self._luma, self._to_rgb, dst=self._rgb)
+        else:
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+        chw = self._rgb.transpose(2, 0, 1)
+        if out.dtype == np.uint8:
+            np.copyto(out, chw)
+        else:
+            np.multiply(chw, 1.0 / 255.0, out=out, casting='unsafe')
+        return out
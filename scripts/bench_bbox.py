@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Bounding box sorgu benchmark'i: eski tam tarama (her satirda ST_X/ST_Y) ile
+R*Tree spatial index uzerinden sayfali query_detections_bbox karsilastirmasi.
+
+SpatiaLite yuklenemezse sema taklit edilir: geom iki double'lik BLOB, ST_X/ST_Y
+Python fonksiyonu, idx_spatial_log_geom SQLite'in yerlesik rtree modulu.
+
+Kullanim:
+    python scripts/bench_bbox.py [--rows 1000000 2000000] [--pages 5]
+"""
+import argparse
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.pool import ReadPool, load_spatialite
+from app.db.spatial import query_detections_bbox
+
+LEGACY_SQL = '''
+    SELECT id, species, confidence, timestamp, ST_Y(geom) as latitude, ST_X(geom) as longitude
+    FROM spatial_log
+    WHERE ST_Y(geom) BETWEEN ? AND ?
+      AND ST_X(geom) BETWEEN ? AND ?
+    ORDER BY timestamp DESC
+'''
+
+# Akdeniz kiyisi; haritada gezinirken tipik gorunumler
+BOXES = {
+    'liman (~1 km)': (36.880, 30.700, 36.890, 30.712),
+    'korfez (~20 km)': (36.70, 30.50, 36.90, 30.75),
+    'bolge (~200 km)': (36.0, 29.5, 37.5, 31.5),
+}
+
+
+def _unpack(blob):
+    return struct.unpack('<dd', blob)
+
+
+def emulated_functions(conn):
+    conn.create_function("ST_X", 1, lambda g: _unpack(g)[0], deterministic=True)
+    conn.create_function("ST_Y", 1, lambda g: _unpack(g)[1], deterministic=True)
+
+
+def build_db(path, rows, spatialite):
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(34.0, 38.0, rows)
+    lon = rng.uniform(27.0, 36.0, rows)
+    conf = rng.uniform(0.5, 1.0, rows)
+    ts = 1.7e9 + np.sort(rng.uniform(0, 180 * 86400, rows))
+
+    conn = sqlite3.connect(path)
+    if spatialite:
+        load_spatialite(conn)
+        conn.execute("SELECT InitSpatialMetaData(1)")
+        conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            species TEXT NOT NULL, confidence REAL NOT NULL, timestamp REAL NOT NULL)''')
+        conn.execute("SELECT AddGeometryColumn('spatial_log', 'geom', 4326, 'POINT', 'XY')")
+        conn.execute("SELECT CreateSpatialIndex('spatial_log', 'geom')")
+        conn.executemany(
+            "INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES ('Pufferfish', ?, ?, MakePoint(?, ?, 4326))",
+            zip(conf.tolist(), ts.tolist(), lon.tolist(), lat.tolist()))
+    else:
+        conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            species TEXT NOT NULL, confidence REAL NOT NULL, timestamp REAL NOT NULL, geom BLOB)''')
+        conn.execute("CREATE VIRTUAL TABLE idx_spatial_log_geom USING rtree(pkid, xmin, xmax, ymin, ymax)")
+        ids = range(1, rows + 1)
+        conn.executemany(
+            "INSERT INTO spatial_log (id, species, confidence, timestamp, geom) VALUES (?, 'Pufferfish', ?, ?, ?)",
+            zip(ids, conf.tolist(), ts.tolist(), (struct.pack('<dd', x, y) for x, y in zip(lon, lat))))
+        conn.executemany("INSERT INTO idx_spatial_log_geom VALUES (?, ?, ?, ?, ?)",
+                         zip(ids, lon.tolist(), lon.tolist(), lat.tolist(), lat.tolist()))
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bounding box sorgu benchmark'i")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument("--pages", type=int, default=5, help="Yurunecek sayfa sayisi")
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    probe = sqlite3.connect(':memory:')
+    spatialite = load_spatialite(probe) is not None
+    probe.close()
+    print(f"SpatiaLite: {'var' if spatialite else 'yok (taklit sema)'}")
+
+    def connect(path):
+        def _connect():
+            conn = sqlite3.connect(path, check_same_thread=False)
+            if spatialite:
+                load_spatialite(conn)
+            else:
+                emulated_functions(conn)
+            conn.row_factory = sqlite3.Row
+            return conn
+        return _connect
+
+    print(f"{'satir':>10}  {'kutu':<18}{'eslesen':>9}{'tam tarama ms':>15}{'1. sayfa ms':>13}{'sayfa/ms':>10}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite")
+            build_db(path, rows, spatialite)
+            pool = ReadPool(path, size=1, connect=connect(path))
+
+            for name, (min_lat, min_lon, max_lat, max_lon) in BOXES.items():
+                with pool.connection() as conn:
+                    scan_ms, matched = timed(lambda: conn.execute(
+                        LEGACY_SQL, (min_lat, max_lat, min_lon, max_lon)).fetchall(), repeat=1)
+
+                first_ms, _ = timed(lambda: query_detections_bbox(
+                    min_lat, min_lon, max_lat, max_lon, limit=args.limit, pool=pool))
+
+                def walk():
+                    cursor = {}
+                    for n in range(1, args.pages + 1):
+                        page = query_detections_bbox(min_lat, min_lon, max_lat, max_lon,
+                                                     limit=args.limit, pool=pool, **cursor)
+                        if len(page) < args.limit:
+                            break
+                        cursor = {'after_timestamp': page[-1]['timestamp'], 'after_id': page[-1]['id']}
+                    return n
+                walk_ms, pages = timed(walk, repeat=1)
+
+                print(f"{rows:>10}  {name:<18}{len(matched):>9}{scan_ms:>15.1f}{first_ms:>13.2f}"
+                      f"{walk_ms / pages:>10.2f}")
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
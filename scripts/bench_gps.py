@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+GPS durum okuma contention benchmark'i: eski kilitli GPSState (her okumada Lock +
+time.time() ile bayatlik kontrolu) ile kilitsiz snapshot okumasinin karsilastirmasi.
+
+GPS reader (simulator cumleleri NMEAStream'den gecer), tespit dongusu okuyuculari ve
+stats yayinlayicilari ayni anda calisir; okuma basina gecikme dagilimi ve toplam
+okuma hizi raporlanir.
+
+Kullanim:
+    python scripts/bench_gps.py [--seconds 3] [--detectors 2] [--stats 2] [--gps-hz 10]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import config
+from app.core.gps import GPSState, NMEAStream
+from scripts.gps_simulator import generate_gga_sentence
+
+
+class LockedGPSState:
+    """Onceki uygulama: her okuma kilit alir ve bayatligi o an hesaplar"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latitude = self.longitude = self.altitude = None
+        self.satellites = self.hdop = self.timestamp = None
+        self.is_valid = False
+
+    def update(self, lat, lon, ts, msg=None):
+        with self.lock:
+            self.latitude = lat
+            self.longitude = lon
+            self.timestamp = ts
+            if msg:
+                self.altitude = getattr(msg, 'altitude', None)
+                self.satellites = getattr(msg, 'num_sats', None)
+                self.hdop = getattr(msg, 'horizontal_dil', None)
+            self.is_valid = True
+
+    def get(self):
+        with self.lock:
+            valid = self.is_valid and self.timestamp is not None and (time.time() - self.timestamp <= config.GPS_STALE_TIMEOUT)
+            return self.latitude, self.longitude, self.timestamp, valid
+
+    def get_dict(self):
+        with self.lock:
+            valid = self.is_valid and self.timestamp is not None and (time.time() - self.timestamp <= config.GPS_STALE_TIMEOUT)
+            return {'latitude': self.latitude, 'longitude': self.longitude, 'altitude': self.altitude,
+                    'satellites': self.satellites, 'hdop': self.hdop, 'timestamp': self.timestamp,
+                    'is_valid': valid}
+
+
+def _sentences(n):
+    """Kiyi boyunca ilerleyen bir teknenin GGA cumleleri"""
+    return [generate_gga_sentence(36.88 + i * 1e-5, 30.70 + i * 2e-5, f"12{i // 60 % 60:02d}{i % 60:02d}.00").encode()
+            for i in range(n)]
+
+
+def run(state, seconds, detectors, stats_emitters, gps_hz, read):
+    stop = threading.Event()
+    latencies = {'detect': [], 'stats': [], 'update': []}
+    sentences = _sentences(600)
+
+    def reader():
+        stream = NMEAStream()
+        i = 0
+        period = 1.0 / gps_hz if gps_hz else 0.0
+        while not stop.is_set():
+            data = sentences[i % len(sentences)]
+            i += 1
+            start = time.perf_counter()
+            for fix in stream.feed(data):
+                state.update(fix.latitude, fix.longitude, time.time(), fix)
+            latencies['update'].append(time.perf_counter() - start)
+            if period:
+                time.sleep(period)
+
+    def detector():
+        samples = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            read(state)
+            samples.append(time.perf_counter() - start)
+        latencies['detect'].extend(samples)
+
+    def stats_emitter():
+        samples = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            state.get_dict()
+            samples.append(time.perf_counter() - start)
+        latencies['stats'].extend(samples)
+
+    threads = [threading.Thread(target=reader)]
+    threads += [threading.Thread(target=detector) for _ in range(detectors)]
+    threads += [threading.Thread(target=stats_emitter) for _ in range(stats_emitters)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {k: np.asarray(v) * 1e6 for k, v in latencies.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPS okuma contention benchmark'i")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--detectors", type=int, default=2, help="Tespit dongusu okuyucu thread sayisi")
+    parser.add_argument("--stats", type=int, default=2, help="Stats yayinlayici thread sayisi")
+    parser.add_argument("--gps-hz", type=float, default=10.0, help="Fix hizi (0: bekleme yok)")
+    args = parser.parse_args()
+
+    cases = [
+        ('kilitli get()', LockedGPSState, lambda s: s.get()),
+        ('snapshot get()', GPSState, lambda s: s.get()),
+        ('position_at()', GPSState, lambda s: s.position_at()),
+    ]
+    print(f"{args.detectors} tespit + {args.stats} stats thread'i, GPS {args.gps_hz:g} Hz, {args.seconds:g} sn")
+    print(f"{'durum':<16}{'okuma/sn':>12}{'p50 us':>9}{'p99 us':>9}{'max us':>10}"
+          f"{'stats/sn':>11}{'stats p99':>11}{'update p99':>12}")
+    for name, cls, read in cases:
+        lat = run(cls(), args.seconds, args.detectors, args.stats, args.gps_hz, read)
+        d, s, u = lat['detect'], lat['stats'], lat['update']
+        print(f"{name:<16}{len(d) / args.seconds:>12.0f}{np.percentile(d, 50):>9.2f}{np.percentile(d, 99):>9.2f}"
+              f"{d.max():>10.1f}{len(s) / args.seconds:>11.0f}{np.percentile(s, 99):>11.2f}"
+              f"{np.percentile(u, 99) if len(u) else 0:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+On isleme mikro benchmark'i: eski yol (resize + apply_clahe + transpose/normalize)
+ile Preprocessor (onceden ayrilmis tamponlar, luminans CLAHE) karsilastirmasi.
+
+Kullanim:
+    python scripts/bench_preprocess.py [--iters 200] [--size 640]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.image import apply_clahe, Preprocessor
+
+
+def legacy(frame, out, size, clip):
+    """Degisiklik oncesi OnnxDetector on islemesi"""
+    img = cv2.resize(frame, (size, size))
+    img = apply_clahe(img, clip=clip)
+    np.multiply(img[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=out, casting='unsafe')
+
+
+def bench(fn, iters):
+    fn()  # isinma
+    start = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    return (time.perf_counter() - start) / iters * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="On isleme benchmark'i")
+    parser.add_argument("--iters", type=int, default=200)
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--clip", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8), (15, 15), 0)
+    out = np.zeros((3, args.size, args.size), dtype=np.float32)
+
+    base = bench(lambda: legacy(frame, out, args.size, args.clip), args.iters)
+    reference = out.copy()
+    print(f"{'yol':<22}{'ms/kare':>10}{'hizlanma':>10}{'max fark':>10}")
+    print(f"{'apply_clahe (eski)':<22}{base:>10.2f}{1.0:>9.2f}x{0.0:>10.4f}")
+
+    for space in ('lab', 'ycrcb'):
+        pre = Preprocessor(args.size, space=space)
+        ms = bench(lambda: pre(frame, out, use_clahe=True, clip=args.clip), args.iters)
+        diff = float(np.abs(out - reference).max())
+        print(f"{'Preprocessor/' + space:<22}{ms:>10.2f}{base / ms:>9.2f}x{diff:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
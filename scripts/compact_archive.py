@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tespitleri gun bazli sutunlu arsive sikistirir ve ozet basar.
+Dashboard bunu ARCHIVE_COMPACT_INTERVAL'de bir kendisi yapar; cron / elle calistirmak icin.
+
+Kullanim:
+    python scripts/compact_archive.py [--csv detections_log.csv] [--db spatial_log.sqlite] [--summary]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import config
+from app.db import archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sutunlu tespit arsivi")
+    parser.add_argument("--csv", default="detections_log.csv", help="CSV tespit logu")
+    parser.add_argument("--db", default=str(config.DB_PATH), help="SpatiaLite veritabani")
+    parser.add_argument("--archive", default=str(config.ARCHIVE_DIR), help="Arsiv klasoru")
+    parser.add_argument("--summary", action="store_true", help="Arsiv ozetini JSON olarak bas")
+    args = parser.parse_args()
+
+    added = archive.compact(args.csv, args.db, archive_dir=args.archive)
+    print(f"Yeni kayit: {added}")
+    if args.summary:
+        print(json.dumps(archive.summary(archive_dir=args.archive, top=10), indent=2))
+
+
+if __name__ == "__main__":
+    main()
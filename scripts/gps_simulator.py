@@ -1,26 +1,45 @@
 #!/usr/bin/env python3
 """
 Balon Baligi Tespit Sistemi
-Laboratuvar Testi icin GPS (NMEA GPGGA) Simulatoru
+Laboratuvar Testi icin GPS (NMEA GPGGA + GPRMC) Simulatoru
 
 Kullanim:
 Linux/Mac: Sanal seri port (pty) uzerinden calisir. Ciktidaki portu config.py'a yazin.
-Windows: Soket (TCP) uzerinden yayin yapar (Uyumluluk modu). Ana kodda pyserial yerine TCP client gerekebilir.
+Windows: Soket (TCP) uzerinden yayin yapar; uygulamada GPS_SOURCE=tcp://127.0.0.1:9090.
+
+Benchmark modlari:
+    python scripts/gps_simulator.py --hz 20 --track rota.gpx --checksum-errors 0.01 --dropout 0.005
+    python scripts/gps_simulator.py --mode file --out tekne.nmea --duration 600 --hz 10   # replay icin log
+    python scripts/gps_simulator.py --mode bench --hz 20 --duration 10   # fix -> GPSState gecikmesi
 """
-import os
-import time
+import argparse
+import bisect
+import csv
 import math
+import os
 import platform
+import random
 import socket
-from datetime import datetime
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
 
 # Baslangic konumu (Ornek: Akdeniz - Antalya aciklari)
 START_LAT = 36.8848
 START_LON = 30.7040
+MAX_HZ = 20.0
 
-def generate_gga_sentence(lat, lon, time_str):
-    """Verilen koordinat ve zamana gore NMEA GPGGA cumlesi uretir."""
-    
+
+def _checksum(core):
+    checksum = 0
+    for char in core:
+        checksum ^= ord(char)
+    return checksum
+
+
+def _nmea_coords(lat, lon):
     # Enlem ve boylami NMEA DDMM.MMMMM formatina cevir
     lat_deg = int(abs(lat))
     lat_min = (abs(lat) - lat_deg) * 60
@@ -31,18 +50,221 @@ def generate_gga_sentence(lat, lon, time_str):
     lon_min = (abs(lon) - lon_deg) * 60
     lon_str = f"{lon_deg:03d}{lon_min:07.4f}"
     lon_dir = 'E' if lon >= 0 else 'W'
+    return lat_str, lat_dir, lon_str, lon_dir
+
+
+def generate_gga_sentence(lat, lon, time_str):
+    """Verilen koordinat ve zamana gore NMEA GPGGA cumlesi uretir."""
+    lat_str, lat_dir, lon_str, lon_dir = _nmea_coords(lat, lon)
 
     # GGA Cumlesi Olustur
     sentence_core = f"GPGGA,{time_str},{lat_str},{lat_dir},{lon_str},{lon_dir},1,08,0.9,5.4,M,46.9,M,,"
-    
-    # Checksum hesapla
-    checksum = 0
-    for char in sentence_core:
-        checksum ^= ord(char)
-    
-    return f"${sentence_core}*{checksum:02X}\r\n"
+    return f"${sentence_core}*{_checksum(sentence_core):02X}\r\n"
+
+
+def generate_rmc_sentence(lat, lon, time_str, date_str, speed_knots=0.0, course=0.0):
+    """Ayni fix icin NMEA GPRMC cumlesi (date_str: ddmmyy)."""
+    lat_str, lat_dir, lon_str, lon_dir = _nmea_coords(lat, lon)
+    sentence_core = (f"GPRMC,{time_str},A,{lat_str},{lat_dir},{lon_str},{lon_dir},"
+                     f"{speed_knots:.1f},{course:.1f},{date_str},,,A")
+    return f"${sentence_core}*{_checksum(sentence_core):02X}\r\n"
+
+
+# -- Rotalar --
+def circle_track(lat=START_LAT, lon=START_LON, radius=0.005, step=0.05):
+    """Eski varsayilan: saniyede `step` radyan donen daire (bir tur ~126 sn)"""
+    n = int(round(2 * math.pi / step))
+    return [(float(i), lat + math.sin(i * step) * radius, lon + math.cos(i * step) * radius) for i in range(n + 1)]
+
+
+def _parse_time(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def load_track(path):
+    """GPX (trkpt/rtept) veya CSV (lat/lon [+ time]) rota -> [(t_sn, lat, lon)].
+
+    Zaman yoksa noktalar 1 sn aralikli sayilir; zamanlar ilk noktaya gore kaydirilir.
+    """
+    points = []
+    if path.lower().endswith('.gpx'):
+        for el in ET.parse(path).iter():
+            if el.tag.rsplit('}', 1)[-1] in ('trkpt', 'rtept'):
+                t = next((c.text for c in el if c.tag.rsplit('}', 1)[-1] == 'time'), None)
+                points.append((_parse_time(t), float(el.get('lat')), float(el.get('lon'))))
+    else:
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip().lower(): v for k, v in row.items() if k}
+                lat = row.get('lat', row.get('latitude'))
+                lon = row.get('lon', row.get('longitude', row.get('lng')))
+                if lat in (None, '') or lon in (None, ''):
+                    continue
+                points.append((_parse_time(row.get('time', row.get('timestamp'))), float(lat), float(lon)))
+    if not points:
+        raise ValueError(f"Rotada nokta yok: {path}")
+    if any(t is None for t, _, _ in points):
+        return [(float(i), lat, lon) for i, (_, lat, lon) in enumerate(points)]
+    t0 = points[0][0]
+    return [(t - t0, lat, lon) for t, lat, lon in points]
+
+
+class TrackPlayer:
+    """Rota uzerinde zamana gore dogrusal ara deger; sona gelince basa doner"""
+    def __init__(self, track):
+        self.track = track
+        self.times = [t for t, _, _ in track]
+        self.duration = self.times[-1] or 1.0
+
+    def position(self, t):
+        """t sn -> (lat, lon, hiz_knot, rota_derece)"""
+        t = t % self.duration if len(self.track) > 1 else 0.0
+        i = max(1, min(bisect.bisect_right(self.times, t), len(self.track) - 1))
+        if len(self.track) == 1:
+            return self.track[0][1], self.track[0][2], 0.0, 0.0
+        (t0, lat0, lon0), (t1, lat1, lon1) = self.track[i - 1], self.track[i]
+        w = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+        lat, lon = lat0 + w * (lat1 - lat0), lon0 + w * (lon1 - lon0)
+        dy = (lat1 - lat0) * 60.0  # deniz mili
+        dx = (lon1 - lon0) * 60.0 * math.cos(math.radians(lat))
+        knots = math.hypot(dx, dy) / (t1 - t0) * 3600.0 if t1 > t0 else 0.0
+        return lat, lon, knots, math.degrees(math.atan2(dx, dy)) % 360.0
+
+
+# -- Hata enjeksiyonu --
+class FaultInjector:
+    """Parser ve GPSState stres testi icin bozuk checksum, sinyal kaybi ve toplu gonderim.
+
+    checksum_rate: cumle basina checksum bozma olasiligi
+    dropout_rate:  epoch basina `dropout_len` sn susma baslatma olasiligi
+    burst_rate:    epoch basina `burst_len` epoch'u biriktirip tek yazimda gonderme olasiligi
+    """
+    def __init__(self, checksum_rate=0.0, dropout_rate=0.0, dropout_len=2.0, burst_rate=0.0, burst_len=5, seed=None):
+        self.checksum_rate = checksum_rate
+        self.dropout_rate = dropout_rate
+        self.dropout_len = dropout_len
+        self.burst_rate = burst_rate
+        self.burst_len = burst_len
+        self.rng = random.Random(seed)
+        self._dropout_until = None
+        self._held = []
+        self._hold_left = 0
+
+        self.corrupted = 0
+        self.dropped = 0
+        self.bursts = 0
+
+    def _corrupt(self, sentence):
+        body, _, tail = sentence.partition('*')
+        return f"{body}*{(int(tail[:2], 16) ^ 0x5A):02X}\r\n"
+
+    def apply(self, t, sentences):
+        """Bir epoch'un cumleleri -> simdi yazilacak metin ('' ise yazma)"""
+        if self._dropout_until is not None and t < self._dropout_until:
+            self.dropped += len(sentences)
+            return ''
+        self._dropout_until = None
+        if self.dropout_rate and self.rng.random() < self.dropout_rate:
+            self._dropout_until = t + self.dropout_len
+            self.dropped += len(sentences)
+            return ''
+        out = []
+        for sentence in sentences:
+            if self.checksum_rate and self.rng.random() < self.checksum_rate:
+                sentence = self._corrupt(sentence)
+                self.corrupted += 1
+            out.append(sentence)
+        if self._hold_left == 0 and self.burst_rate and self.rng.random() < self.burst_rate:
+            self._hold_left = self.burst_len
+            self.bursts += 1
+        if self._hold_left:
+            self._held.extend(out)
+            self._hold_left -= 1
+            if self._hold_left:
+                return ''
+            out, self._held = self._held, []
+        return ''.join(out)
+
+    def stats(self):
+        return {'corrupted': self.corrupted, 'dropped': self.dropped, 'bursts': self.bursts}
+
+
+# -- Uretim dongusu --
+def run_simulation_loop(write_callback, hz=1.0, track=None, rmc=True, faults=None, duration=None,
+                        paced=True, start_time=None, on_epoch=None, quiet=False):
+    """Ortak dongu: GPS cumleleri uretip gonderir. Ulasilan hiz istatistiklerini dondurur.
+
+    paced=False ise beklemeden sanal saatle uretir (log dosyasi yazarken, `duration` gerekli).
+    on_epoch(time_str, wall_time) her yazimdan hemen once cagrilir (gecikme olcumu).
+    """
+    hz = min(float(hz), MAX_HZ)
+    player = TrackPlayer(track or circle_track())
+    faults = faults or FaultInjector()
+    start = time.time() if start_time is None else start_time
+    wall_start = time.perf_counter()
+    stats = {'epochs': 0, 'sentences': 0, 'bytes': 0, 'write_errors': 0}
+    next_report = 5.0
+
+    if not quiet:
+        print(f"NMEA Cümleleri basliyor: {hz:g} Hz, {'GGA+RMC' if rmc else 'GGA'} (Durdurmak icin Ctrl+C)\n")
+    try:
+        n = 0
+        while duration is None or n < duration * hz:
+            t = n / hz
+            if paced:
+                delay = wall_start + t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sim_ts = start + t
+            dt = datetime.fromtimestamp(sim_ts, tz=timezone.utc)
+            time_str = dt.strftime("%H%M%S.") + f"{dt.microsecond // 10000:02d}"
+            lat, lon, knots, course = player.position(t)
+
+            sentences = [generate_gga_sentence(lat, lon, time_str)]
+            if rmc:
+                sentences.append(generate_rmc_sentence(lat, lon, time_str, dt.strftime("%d%m%y"), knots, course))
+            data = faults.apply(t, sentences)
+            n += 1
+            stats['epochs'] += 1
+            if not data:
+                continue
 
-def run_pty_simulator():
+            if on_epoch is not None:
+                on_epoch(time_str, time.time())
+            # Alt sisteme yaz (PTY, TCP Soket, dosya)
+            try:
+                write_callback(data)
+            except Exception as e:
+                print(f"Yazma hatasi: {e}")
+                stats['write_errors'] += 1
+                break
+            stats['sentences'] += data.count('\n')
+            stats['bytes'] += len(data)
+
+            if not quiet and paced and t >= next_report:
+                elapsed = time.perf_counter() - wall_start
+                print(f"{elapsed:6.1f} sn  {stats['epochs'] / elapsed:5.1f} epoch/sn  "
+                      f"{stats['sentences'] / elapsed:6.1f} cumle/sn  {faults.stats()}")
+                next_report += 5.0
+    except KeyboardInterrupt:
+        print("\n\nGPS Simulatoru Kapatiliyor...")
+
+    elapsed = max(time.perf_counter() - wall_start, 1e-9)
+    stats.update(faults.stats())
+    stats.update({'seconds': round(elapsed, 3), 'epoch_hz': round(stats['epochs'] / elapsed, 2),
+                  'sentence_hz': round(stats['sentences'] / elapsed, 2), 'target_hz': hz})
+    if not quiet:
+        print(f"\nSimulasyon ozeti: {stats}")
+    return stats
+
+
+def run_pty_simulator(**loop_args):
     """Linux/Mac icin PTY (Sanal Seri Port) modunda calistir"""
     try:
         import pty
@@ -50,86 +272,138 @@ def run_pty_simulator():
     except ImportError:
         print("PTY modulu bu isletim sisteminde desteklenmiyor.")
         return False
-        
+
     master_fd, slave_fd = pty.openpty()
     tty.setraw(slave_fd)
-    
+
     slave_name = os.ttyname(slave_fd)
     print("=" * 40)
     print("🛳️  GPS Simulator (PTY Modu) Baslatildi!")
     print(f"📡 Lutfen config.py icinde GPS_PORT degerini soyle degistirin:")
-    print(f"👉 GPS_PORT = '{slave_name}'")
+    print(f"👉 GPS_PORT = '{slave_name}'  (veya GPS_SOURCE={slave_name})")
     print("=" * 40)
-    
-    run_simulation_loop(lambda data: os.write(master_fd, data.encode('ascii')))
 
-def run_tcp_simulator():
-    """Windows icin TCP Soket modunda calistir (Com0Com alternatifi)"""
-    HOST = '127.0.0.1'
-    PORT = 9090
-    
+    return run_simulation_loop(lambda data: os.write(master_fd, data.encode('ascii')), **loop_args)
+
+
+def _listen(host, port):
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
+    server.bind((host, port))
+    server.listen(1)
+    return server
+
+
+def run_tcp_simulator(port=9090, **loop_args):
+    """TCP Soket modunda calistir (Windows / GPS_SOURCE=tcp://)"""
+    HOST = '127.0.0.1'
+
     try:
-        server.bind((HOST, PORT))
-        server.listen(1)
+        server = _listen(HOST, port)
     except Exception as e:
         print(f"Soket baslatilamadi: {e}")
         return
-        
+
     print("=" * 40)
     print("🛳️  GPS Simulator (TCP Soket Modu) Baslatildi!")
-    print(f"📡 Dinleniyor: {HOST}:{PORT}")
-    print(f"Tavsiye: Windows'ta serial port emulator (com0com) kullanarak bu TCP portunu COM portuna yonlendirebilirsiniz.")
+    print(f"📡 Dinleniyor: {HOST}:{port}  (GPS_SOURCE=tcp://{HOST}:{port})")
     print("=" * 40)
     print("Istemci bekleniyor...")
-    
+
     conn, addr = server.accept()
     print(f"Istemci baglandi: {addr}")
-    
+
     try:
-        run_simulation_loop(lambda data: conn.sendall(data.encode('ascii')))
+        return run_simulation_loop(lambda data: conn.sendall(data.encode('ascii')), **loop_args)
     except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError):
         print("Istemci baglantiyi kesti.")
     finally:
         conn.close()
         server.close()
 
-def run_simulation_loop(write_callback):
-    """Ortak dongu: Surekli GPS cumleleri uretip gonderir."""
-    current_lat = START_LAT
-    current_lon = START_LON
-    
-    radius = 0.005 # Yaklasik yari cap
-    angle = 0.0
-    
-    print("NMEA Cümleleri basliyor. (Durdurmak icin Ctrl+C)\n")
+
+def run_file_simulator(path, duration, **loop_args):
+    """Replay transport'u icin NMEA log'u yaz (beklemeden, sanal saatle)"""
+    with open(path, 'w', newline='') as f:
+        stats = run_simulation_loop(f.write, duration=duration, paced=False, **loop_args)
+    print(f"{stats['sentences']} cumle yazildi: {path}  (GPS_SOURCE=replay://{os.path.abspath(path)})")
+    return stats
+
+
+def run_bench(duration=10.0, **loop_args):
+    """Uctan uca olcum: simulator -> TCP -> gps_reader_thread -> NMEA parser -> GPSState.
+
+    Her epoch'un soket yazimindan, fix'in GPSState'te yayinlanmasina kadar gecen sure
+    (okuyucularin gordugu gecikme) olculur.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.core.gps import GPSState, gps_reader_thread
+
+    sent = {}
+    latencies = []
+
+    class TimedState(GPSState):
+        def update(self, lat, lon, ts, msg=None):
+            super().update(lat, lon, ts, msg)
+            sent_at = sent.pop(getattr(msg, 'utc', None), None)
+            if sent_at is not None:
+                latencies.append(time.time() - sent_at)
+
+    state = TimedState()
+    server = _listen('127.0.0.1', 0)
+    port = server.getsockname()[1]
+    threading.Thread(target=gps_reader_thread, args=(f"tcp://127.0.0.1:{port}", state), daemon=True).start()
+    conn, _ = server.accept()
     try:
-        while True:
-            time_str = datetime.utcnow().strftime("%H%M%S.00")
-            
-            angle += 0.05
-            sim_lat = current_lat + math.sin(angle) * radius
-            sim_lon = current_lon + math.cos(angle) * radius
-            
-            nmea_sentence = generate_gga_sentence(sim_lat, sim_lon, time_str)
-            
-            # Alt sisteme yaz (PTY veya TCP Soket)
-            try:
-                write_callback(nmea_sentence)
-            except Exception as e:
-                print(f"Yazma hatasi: {e}")
-                break
-                
-            print(f"Yayinlaniyor: {nmea_sentence.strip()}", end='\r')
-            time.sleep(1.0)
-            
-    except KeyboardInterrupt:
-        print("\n\nGPS Simulatoru Kapatiliyor...")
+        stats = run_simulation_loop(lambda data: conn.sendall(data.encode('ascii')), duration=duration,
+                                    on_epoch=lambda utc, at: sent.setdefault(utc, at), quiet=True, **loop_args)
+        time.sleep(0.5)  # Son fix'ler okunsun
+    finally:
+        conn.close()
+        server.close()
+
+    lat = sorted(latencies)
+    pct = lambda p: round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] * 1000.0, 2) if lat else None
+    stats.update({'fixes_published': len(latencies), 'history': len(state.history),
+                  'latency_ms': {'p50': pct(50), 'p95': pct(95), 'p99': pct(99), 'max': pct(100)}})
+    print(f"Benchmark: {stats}")
+    return stats
+
+
+def main():
+    default_mode = 'tcp' if platform.system() == "Windows" else 'pty'
+    parser = argparse.ArgumentParser(description="GPS NMEA simulatoru")
+    parser.add_argument("--mode", choices=['pty', 'tcp', 'file', 'bench'], default=default_mode)
+    parser.add_argument("--port", type=int, default=9090, help="TCP modu portu")
+    parser.add_argument("--out", default="gps_sim.nmea", help="file modu cikti dosyasi")
+    parser.add_argument("--hz", type=float, default=1.0, help=f"Fix hizi (max {MAX_HZ:g})")
+    parser.add_argument("--track", help="GPX veya CSV rota (varsayilan: daire)")
+    parser.add_argument("--no-rmc", action="store_true", help="Sadece GGA gonder")
+    parser.add_argument("--duration", type=float, help="Sure (sn); file modunda zorunlu, bench'te 10")
+    parser.add_argument("--checksum-errors", type=float, default=0.0, help="Bozuk checksum olasiligi / cumle")
+    parser.add_argument("--dropout", type=float, default=0.0, help="Sinyal kaybi baslatma olasiligi / epoch")
+    parser.add_argument("--dropout-len", type=float, default=2.0, help="Sinyal kaybi suresi (sn)")
+    parser.add_argument("--burst", type=float, default=0.0, help="Toplu gonderim olasiligi / epoch")
+    parser.add_argument("--burst-len", type=int, default=5, help="Bir burst'te biriktirilen epoch")
+    parser.add_argument("--seed", type=int, help="Hata enjeksiyonu icin rastgele tohum")
+    args = parser.parse_args()
+
+    loop_args = {
+        'hz': args.hz,
+        'track': load_track(args.track) if args.track else None,
+        'rmc': not args.no_rmc,
+        'faults': FaultInjector(args.checksum_errors, args.dropout, args.dropout_len,
+                                args.burst, args.burst_len, seed=args.seed),
+    }
+    if args.mode == 'file':
+        run_file_simulator(args.out, args.duration or 600.0, **loop_args)
+    elif args.mode == 'bench':
+        run_bench(args.duration or 10.0, **loop_args)
+    elif args.mode == 'tcp':
+        run_tcp_simulator(args.port, duration=args.duration, **loop_args)
+    elif run_pty_simulator(duration=args.duration, **loop_args) is False:
+        run_tcp_simulator(args.port, duration=args.duration, **loop_args)
+
 
 if __name__ == "__main__":
-    if platform.system() == "Windows":
-        run_tcp_simulator()
-    else:
-        run_pty_simulator()
+    main()
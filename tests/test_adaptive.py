@@ -0,0 +1,115 @@
+"""
+Uyarlanabilir stream testleri — gecikmeye gore seviye secimi, ack kuyrugu ve istemci kaydi.
+"""
+import numpy as np
+
+from app.dashboard.adaptive import AdaptiveController, ClientRegistry
+from app.dashboard.stream import FrameBuffer, generate_mjpeg, stream_levels
+
+LEVELS = [(35, (320, 240), 3), (55, (480, 360), 10), (70, None, 15)]
+
+
+def _ctrl(**kwargs):
+    params = dict(levels=LEVELS, target_latency=0.3, max_backlog=2, ack_timeout=3.0)
+    params.update(kwargs)
+    return AdaptiveController('c1', **params)
+
+
+class TestAdaptiveController:
+    def test_starts_at_highest_level(self):
+        assert _ctrl().settings() == (70, None, 15)
+
+    def test_steps_down_on_high_latency(self):
+        ctrl = _ctrl()
+        ctrl.observe(1.5, now=10.0)
+        assert ctrl.level == 1
+        ctrl.observe(1.5, now=10.5)  # DOWN_HOLD dolmadan ikinci dusus yok
+        assert ctrl.level == 1
+        ctrl.observe(1.5, now=11.6)
+        assert ctrl.level == 0
+        ctrl.observe(1.5, now=13.0)
+        assert ctrl.level == 0  # en alt seviye
+
+    def test_steps_up_after_calm_period(self):
+        ctrl = _ctrl(start_level=0)
+        ctrl.observe(0.05, now=10.0)
+        assert ctrl.level == 1
+        ctrl.observe(0.05, now=12.0)
+        assert ctrl.level == 1  # UP_HOLD beklenir
+        ctrl.observe(0.05, now=15.5)
+        assert ctrl.level == 2
+
+    def test_backlog_blocks_sending(self):
+        ctrl = _ctrl()
+        assert ctrl.ready_to_send(now=0.0)
+        ctrl.on_sent(1, now=0.0)
+        ctrl.on_sent(2, now=0.1)
+        assert not ctrl.ready_to_send(now=0.2)
+        ctrl.on_ack(2, now=0.25)  # eski bekleyen (1) da temizlenir
+        assert ctrl.backlog == 0
+        assert ctrl.ready_to_send(now=0.3)
+
+    def test_fps_limit(self):
+        ctrl = _ctrl(start_level=0)  # 3 FPS
+        ctrl.on_sent(1, now=0.0)
+        ctrl.on_ack(1, now=0.01)
+        assert not ctrl.ready_to_send(now=0.2)
+        assert ctrl.ready_to_send(now=0.34)
+
+    def test_missing_acks_count_as_latency(self):
+        """Ack gelmeyen kareler zaman asiminda gecikme sayilip seviyeyi dusurmeli"""
+        ctrl = _ctrl()
+        ctrl.on_sent(1, now=0.0)
+        ctrl.on_sent(2, now=0.1)
+        assert ctrl.ready_to_send(now=5.0)
+        assert ctrl.backlog == 0
+        assert ctrl.level < 2
+
+    def test_rtt_from_ack(self):
+        ctrl = _ctrl()
+        ctrl.on_sent(7, now=1.0)
+        ctrl.on_ack(7, now=1.2)
+        assert abs(ctrl.latency - 0.2) < 1e-9
+        ctrl.on_ack(99, now=1.3)  # bilinmeyen ack yok sayilir
+
+    def test_stats(self):
+        stats = _ctrl(start_level=1).stats()
+        assert stats['size'] == '480x360'
+        assert stats['quality'] == 55 and stats['fps'] == 10
+        assert stats['latency_ms'] is None
+
+
+class TestClientRegistry:
+    def test_register_get_remove(self):
+        reg = ClientRegistry()
+        ctrl = reg.register('sid1', kind='ws', levels=LEVELS)
+        assert reg.register('sid1') is ctrl
+        reg.register('mjpeg:1', kind='mjpeg', levels=LEVELS)
+        assert [c.client_id for c in reg.clients('ws')] == ['sid1']
+        assert len(reg.stats()) == 2
+        reg.remove('sid1')
+        assert reg.get('sid1') is None
+
+
+class TestAdaptiveMjpeg:
+    def test_generator_uses_controller_level(self):
+        buf = FrameBuffer()
+        buf.update(detection=np.full((480, 640, 3), 90, dtype=np.uint8))
+        ctrl = _ctrl(start_level=0)
+        gen = generate_mjpeg(buf, 'detection', controller=ctrl)
+        part = next(gen)
+        assert part.startswith(b'--frame')
+        buf.update(detection=np.full((480, 640, 3), 91, dtype=np.uint8))
+        next(gen)  # onceki chunk'in gonderim suresi olculur
+        assert ctrl.latency is not None
+
+    def test_small_streams_never_exceed_defaults(self):
+        # raw/clahe: en ust seviye bile 320x240 / q60 (stream_settings) ustune cikmaz
+        levels = stream_levels('raw', LEVELS)
+        assert levels == [(35, (320, 240), 3), (55, (320, 240), 10), (60, (320, 240), 15)]
+        assert AdaptiveController('m1', 'mjpeg', levels=levels).settings() == (60, (320, 240), 15)
+        assert stream_levels('detection', LEVELS) == LEVELS
+
+    def test_capped_levels_merge(self):
+        levels = [(50, (320, 240), 5), (50, (640, 480), 10), (80, None, 15)]
+        assert stream_levels('clahe', levels) == [(50, (320, 240), 10), (60, (320, 240), 15)]
@@ -0,0 +1,165 @@
+"""
+Sutunlu arsiv testleri — artimli sikistirma (DB id / CSV ofseti), gun partition'lari,
+parca birlestirme, vektorel filtre ve ozetler.
+SpatiaLite yerine ST_X/ST_Y duz SQLite'a Python fonksiyonu olarak eklenir.
+"""
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.db import archive
+from app.db.pool import ReadPool
+
+DAY = 86400.0
+T0 = 1767225600.0  # 2026-01-01 00:00 UTC
+
+
+def _insert(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def spatial_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "archive.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+    conn.close()
+    _insert(path, [
+        ('Lagocephalus sceleratus', 0.95, T0 + 3600, '30.701 36.881'),
+        ('Lagocephalus sceleratus', 0.55, T0 + 2 * 3600, '30.702 36.882'),
+        ('Sphoeroides pachygaster', 0.75, T0 + DAY + 3600, '29.000 41.000'),
+    ])
+
+    def connect():
+        c = sqlite3.connect(path, check_same_thread=False)
+        c.create_function("ST_X", 1, lambda g: float(g.split()[0]) if g else None)
+        c.create_function("ST_Y", 1, lambda g: float(g.split()[1]) if g else None)
+        c.row_factory = sqlite3.Row
+        return c
+    pool = ReadPool(path, connect=connect)
+    monkeypatch.setattr('app.db.pool.get_pool', lambda db_path=None: pool)
+    return path
+
+
+class TestCompaction:
+    def test_partitions_by_utc_date(self, tmp_path, spatial_db):
+        out = tmp_path / "archive"
+        assert archive.compact("yok.csv", spatial_db, archive_dir=out) == 3
+        assert sorted(d for d in os.listdir(out) if d.startswith('date=')) == ['date=2026-01-01', 'date=2026-01-02']
+        assert archive.compact("yok.csv", spatial_db, archive_dir=out) == 0
+
+    def test_incremental_and_merge(self, tmp_path, spatial_db):
+        out = tmp_path / "archive"
+        archive.compact("yok.csv", spatial_db, archive_dir=out, max_parts=2)
+        for i in range(2):
+            _insert(spatial_db, [('Lagocephalus sceleratus', 0.8, T0 + 600 * (i + 1), '30.7 36.9')])
+            archive.compact("yok.csv", spatial_db, archive_dir=out, max_parts=2)
+        day = out / 'date=2026-01-01'
+        assert len(archive._parts(str(day))) == 1  # 3 parca -> birlestirildi
+        data = archive.load(archive_dir=out)
+        assert len(data['id']) == 5
+        assert sorted(data['id'].tolist()) == [1, 2, 3, 4, 5]
+        day_ts = archive.load(end=T0 + DAY, archive_dir=out)['timestamp']
+        assert np.all(np.diff(day_ts) >= 0)
+
+    def test_csv_log_offsets_and_rotation(self, tmp_path):
+        log = str(tmp_path / "log.csv")
+        out = tmp_path / "archive"
+        header = ["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"]
+
+        def write(path, mode, times):
+            with open(path, mode, newline='') as f:
+                w = csv.writer(f)
+                if mode == 'w':
+                    w.writerow(header)
+                for t in times:
+                    w.writerow(["x", t[:10], t[11:], "0.7", 1, 2, 3, 4])
+
+        write(log, 'w', ["2026-01-01 10:00:00"])
+        assert archive.compact(log, None, archive_dir=out) == 1
+        write(log, 'a', ["2026-01-01 11:00:00"])
+        assert archive.compact(log, None, archive_dir=out) == 1
+
+        write(log + ".new", 'w', ["2026-01-02 09:00:00"])
+        os.replace(log + ".new", log)  # Rotasyon: arsiv silinmez, yeni log bastan okunur
+        assert archive.compact(log, None, archive_dir=out) == 1
+        data = archive.load(archive_dir=out)
+        assert len(data['timestamp']) == 3
+        assert np.isnan(data['latitude']).all() and (data['id'] == -1).all()
+        expected = datetime(2026, 1, 2, 9, 0, 0).timestamp()
+        assert data['timestamp'].max() == expected
+
+    def test_source_switch_rebuilds(self, tmp_path, spatial_db):
+        # GPS fix'inden once sadece CSV vardir; ilk DB kaydinda arsiv DB'den bastan kurulur
+        log = str(tmp_path / "log.csv")
+        out = tmp_path / "archive"
+        with open(log, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
+            w.writerow(["x", "2025-12-31", "10:00:00", "0.7", 1, 2, 3, 4])
+        assert archive.compact(log, str(tmp_path / "yok.sqlite"), archive_dir=out) == 1
+        assert archive.compact(log, spatial_db, archive_dir=out) == 3
+        data = archive.load(archive_dir=out)
+        assert sorted(data['id'].tolist()) == [1, 2, 3]  # CSV kaydi iki kez sayilmaz
+        assert not os.path.exists(out / 'date=2025-12-31')
+        assert archive.summary(archive_dir=out)['total'] == 3
+        assert archive.compact(log, spatial_db, archive_dir=out) == 0
+
+    def test_merge_crash_keeps_day(self, tmp_path, spatial_db, monkeypatch):
+        out = tmp_path / "archive"
+        archive.compact("yok.csv", spatial_db, archive_dir=out)
+        _insert(spatial_db, [('Lagocephalus sceleratus', 0.8, T0 + 600, '30.7 36.9')])
+
+        replace = os.replace
+
+        def crash(src, dst):
+            if os.path.basename(src).startswith('merged'):
+                raise KeyboardInterrupt("birlesik parca yerine konmadan coktu")
+            replace(src, dst)
+        with monkeypatch.context() as m:
+            m.setattr(archive.os, 'replace', crash)
+            with pytest.raises(KeyboardInterrupt):
+                archive.compact("yok.csv", spatial_db, archive_dir=out, max_parts=1)
+        day = archive.load(end=T0 + DAY, archive_dir=out)
+        assert {1, 2, 4} <= set(day['id'].tolist())
+
+
+class TestReadApi:
+    @pytest.fixture
+    def out(self, tmp_path, spatial_db):
+        out = tmp_path / "archive"
+        archive.compact("yok.csv", spatial_db, archive_dir=out)
+        return out
+
+    def test_filters(self, out):
+        assert len(archive.load(start=T0 + DAY, archive_dir=out)['id']) == 1
+        assert len(archive.load(min_conf=0.7, archive_dir=out)['id']) == 2
+        assert archive.load(species='Sphoeroides pachygaster', archive_dir=out)['id'].tolist() == [3]
+        near = archive.load(bbox=(36.8, 30.6, 37.0, 30.8), columns=['id'], archive_dir=out)
+        assert list(near) == ['id'] and near['id'].tolist() == [1, 2]
+
+    def test_aggregates(self, out):
+        data = archive.load(archive_dir=out)
+        counts, edges = archive.confidence_histogram(data, bins=4)
+        assert counts.tolist() == [0, 0, 1, 2] and edges[-1] == 1.0
+        hours = archive.hourly_counts(data)
+        assert hours[1] == 2 and hours[2] == 1 and hours.sum() == 3
+        cells = archive.density(data, cell_deg=0.1)
+        assert cells[0][2] == 2 and abs(cells[0][0] - 36.85) < 1e-9
+
+    def test_summary(self, out):
+        s = archive.summary(archive_dir=out)
+        assert s['total'] == 3 and s['first_ts'] == T0 + 3600
+        assert sum(s['confidence_hist']['counts']) == 3 and len(s['hourly_utc']) == 24
+
+    def test_empty_archive(self, tmp_path):
+        s = archive.summary(archive_dir=tmp_path / "bos")
+        assert s['total'] == 0 and s['density'] == [] and s['mean_conf'] is None
@@ -0,0 +1,135 @@
+"""
+Okuma baglanti havuzu testleri — baglanti yeniden kullanimi, sinir/bekleme, hata sonrasi davranis
+ve SpatiaLite eklenti adinin onbelleklenmesi. Duz SQLite ile calisir.
+"""
+import sqlite3
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.db import pool as pool_mod
+from app.db.pool import DirectConnection, ReadPool, get_pool, load_spatialite, pool_stats
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "pool.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE spatial_log (id INTEGER PRIMARY KEY, species TEXT, timestamp REAL)")
+    conn.executemany("INSERT INTO spatial_log (species, timestamp) VALUES (?, ?)",
+                     [("Pufferfish", float(i)) for i in range(5)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    pool_mod.reset_extension_cache()
+    yield
+    pool_mod.reset_extension_cache()
+    pool_mod.close_pools()
+
+
+class TestReadPool:
+    def test_connection_is_reused(self, db_path):
+        pool = ReadPool(db_path, size=2)
+        with pool.connection() as first:
+            assert first.execute("SELECT COUNT(*) FROM spatial_log").fetchone()[0] == 5
+        with pool.connection() as second:
+            pass
+        assert first is second
+        stats = pool.stats()
+        assert stats['open'] == 1 and stats['checkouts'] == 2 and stats['in_use'] == 0
+        assert stats['last_query_ms'] is not None
+
+    def test_rows_and_read_only(self, db_path):
+        pool = ReadPool(db_path)
+        with pool.connection() as conn:
+            row = conn.execute("SELECT species FROM spatial_log").fetchone()
+            assert row['species'] == "Pufferfish"
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection() as conn:
+                conn.execute("DELETE FROM spatial_log")
+        # Sorgu hatasi baglantiyi havuzdan atmaz
+        assert pool.stats()['open'] == 1 and pool.discarded == 0
+
+    def test_waits_when_exhausted(self, db_path):
+        pool = ReadPool(db_path, size=1, timeout=2.0)
+        held = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with pool.connection():
+                held.set()
+                release.wait(2.0)
+
+        t = threading.Thread(target=holder)
+        t.start()
+        held.wait(2.0)
+        threading.Timer(0.05, release.set).start()
+        with pool.connection():
+            pass
+        t.join()
+        assert pool.waits == 1 and pool.stats()['open'] == 1
+
+    def test_timeout_when_exhausted(self, db_path):
+        pool = ReadPool(db_path, size=1, timeout=0.01)
+        with pool.connection():
+            with pytest.raises(TimeoutError):
+                with pool.connection():
+                    pass
+
+    def test_non_sql_error_discards_connection(self, db_path):
+        pool = ReadPool(db_path)
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                raise RuntimeError("boom")
+        assert pool.discarded == 1 and pool.stats()['open'] == 0
+
+    def test_shared_pool_per_path(self, db_path, tmp_path):
+        assert get_pool(db_path) is get_pool(db_path)
+        assert get_pool(db_path) is not get_pool(str(tmp_path / "other.sqlite"))
+        assert len(pool_stats()) == 2
+
+
+class TestDirectConnection:
+    def test_single_private_connection(self, db_path):
+        with DirectConnection(db_path) as direct:
+            assert direct._conn is None  # ilk kullanimda acilir
+            with direct.connection() as first:
+                assert first.execute("SELECT COUNT(*) FROM spatial_log").fetchone()[0] == 5
+            with direct.connection() as second:
+                with pytest.raises(sqlite3.OperationalError):
+                    second.execute("DELETE FROM spatial_log")  # query_only
+            assert first is second
+        assert direct._conn is None
+        assert get_pool(db_path).stats()['checkouts'] == 0  # paylasilan havuza dokunulmaz
+
+
+class TestExtensionCache:
+    def _conn(self, loadable=()):
+        conn = MagicMock()
+
+        def execute(sql):
+            if not any(f"'{ext}'" in sql for ext in loadable):
+                raise sqlite3.OperationalError("not found")
+        conn.execute.side_effect = execute
+        return conn
+
+    def test_probes_once_and_remembers_working_name(self):
+        first = self._conn(loadable=('libspatialite.so',))
+        assert load_spatialite(first) == 'libspatialite.so'
+        assert first.execute.call_count == 2
+
+        second = self._conn(loadable=('libspatialite.so',))
+        assert load_spatialite(second) == 'libspatialite.so'
+        second.execute.assert_called_once_with("SELECT load_extension('libspatialite.so')")
+
+    def test_missing_extension_not_probed_again(self, capsys):
+        assert load_spatialite(self._conn()) is None
+        assert "WARNING" in capsys.readouterr().out
+        again = self._conn()
+        assert load_spatialite(again) is None
+        again.execute.assert_not_called()
@@ -306,6 +306,22 @@ class TestFrameQueue:
             items.append(q.get_nowait())
         assert items == ['B', 'C', 'D'], f"Kuyruk sırası hatalı: {items}"
 
+    def test_collect_batch_respects_size_and_deadline(self):
+        """Batch modu: en fazla N frame toplanmali, kuyruk bosalinca deadline'da donmeli"""
+        import app.dashboard.server as srv
+        while not srv.frame_queue.empty():
+            srv.frame_queue.get_nowait()
+        for i in range(4):
+            srv.frame_queue.put_nowait(i)
+
+        batch = srv._collect_batch(3, timeout=0.01)
+        assert batch == [0, 1, 2]
+
+        start = time.time()
+        batch = srv._collect_batch(3, timeout=0.05)
+        assert batch == [3]
+        assert time.time() - start < 1.0
+
 
 # ─────────────────────────────────────────────────────────────────
 # Recording Kapali → Loglama Olmamali
@@ -404,3 +404,25 @@ class TestExportEndpoints:
                                 json={'name': '', 'url': ''},
                                 content_type='application/json')
         assert resp.status_code == 400
+
+    def test_exports_are_streamed(self):
+        """Export cevaplari bellekte toplanmadan chunked gonderilir"""
+        for url in ('/api/export/geojson', '/api/export/csv', '/api/export/darwincore'):
+            resp = self.client.get(url)
+            assert resp.status_code == 200
+            assert resp.is_streamed
+
+    def test_export_etag_not_modified(self):
+        """Degismeyen export onbellekten ETag ile sunulur, If-None-Match -> 304"""
+        resp = self.client.get('/api/export/csv')
+        etag = resp.headers.get('ETag')
+        assert etag
+        resp = self.client.get('/api/export/csv', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+
+    def test_export_since(self):
+        resp = self.client.get('/api/export/geojson?since=2026-01-01T00:00:00Z')
+        assert resp.status_code == 200
+        assert json.loads(resp.data)["type"] == "FeatureCollection"
+        resp = self.client.get('/api/export/csv?since=dun')
+        assert resp.status_code == 400
@@ -0,0 +1,203 @@
+"""
+Export onbellegi testleri — ETag ile diskten sunma, artimli ekleme (DB id / CSV bayt ofseti),
+rotasyonda yeniden uretim ve since= ile delta export.
+SpatiaLite yerine ST_X/ST_Y duz SQLite'a Python fonksiyonu olarak eklenir.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+from app.db.pool import ReadPool
+from app.export import formats
+from app.export.cache import ExportCache
+
+LOG_HEADER = ["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"]
+
+
+def _insert(path, *timestamps):
+    conn = sqlite3.connect(path)
+    for ts in timestamps:
+        conn.execute("INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES ('Pufferfish', 0.9, ?, ?)",
+                     (ts, f"30.{int(ts)} 36.{int(ts)}"))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def spatial_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+    conn.close()
+    _insert(path, 100.0, 101.0, 102.0)
+
+    def connect():
+        c = sqlite3.connect(path, check_same_thread=False)
+        c.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+        c.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+        c.row_factory = sqlite3.Row
+        return c
+    pool = ReadPool(path, connect=connect)
+    monkeypatch.setattr('app.db.pool.get_pool', lambda db_path=None: pool)
+    monkeypatch.setattr(formats, 'DB_PAGE_SIZE', 2)
+    return path
+
+
+def _log(path, rows, mode='a'):
+    with open(path, mode, newline='') as f:
+        w = csv.writer(f)
+        if mode == 'w':
+            w.writerow(LOG_HEADER)
+        for ts, date, time_ in rows:
+            w.writerow([ts, date, time_, "0.8", "1", "2", "3", "4"])
+
+
+@pytest.fixture
+def log_csv(tmp_path):
+    path = str(tmp_path / "log.csv")
+    _log(path, [("1", "2026-01-01", "10:00:00"), ("2", "2026-01-01", "10:00:05")], mode='w')
+    return path
+
+
+def _read(path):
+    with open(path, newline='') as f:
+        return f.read()
+
+
+class TestDbCache:
+    def test_unchanged_export_is_hit(self, tmp_path, spatial_db, log_csv):
+        cache = ExportCache(tmp_path / "exports", log_csv, spatial_db)
+        path, etag = cache.get('csv')
+        assert cache.get('csv') == (path, etag)
+        assert cache.stats() == {'hits': 1, 'appends': 0, 'rebuilds': 1}
+
+    @pytest.mark.parametrize("kind", ['csv', 'geojson'])
+    def test_append_matches_full_export(self, tmp_path, spatial_db, log_csv, kind):
+        cache = ExportCache(tmp_path / "exports", log_csv, spatial_db)
+        _, etag = cache.get(kind)
+        _insert(spatial_db, 103.0, 104.0)
+        path, new_etag = cache.get(kind)
+        assert new_etag != etag
+        assert cache.stats()['appends'] == 1
+
+        stream = formats.iter_csv if kind == 'csv' else formats.iter_geojson
+        full = "".join(stream(log_csv, spatial_db))
+        assert _read(path) == full
+        if kind == 'geojson':
+            assert len(json.loads(full)["features"]) == 5
+
+    def test_darwincore_append(self, tmp_path, spatial_db, log_csv):
+        cache = ExportCache(tmp_path / "exports", log_csv, spatial_db)
+        cache.get('dwca')
+        _insert(spatial_db, 103.0)
+        path, _ = cache.get('dwca')
+        with zipfile.ZipFile(path) as zf:
+            assert zf.testzip() is None
+            cached = zf.read("occurrence.csv")
+        with zipfile.ZipFile(io.BytesIO(formats.to_darwincore_archive(log_csv, spatial_db))) as zf:
+            assert cached == zf.read("occurrence.csv")
+
+    def test_direct_mode_bypasses_shared_pool(self, tmp_path, spatial_db, log_csv, monkeypatch):
+        # tpool thread'inde yesil havuz kullanilmaz; her get() kendi baglantisini acar/kapatir
+        from app.db import pool as pool_mod
+        connect = pool_mod.get_pool().connect
+        opened = []
+
+        def direct_connect(self):
+            opened.append(connect())
+            return opened[-1]
+
+        def no_pool(db_path=None):
+            raise AssertionError("paylasilan havuz kullanilmamali")
+        monkeypatch.setattr(pool_mod.DirectConnection, '_connect', direct_connect)
+        monkeypatch.setattr(pool_mod, 'get_pool', no_pool)
+        cache = ExportCache(tmp_path / "exports", log_csv, spatial_db, direct=True)
+        path, _ = cache.get('geojson')
+        assert len(json.loads(_read(path))["features"]) == 3
+        assert len(opened) == 1 and cache._db is None
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")  # kapatildi
+
+    def test_truncated_artifact_is_rebuilt(self, tmp_path, spatial_db, log_csv):
+        cache = ExportCache(tmp_path / "exports", log_csv, spatial_db)
+        path, _ = cache.get('geojson')
+        with open(path, 'r+b') as f:
+            f.truncate(10)  # Yarida kalan yazim
+        path, _ = cache.get('geojson')
+        assert len(json.loads(_read(path))["features"]) == 3
+        assert cache.stats()['rebuilds'] == 2
+
+
+class TestCsvCache:
+    def test_appends_complete_lines_only(self, tmp_path, log_csv):
+        cache = ExportCache(tmp_path / "exports", log_csv, None)
+        cache.get('csv')
+        _log(log_csv, [("3", "2026-01-01", "10:00:09")])
+        with open(log_csv, 'a') as f:
+            f.write("4,2026-01-01,10:0")  # Henuz yazilmakta olan satir
+        path, _ = cache.get('csv')
+        rows = list(csv.reader(io.StringIO(_read(path))))
+        assert [r[0] for r in rows[1:]] == ["1", "2", "3"]
+
+    def test_rotated_log_is_rebuilt(self, tmp_path, log_csv):
+        cache = ExportCache(tmp_path / "exports", log_csv, None)
+        cache.get('csv')
+        rotated = log_csv + ".new"
+        _log(rotated, [("9", "2026-01-02", "08:00:00")] * 3, mode='w')
+        os.replace(rotated, log_csv)
+        path, _ = cache.get('csv')
+        assert cache.stats()['rebuilds'] == 2
+        assert _read(path) == "".join(formats.iter_csv(log_csv))
+
+    def test_indexed_rotation_appends(self, tmp_path):
+        """Logger'in dondurdugu (indekslenmis) segment yeniden uretim gerektirmez"""
+        from app.db.csvlog import CsvLogger
+        path = str(tmp_path / "rotating.csv")
+        log = CsvLogger(path, flush_rows=1, max_bytes=0, rotate_daily=False, fsync_interval=None)
+        log.write_rows([["1", "2026-01-01", "10:00:00", "0.8", 1, 2, 3, 4]])
+        cache = ExportCache(tmp_path / "exports", path, None)
+        cache.get('csv')
+        log.write_rows([["2", "2026-01-01", "10:00:05", "0.8", 1, 2, 3, 4]])
+        log.rotate()
+        log.write_rows([["3", "2026-01-01", "10:00:09", "0.8", 1, 2, 3, 4]])
+        out, _ = cache.get('csv')
+        assert cache.stats() == {'hits': 0, 'appends': 1, 'rebuilds': 1}
+        assert _read(out) == "".join(formats.iter_csv(path))
+
+
+class TestSince:
+    def test_parse_since(self):
+        assert formats.parse_since("1767225600") == 1767225600.0
+        assert formats.parse_since("2026-01-01T00:00:00Z") == 1767225600.0
+        assert formats.parse_since(None) is None
+        with pytest.raises(ValueError):
+            formats.parse_since("dun")
+
+    def test_db_delta(self, spatial_db, log_csv):
+        doc = json.loads("".join(formats.iter_geojson(log_csv, spatial_db, since=100.0)))
+        assert [f["properties"]["timestamp"] for f in doc["features"]] == [101.0, 102.0]
+
+    def test_occurrence_ids_are_stable(self, spatial_db, log_csv):
+        full = list(formats._occurrence_rows('db', formats._iter_detections_db(spatial_db)))
+        delta = list(formats._occurrence_rows('db', formats._iter_detections_db(spatial_db, since=101.0)))
+        assert [r[0] for r in delta] == [full[-1][0]] == ["AG-PF-000003"]
+
+    def test_csv_occurrence_ids_unique_within_burst(self, tmp_path):
+        # _log_detection_csv bir karedeki tum kutulara ayni Timestamp'i yazar
+        path = str(tmp_path / "burst.csv")
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(LOG_HEADER)
+            for box in ((10, 20, 110, 120), (300, 40, 380, 140), (500, 200, 600, 260)):
+                w.writerow(["101500_123456", "2026-06-01", "10:15:00", "0.9", *box])
+        ids = [r[0] for r in formats._occurrence_rows('csv', formats._iter_detections_csv(path))]
+        assert len(set(ids)) == 3
+        assert ids[0] == "AG-PF-20260601-101500_123456-10_20_110_120"
+        delta = formats._occurrence_rows('csv', formats._iter_detections_csv(path, since=formats.parse_since(0)))
+        assert [r[0] for r in delta] == ids
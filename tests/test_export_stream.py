@@ -0,0 +1,99 @@
+"""
+Akışlı export testleri — DB'den sayfa sayfa okuma, parça parça GeoJSON / CSV ve akışlı ZIP yazımı.
+SpatiaLite yerine ST_X/ST_Y düz SQLite'a Python fonksiyonu olarak eklenir.
+"""
+import csv
+import io
+import json
+import sqlite3
+import zipfile
+
+import pytest
+
+from app.db.pool import ReadPool
+from app.export import formats
+from app.export.formats import (iter_geojson, iter_csv, iter_darwincore_archive,
+                                to_geojson, to_csv_download, to_darwincore_archive)
+
+
+@pytest.fixture
+def spatial_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "stream.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+    # Ayni timestamp'li iki satir: keyset sayfa siniri id ile ayrilmali
+    for ts in (100.0, 101.0, 101.0, 102.0, 103.0):
+        conn.execute("INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES ('Pufferfish', 0.9, ?, ?)",
+                     (ts, f"30.{int(ts)} 36.{int(ts)}"))
+    conn.commit()
+    conn.close()
+
+    def connect():
+        c = sqlite3.connect(path, check_same_thread=False)
+        c.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+        c.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+        c.row_factory = sqlite3.Row
+        return c
+    pool = ReadPool(path, connect=connect)
+    monkeypatch.setattr('app.db.pool.get_pool', lambda db_path=None: pool)
+    monkeypatch.setattr(formats, 'DB_PAGE_SIZE', 2)
+    monkeypatch.setattr(formats, 'CHUNK_ROWS', 2)
+    return path
+
+
+@pytest.fixture
+def log_csv(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(["Timestamp", "Date", "Time", "Confidence", "BBox_X1", "BBox_Y1", "BBox_X2", "BBox_Y2"])
+        w.writerow(["1", "2026-01-01", "10:00:00", "0.8", "1", "2", "3", "4"])
+    return path
+
+
+class TestDbPaging:
+    def test_all_rows_in_time_order(self, spatial_db):
+        rows = list(formats._iter_detections_db(spatial_db, page_size=2))
+        assert [r['id'] for r in rows] == [1, 2, 3, 4, 5]
+
+    def test_missing_db_yields_nothing(self, tmp_path):
+        assert list(formats._iter_detections_db(str(tmp_path / "yok.sqlite"))) == []
+
+
+class TestStreamingFormats:
+    def test_geojson_chunks_form_valid_document(self, spatial_db, log_csv):
+        chunks = list(iter_geojson(log_csv, spatial_db))
+        assert len(chunks) > 2
+        doc = json.loads("".join(chunks))
+        assert doc == to_geojson(log_csv, spatial_db)
+        assert len(doc["features"]) == 5
+        assert doc["features"][0]["geometry"]["coordinates"] == [30.1, 36.1]
+
+    def test_geojson_csv_fallback(self, log_csv):
+        doc = json.loads("".join(iter_geojson(log_csv)))
+        assert doc["features"][0]["geometry"] is None
+
+    def test_csv_chunks(self, spatial_db, log_csv):
+        chunks = list(iter_csv(log_csv, spatial_db))
+        assert len(chunks) == 3  # baslik + 2 satir, 2 satir, 1 satir
+        rows = list(csv.reader(io.StringIO("".join(chunks))))
+        assert rows[0] == ["Species", "Confidence", "Timestamp", "Latitude", "Longitude"]
+        assert len(rows) == 6
+        assert "".join(chunks) == to_csv_download(log_csv, spatial_db)
+
+    def test_darwincore_streamed_zip(self, spatial_db, log_csv):
+        chunks = list(iter_darwincore_archive(log_csv, spatial_db))
+        assert len(chunks) > 1
+        zf = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        assert zf.testzip() is None
+        assert set(zf.namelist()) == {"occurrence.csv", "meta.xml", "eml.xml"}
+        lines = zf.read("occurrence.csv").decode("utf-8").strip().split("\r\n")
+        assert len(lines) == 6
+        assert lines[1].split("\t")[0] == "AG-PF-000001"
+        zf.close()
+
+    def test_darwincore_wrapper(self, log_csv):
+        zf = zipfile.ZipFile(io.BytesIO(to_darwincore_archive(log_csv)))
+        assert "occurrence.csv" in zf.namelist()
+        zf.close()
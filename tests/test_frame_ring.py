@@ -0,0 +1,119 @@
+"""
+FrameRing testleri — sifir kopyali kamera halkasi, referans sayimi ve FrameBuffer entegrasyonu.
+"""
+import numpy as np
+import pytest
+
+from app.core.frame_ring import FrameRing, FrameRef
+from app.dashboard.stream import FrameBuffer
+
+
+def _frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+class TestFrameRing:
+    def test_empty_ring_returns_none(self):
+        ring = FrameRing(3, (4, 6, 3))
+        assert ring.acquire_latest() is None
+
+    def test_write_and_acquire_latest(self):
+        ring = FrameRing(3, (4, 6, 3))
+        seq = ring.write(_frame(7))
+        ref = ring.acquire_latest()
+        assert ref.seq == seq == 1
+        assert ref.frame[0, 0, 0] == 7
+        ref.release()
+
+    def test_view_is_read_only(self):
+        ring = FrameRing(3, (4, 6, 3))
+        ring.write(_frame(1))
+        with ring.acquire_latest() as ref:
+            with pytest.raises(ValueError):
+                ref.frame[0, 0, 0] = 5
+
+    def test_claim_writes_in_place_without_copy(self):
+        """claim() ile alinan slota yazilan dizi yayinlanan dizinin kendisi olmali"""
+        ring = FrameRing(3, (4, 6, 3))
+        index, slot = ring.claim()
+        slot[:] = 9
+        ring.publish(index, slot)
+        with ring.acquire_latest() as ref:
+            assert np.shares_memory(ref.frame, slot)
+
+    def test_referenced_slot_is_not_overwritten(self):
+        """Referansi tutulan kare yeni yazimlarla bozulmamali"""
+        ring = FrameRing(2, (4, 6, 3))
+        ring.write(_frame(1))
+        held = ring.acquire_latest()
+        # 2 slotlu halkada: biri tutuluyor, biri en guncel -> ucuncu yazim dusmeli
+        ring.write(_frame(2))
+        assert ring.write(_frame(3)) is None
+        assert ring.dropped == 1
+        assert held.frame[0, 0, 0] == 1
+        held.release()
+        assert ring.write(_frame(4)) is not None
+
+    def test_after_seq_skips_seen_frames(self):
+        ring = FrameRing(3, (4, 6, 3))
+        ring.write(_frame(1))
+        ref = ring.acquire_latest()
+        assert ring.acquire_latest(after_seq=ref.seq) is None
+        ref.release()
+        ring.write(_frame(2))
+        newer = ring.acquire_latest(after_seq=ref.seq)
+        assert newer is not None and newer.seq == 2
+        newer.release()
+
+    def test_retain_and_double_release(self):
+        ring = FrameRing(3, (4, 6, 3))
+        ring.write(_frame(1))
+        ref = ring.acquire_latest()
+        extra = ref.retain()
+        ref.release()
+        ref.release()  # ikinci release sayaci bozmamali
+        assert ring.stats()['in_use'] == 1
+        extra.release()
+        assert ring.stats()['in_use'] == 0
+
+    def test_shape_change_adopts_frame(self):
+        ring = FrameRing(3, (4, 6, 3))
+        ring.write(_frame(3, shape=(8, 8, 3)))
+        with ring.acquire_latest() as ref:
+            assert ref.frame.shape == (8, 8, 3)
+
+    def test_minimum_slots(self):
+        with pytest.raises(ValueError):
+            FrameRing(1, (4, 6, 3))
+
+
+class TestFrameBufferRefs:
+    def test_buffer_holds_and_releases_ring_reference(self):
+        ring = FrameRing(3, (4, 6, 3))
+        buf = FrameBuffer()
+        ring.write(_frame(1))
+        with ring.acquire_latest() as ref:
+            buf.update(raw=ref)
+        assert ring.stats()['in_use'] == 1  # buffer'in kendi referansi
+
+        ring.write(_frame(2))
+        with ring.acquire_latest() as ref:
+            buf.update(raw=ref)
+        # Eski kare serbest, yenisi buffer'da
+        assert ring.stats()['in_use'] == 1
+        assert buf.get('raw')[0, 0, 0] == 2
+
+    def test_buffer_does_not_copy_plain_arrays(self):
+        buf = FrameBuffer()
+        det = _frame(5)
+        buf.update(detection=det)
+        assert buf.get('detection') is det
+
+    def test_acquire_detached_stream(self):
+        buf = FrameBuffer()
+        assert buf.acquire('detection') is None
+        buf.update(detection=_frame(5))
+        ref = buf.acquire('detection')
+        assert isinstance(ref, FrameRef)
+        assert ref.frame[0, 0, 0] == 5
+        ref.release()
@@ -1,4 +1,6 @@
+import threading
 import time
+import numpy as np
 import pytest
 from app.core import config
 from app.core.gps import GPSState
@@ -43,3 +45,126 @@ def test_gps_staleness():
     lat, lon, ts, valid = state.get()
     assert lat == 36.5
     assert valid is False
+
+
+# -- Artimli NMEA parser + fix gecmisi --
+from app.core.gps import NMEAStream, FixRing, parse_sentence
+from scripts.gps_simulator import generate_gga_sentence
+
+RMC = b"$GPRMC,123519,A,3630.0000,N,03000.0000,E,5.0,84.4,230394,,*"
+
+
+def _with_checksum(body):
+    calc = 0
+    for byte in body[1:-1]:
+        calc ^= byte
+    return body + f"{calc:02X}\r\n".encode()
+
+
+def test_nmea_stream_handles_split_chunks():
+    data = generate_gga_sentence(36.5, -30.25, "123519.00").encode() + _with_checksum(RMC)
+    stream = NMEAStream()
+    fixes = []
+    for i in range(0, len(data), 7):  # Seri porttan parca parca gelir
+        fixes.extend(stream.feed(data[i:i + 7]))
+    assert len(fixes) == 2 and stream.errors == 0
+    gga, rmc = fixes
+    assert gga.latitude == pytest.approx(36.5) and gga.longitude == pytest.approx(-30.25)
+    assert gga.num_sats == 8 and gga.horizontal_dil == 0.9 and gga.altitude == 5.4
+    assert rmc.latitude == pytest.approx(36.5) and rmc.altitude is None
+
+
+def test_nmea_bad_checksum_and_no_fix_are_skipped():
+    good = generate_gga_sentence(36.5, 30.0, "123519.00").encode()
+    bad = good.replace(b"3630", b"3631")
+    no_fix = _with_checksum(b"$GPGGA,123520.00,,,,,0,00,,,M,,M,,*")
+    stream = NMEAStream()
+    assert stream.feed(bad + no_fix + b"garbage\r\n") == []
+    assert stream.errors == 1 and stream.sentences == 3
+    assert len(stream.feed(good)) == 1
+
+
+def test_rmc_keeps_gga_fields_and_is_not_duplicated():
+    state = GPSState()
+    now = time.time()
+    gga = parse_sentence(generate_gga_sentence(36.5, 30.0, "123519.00").encode())
+    rmc = parse_sentence(_with_checksum(RMC.replace(b"123519", b"123519.00")))
+    state.update(gga.latitude, gga.longitude, now, gga)
+    state.update(rmc.latitude, rmc.longitude, now + 0.05, rmc)
+    d = state.get_dict()
+    assert d['altitude'] == 5.4 and d['satellites'] == 8
+    assert d['history'] == 1  # Ayni UTC'li GGA + RMC tek fix
+
+
+def test_fix_ring_interpolates_and_wraps():
+    ring = FixRing(4)
+    for i in range(6):
+        ring.push(100.0 + i, 36.0 + i * 0.001, 30.0)
+    assert len(ring) == 4 and ring.window()[0, 0] == 102.0
+    lat, lon, fix_ts = ring.position_at(103.25, max_gap=3.0, max_extrapolate=1.0)
+    assert lat == pytest.approx(36.00325) and fix_ts == 103.25
+    assert not ring.push(101.0, 0.0, 0.0)  # Geri giden zaman reddedilir
+
+
+def test_fix_ring_extrapolation_and_gaps():
+    ring = FixRing(8)
+    ring.push(100.0, 36.0, 30.0)
+    ring.push(101.0, 36.001, 30.002)
+    lat, lon, fix_ts = ring.position_at(101.5, max_gap=3.0, max_extrapolate=1.0)
+    assert (lat, lon) == (pytest.approx(36.0015), pytest.approx(30.003)) and fix_ts == 101.5
+    # Ileri tahmin siniri asilinca son fix'te kalinir
+    assert ring.position_at(105.0, 3.0, 1.0) == (pytest.approx(36.001), pytest.approx(30.002), 101.0)
+    ring.push(120.0, 37.0, 31.0)
+    # Buyuk bosluk: ara deger yok, en yakin fix
+    assert ring.position_at(118.0, 3.0, 1.0)[2] == 120.0
+    assert FixRing(2).position_at(1.0, 3.0, 1.0) is None
+
+
+def test_position_at_frame_time_and_staleness():
+    state = GPSState()
+    now = time.time()
+    state.update(36.0, 30.0, now - 2.0)
+    state.update(36.002, 30.0, now)
+    lat, lon, fix_ts, valid = state.position_at(now - 1.0)
+    assert lat == pytest.approx(36.001) and valid is True
+    lat, lon, fix_ts, valid = state.position_at(now + 30.0)
+    assert fix_ts == now and valid is False
+    assert GPSState().position_at(now) == (None, None, None, False)
+
+
+# -- Kilitsiz snapshot --
+def test_snapshot_is_immutable_with_precomputed_deadline():
+    state = GPSState()
+    state.update(36.5, 30.0, 1000.0)
+    snap = state.snapshot
+    assert snap.valid_until == 1000.0 + config.GPS_STALE_TIMEOUT
+    with pytest.raises(AttributeError):
+        snap.latitude = 0.0
+    state.update(36.6, 30.1, 1001.0)
+    assert snap.latitude == 36.5 and state.snapshot.latitude == 36.6  # eski okuyucu etkilenmez
+    assert state.get(now=1005.0)[3] is True
+    assert state.get(now=1001.0 + config.GPS_STALE_TIMEOUT + 0.1)[3] is False
+    assert state.get_dict(now=1005.0)['is_valid'] is True
+
+
+def test_readers_never_see_torn_state():
+    state = GPSState(history=16)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            state.update(float(i), float(i), 1000.0 + i)  # lat == lon her zaman
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        for _ in range(20000):
+            lat, lon, ts, _ = state.get()
+            assert lat == lon and (ts is None or ts == 1000.0 + lat)
+            window = state.history.window()
+            assert (np.diff(window[:, 0]) > 0).all()
+    finally:
+        stop.set()
+        t.join()
@@ -78,3 +78,58 @@ def test_generate_gga_sentence_checksum():
     actual_checksum = int(sentence.split('*')[1][:2], 16)
 
     assert actual_checksum == expected_checksum
+
+
+# -- Rotalar, RMC, hata enjeksiyonu, yuksek hiz --
+from scripts.gps_simulator import (FaultInjector, TrackPlayer, generate_rmc_sentence, load_track,
+                                   run_simulation_loop)
+from app.core.gps import NMEAStream, parse_sentence
+
+
+def test_rmc_sentence_parses():
+    fix = parse_sentence(generate_rmc_sentence(-36.8848, 30.704, "123456.50", "010626", 4.2, 91.0).encode())
+    assert fix.latitude == pytest.approx(-36.8848) and fix.longitude == pytest.approx(30.704)
+    assert fix.utc == "123456.50"
+
+
+def test_load_track_csv_and_gpx(tmp_path):
+    csv_path = tmp_path / "rota.csv"
+    csv_path.write_text("Latitude,Longitude,Time\n36.0,30.0,2026-06-01T10:00:00Z\n36.01,30.0,2026-06-01T10:00:10Z\n")
+    assert load_track(str(csv_path)) == [(0.0, 36.0, 30.0), (10.0, 36.01, 30.0)]
+
+    gpx_path = tmp_path / "rota.gpx"
+    gpx_path.write_text('<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>'
+                        '<trkpt lat="36.0" lon="30.0"/><trkpt lat="36.0" lon="30.01"/></trkseg></trk></gpx>')
+    track = load_track(str(gpx_path))
+    assert track == [(0.0, 36.0, 30.0), (1.0, 36.0, 30.01)]  # zaman yoksa 1 sn aralik
+
+    lat, lon, knots, course = TrackPlayer(load_track(str(csv_path))).position(5.0)
+    assert lat == pytest.approx(36.005) and course == pytest.approx(0.0) and knots == pytest.approx(216.0)
+
+
+def test_fault_injection_is_seen_by_parser():
+    faults = FaultInjector(checksum_rate=0.2, seed=3)
+    stream = NMEAStream()
+    fixes = []
+    stats = run_simulation_loop(lambda data: fixes.extend(stream.feed(data.encode())), hz=20, duration=5,
+                                faults=faults, paced=False, quiet=True)
+    assert stats['epochs'] == 100 and stats['sentences'] == 200
+    assert faults.corrupted > 0 and stream.errors == faults.corrupted
+    assert len(fixes) == 200 - faults.corrupted
+
+
+def test_dropout_and_burst():
+    writes = []
+    faults = FaultInjector(dropout_rate=1.0, dropout_len=1.0, seed=0)
+    run_simulation_loop(writes.append, hz=10, duration=3, faults=faults, paced=False, quiet=True)
+    assert writes == [] and faults.dropped == 60
+
+    writes = []
+    faults = FaultInjector(burst_rate=1.0, burst_len=5, seed=0)
+    run_simulation_loop(writes.append, hz=10, duration=1, rmc=False, faults=faults, paced=False, quiet=True)
+    assert [w.count('\n') for w in writes] == [5, 5] and faults.bursts == 2
+
+
+def test_rate_is_capped():
+    stats = run_simulation_loop(lambda data: None, hz=100, duration=1, paced=False, quiet=True)
+    assert stats['target_hz'] == 20.0 and stats['epochs'] == 20
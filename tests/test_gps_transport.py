@@ -0,0 +1,144 @@
+"""
+GPS transport testleri — TCP NMEA, gpsd JSON, kayitli log tekrari (hiz / dongu) ve
+GPS_SOURCE ile acilan kaynaktan GPSState'e uctan uca akis.
+"""
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from app.core import config
+from app.core.gps import GPSState, gps_reader_thread
+from app.core.gps_transport import GpsdTransport, ReplayTransport, TCPTransport, open_transport
+from scripts.gps_simulator import generate_gga_sentence
+
+
+class FakeClock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _serve(payload):
+    """Tek istemciye `payload` gonderip kapatan yerel TCP sunucusu; (port, alinan) doner"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    received = []
+
+    def run():
+        conn, _ = server.accept()
+        conn.settimeout(1.0)
+        try:
+            received.append(conn.recv(1024))
+        except socket.timeout:
+            pass
+        for i in range(0, len(payload), 10):
+            conn.sendall(payload[i:i + 10])
+            time.sleep(0.001)
+        conn.close()
+        server.close()
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()[1], received
+
+
+def _drain(transport, timeout=2.0):
+    fixes = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            fixes.extend(transport.read())
+        except ConnectionError:
+            break
+        time.sleep(0.001)
+    return fixes
+
+
+def _log(tmp_path, n, start="120000"):
+    path = tmp_path / "track.nmea"
+    hh, mm, ss = int(start[:2]), int(start[2:4]), int(start[4:])
+    lines = []
+    for i in range(n):
+        t = hh * 3600 + mm * 60 + ss + i
+        utc = f"{t // 3600 % 24:02d}{t // 60 % 60:02d}{t % 60:02d}.00"
+        lines.append(generate_gga_sentence(36.88 + i * 0.001, 30.70, utc))
+        lines.append("$GPGSV,1,1,00*79\r\n")  # zamansiz cumle
+    path.write_text("".join(lines))
+    return str(path)
+
+
+class TestSockets:
+    def test_tcp_nmea(self):
+        payload = "".join(generate_gga_sentence(36.5 + i * 0.01, 30.0, f"1200{i:02d}.00") for i in range(3)).encode()
+        port, _ = _serve(payload)
+        transport = TCPTransport('127.0.0.1', port)
+        fixes = _drain(transport)
+        transport.close()
+        assert [round(f.latitude, 2) for _, f in fixes] == [36.5, 36.51, 36.52]
+
+    def test_gpsd_json(self):
+        msgs = [
+            {'class': 'VERSION', 'release': '3.25'},
+            {'class': 'SKY', 'hdop': 0.8, 'satellites': [{'used': True}, {'used': True}, {'used': False}]},
+            {'class': 'TPV', 'mode': 1},  # fix yok
+            {'class': 'TPV', 'mode': 3, 'lat': 36.5, 'lon': 30.25, 'altMSL': 4.0, 'time': '2026-06-01T12:00:00.000Z'},
+        ]
+        port, received = _serve(("\n".join(json.dumps(m) for m in msgs) + "\n").encode())
+        transport = GpsdTransport('127.0.0.1', port)
+        fixes = _drain(transport)
+        transport.close()
+        assert received and received[0].startswith(b'?WATCH=')
+        assert len(fixes) == 1
+        fix = fixes[0][1]
+        assert (fix.latitude, fix.longitude, fix.altitude) == (36.5, 30.25, 4.0)
+        assert fix.num_sats == 2 and fix.horizontal_dil == 0.8
+
+
+class TestReplay:
+    def test_paced_by_sentence_time(self, tmp_path):
+        clock = FakeClock(1000.0)
+        transport = ReplayTransport(_log(tmp_path, 5), speed=10.0, clock=clock)
+        assert len(transport.read()) == 1  # t0 hemen
+        assert transport.read() == []
+        clock.t += 0.25  # 10x: kayitta 2.5 sn
+        fixes = transport.read()
+        assert [ts for ts, _ in fixes] == [1000.1, 1000.2]
+        clock.t += 10
+        assert len(transport.read()) == 2
+        assert transport.read() is None and transport.replayed == 10
+
+    def test_unpaced_batches_and_loop(self, tmp_path):
+        transport = ReplayTransport(_log(tmp_path, 5), speed=0, loop=True, batch=4)
+        assert len(transport.read()) == 2  # 4 satir = 2 GGA + 2 GSV
+        reads = [len(transport.read()) for _ in range(10)]
+        assert max(reads) <= 2 and sum(reads) > 5  # dosya sonunda basa doner
+        assert transport.replayed > 10
+
+    def test_midnight_wrap(self, tmp_path):
+        clock = FakeClock(0.0)
+        transport = ReplayTransport(_log(tmp_path, 3, start="235959"), speed=1.0, clock=clock)
+        transport.read()
+        clock.t = 2.0
+        assert len(transport.read()) == 2
+
+
+class TestSource:
+    def test_open_transport_schemes(self, tmp_path):
+        path = _log(tmp_path, 1)
+        replay = open_transport(f"replay://{path}?speed=5&loop=1")
+        assert isinstance(replay, ReplayTransport) and replay.speed == 5.0 and replay.loop
+        replay.close()
+        with pytest.raises(ValueError):
+            open_transport("udp://127.0.0.1:1")
+
+    def test_reader_thread_replays_into_state(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, 'GPS_POLL_INTERVAL', 0.001)
+        state = GPSState()
+        gps_reader_thread(f"replay://{_log(tmp_path, 50)}?speed=0", state=state)
+        lat, lon, ts, valid = state.get()
+        assert lat == pytest.approx(36.88 + 49 * 0.001) and valid
+        assert len(state.history) == 50
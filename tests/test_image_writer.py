@@ -0,0 +1,136 @@
+"""
+Arka plan goruntu yazicisi testleri — kuyruk / atma politikasi, arka planda cizim + yazim,
+geri cagri ve artimli disk kotasi (RetentionManager).
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.image_writer import ImageWriter, RetentionManager
+
+
+def _img(value=0):
+    return np.full((32, 32, 3), value, dtype=np.uint8)
+
+
+def _touch(path, size, mtime):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (mtime, mtime))
+
+
+class TestRetentionManager:
+    def test_initial_scan_then_incremental(self, tmp_path):
+        for i in range(3):
+            _touch(str(tmp_path / f"old_{i}.jpg"), 10, 1000 + i)
+        _touch(str(tmp_path / "notes.txt"), 10, 900)
+        rm = RetentionManager(tmp_path, max_files=3)
+
+        new = str(tmp_path / "new.jpg")
+        _touch(new, 10, 2000)
+        assert rm.add(new) == 1
+        assert not os.path.exists(tmp_path / "old_0.jpg")  # en eski silinir
+        assert os.path.exists(tmp_path / "notes.txt")
+
+        with_scan = rm._scan
+        rm._scan = lambda: (_ for _ in ()).throw(AssertionError("tekrar taranmamali"))
+        newer = str(tmp_path / "newer.jpg")
+        _touch(newer, 10, 3000)
+        rm.add(newer)
+        rm._scan = with_scan
+        assert sorted(os.listdir(tmp_path)) == ["new.jpg", "newer.jpg", "notes.txt", "old_2.jpg"]
+        assert rm.stats() == {'files': 3, 'bytes': 30, 'removed': 2}
+
+    def test_byte_quota(self, tmp_path):
+        rm = RetentionManager(tmp_path, max_bytes=25)
+        for i in range(3):
+            p = str(tmp_path / f"f{i}.jpg")
+            _touch(p, 10, 1000 + i)
+            rm.add(p, 10)
+        assert sorted(os.listdir(tmp_path)) == ["f1.jpg", "f2.jpg"]
+
+    def test_missing_file_is_tolerated(self, tmp_path):
+        rm = RetentionManager(tmp_path, max_files=1)
+        a, b = str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")
+        _touch(a, 1, 1000)
+        rm.add(a)
+        os.remove(a)  # elle silindi
+        _touch(b, 1, 1001)
+        assert rm.add(b) == 0 and os.path.exists(b)
+
+    def test_overwritten_file_counted_once(self, tmp_path):
+        # Ertesi gun ayni saniyedeki snap_%H%M%S.jpg eskisinin ustune yazilir
+        rm = RetentionManager(tmp_path, max_files=2)
+        snap, other = str(tmp_path / "snap_101500.jpg"), str(tmp_path / "fish.jpg")
+        _touch(snap, 10, 1000)
+        rm.add(snap)
+        _touch(other, 10, 1001)
+        rm.add(other)
+        _touch(snap, 15, 2000)
+        assert rm.add(snap) == 0
+        assert rm.stats() == {'files': 2, 'bytes': 25, 'removed': 0}
+        newest = str(tmp_path / "new.jpg")
+        _touch(newest, 10, 3000)
+        assert rm.add(newest) == 1
+        assert sorted(os.listdir(tmp_path)) == ["new.jpg", "snap_101500.jpg"]  # yeniden yazilan kalir
+
+
+class TestImageWriter:
+    def test_writes_in_background_with_render(self, tmp_path):
+        writer = ImageWriter(maxsize=4)
+        done = []
+        path = str(tmp_path / "sub" / "a.jpg")
+        writer.submit(path, _img(), render=lambda im: cv2.rectangle(im.copy(), (0, 0), (31, 31), (255, 255, 255), -1),
+                      on_written=done.append)
+        assert not os.path.exists(path)  # worker baslamadan yazilmaz
+        writer.start(workers=2)
+        assert writer.stop(timeout=5.0)
+        assert done == [path]
+        img = cv2.imread(path)
+        assert img.shape == (32, 32, 3) and img.mean() > 200
+        assert writer.stats()['written'] == 1 and not os.path.exists(path + '.tmp')
+
+    def test_full_queue_drops_oldest(self, tmp_path):
+        writer = ImageWriter(maxsize=2)
+        for i in range(4):
+            writer.submit(str(tmp_path / f"{i}.jpg"), _img(i))
+        assert writer.dropped == 2
+        writer.start(workers=1)
+        assert writer.stop()
+        assert sorted(os.listdir(tmp_path)) == ["2.jpg", "3.jpg"]  # en yeniler kalir
+
+    def test_retention_applied_per_directory(self, tmp_path):
+        thumbs = tmp_path / "thumbs"
+        writer = ImageWriter(maxsize=8)
+        writer.retain(thumbs, max_files=2)
+        for i in range(4):
+            writer.submit(str(thumbs / f"t{i}.jpg"), _img(i))
+            writer.submit(str(tmp_path / f"s{i}.jpg"), _img(i))
+        writer.start(workers=1)
+        assert writer.stop()
+        assert len(os.listdir(thumbs)) == 2
+        assert len([f for f in os.listdir(tmp_path) if f.endswith('.jpg')]) == 4
+        assert writer.stats()['retention']['thumbs']['removed'] == 2
+
+    def test_failed_write_does_not_stop_worker(self, tmp_path):
+        writer = ImageWriter(maxsize=4)
+        called = []
+        writer.submit(str(tmp_path / "bad.jpg"), np.zeros((0, 0, 3), dtype=np.uint8), on_written=called.append)
+        writer.submit(str(tmp_path / "ok.jpg"), _img())
+        writer.start(workers=1)
+        assert writer.stop()
+        assert writer.failed == 1 and writer.written == 1 and called == []
+
+    def test_executor_is_used(self, tmp_path):
+        threads = []
+
+        def executor(fn, *args):
+            threads.append(threading.current_thread().name)
+            return fn(*args)
+        writer = ImageWriter(executor=executor)
+        writer.submit(str(tmp_path / "a.jpg"), _img())
+        writer.start(workers=1)
+        assert writer.stop()
+        assert threads == ["image-writer-0"]
@@ -0,0 +1,104 @@
+"""
+Ayri process inference worker testleri — shared memory aktarimi, hata ve cokme sonrasi yeniden baslatma.
+Gercek model yerine sahte bir tespit motoru worker process'te olusturulur.
+"""
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from app.core import InferenceWorker
+
+SHAPE = (48, 64, 3)
+
+
+class _FakeDetector:
+    """Frame'in ilk pikseline gore davranan sahte motor"""
+    def detect(self, frame, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        value = int(frame[0, 0, 0])
+        if value == 255:
+            os._exit(1)  # cokme
+        if value == 254:
+            raise RuntimeError("inference hatasi")
+        if value == 253:
+            time.sleep(30)  # asili kalma
+        return [(0, 0, value, int(frame[-1, -1, 2]))], [conf]
+
+    def detect_batch(self, frames, conf=0.6, use_clahe=True, clahe_clip=3.0):
+        return [self.detect(f, conf, use_clahe, clahe_clip) for f in frames]
+
+
+def _fake_factory(model_path):
+    return _FakeDetector()
+
+
+def _frame(value, last=0):
+    frame = np.full(SHAPE, value, dtype=np.uint8)
+    frame[-1, -1, 2] = last
+    return frame
+
+
+@pytest.fixture
+def worker():
+    w = InferenceWorker("fake.onnx", SHAPE, slots=3, factory=_fake_factory, timeout=1.0, start_timeout=60.0)
+    w.start()
+    yield w
+    w.stop()
+
+
+class TestInferenceWorker:
+    def test_detect_runs_in_separate_process(self, worker):
+        boxes, confs = worker.detect(_frame(7, last=9), conf=0.5)
+        assert boxes == [(0, 0, 7, 9)]
+        assert confs == [0.5]
+        assert worker.stats()['pid'] != os.getpid()
+
+    def test_batch_uses_shared_slots(self, worker):
+        results = worker.detect_batch([_frame(1), _frame(2), _frame(3)], conf=0.5)
+        assert [r[0][0][2] for r in results] == [1, 2, 3]
+
+    def test_detector_error_keeps_worker(self, worker):
+        worker.detect(_frame(1))
+        pid = worker.stats()['pid']
+        assert worker.detect(_frame(254)) == ([], [])
+        assert worker.alive and worker.stats()['pid'] == pid
+        assert worker.detect(_frame(5))[0] == [(0, 0, 5, 0)]
+
+    def test_crash_is_restarted(self, worker):
+        worker.detect(_frame(1))
+        assert worker.detect(_frame(255)) == ([], [])
+        assert worker.detect(_frame(6))[0] == [(0, 0, 6, 0)]
+        assert worker.restarts == 1
+
+    def test_hung_worker_times_out(self, worker):
+        worker.detect(_frame(1))
+        start = time.time()
+        assert worker.detect(_frame(253)) == ([], [])
+        assert time.time() - start < 5
+        assert not worker.alive
+
+    def test_waiting_yields_through_sleep(self):
+        calls = []
+        w = InferenceWorker("fake.onnx", SHAPE, factory=_fake_factory,
+                            sleep=lambda s: (calls.append(s), time.sleep(s)))
+        try:
+            w.start()
+            w.detect(_frame(1))
+            assert calls, "Beklerken sleep ile kontrol birakilmali"
+        finally:
+            w.stop()
+
+    def test_oversized_frame_rejected(self, worker):
+        with pytest.raises(ValueError):
+            worker.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+
+    def test_stop_releases_shared_memory_once(self):
+        w = InferenceWorker("fake.onnx", SHAPE, factory=_fake_factory, start_timeout=60.0).start()
+        name = w._shm.name
+        w.stop()
+        w.stop()  # atexit'ten ikinci cagri
+        assert not w.alive
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,81 @@
+"""
+Sahne degisimi kapisi testleri — statik sahnede inference atlama, degisim ve zaman asimi.
+"""
+import numpy as np
+
+from app.core import SceneChangeGate
+
+
+def _frame(value, shape=(480, 640, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+class TestSceneChangeGate:
+    def test_first_frame_always_inferred(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        assert gate.should_infer(_frame(100), now=0.0)
+
+    def test_static_scene_skipped(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        assert not gate.should_infer(_frame(101), now=0.1)
+        assert not gate.should_infer(_frame(100), now=0.2)
+        assert gate.skipped == 2
+
+    def test_scene_change_triggers_inference(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        frame = _frame(100)
+        frame[100:300, 200:400] = 255  # balik gibi buyuk bir nesne girdi
+        assert gate.should_infer(frame, now=0.1)
+
+    def test_reference_updated_after_inference(self):
+        """Inference edilen kare yeni referans olmali, ayni kare tekrar tetiklememeli"""
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(0), now=0.0)
+        assert gate.should_infer(_frame(200), now=0.1)
+        assert not gate.should_infer(_frame(200), now=0.2)
+
+    def test_slow_drift_does_not_accumulate_silently(self):
+        """Esik altindaki kuculk adimlar referansa gore birikip sonunda tetiklemeli"""
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        results = [gate.should_infer(_frame(100 + i), now=0.1 * i) for i in range(1, 6)]
+        assert results == [False, False, False, True, False]
+
+    def test_max_interval_forces_inference(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=2.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        assert not gate.should_infer(_frame(100), now=1.0)
+        assert gate.should_infer(_frame(100), now=2.5)
+
+    def test_force(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        assert gate.should_infer(_frame(100), now=0.1, force=True)
+
+    def test_min_frames_caps_rate_on_moving_scene(self):
+        # Su / isik degisimi: her kare esigi gecse de en fazla 5 karede bir inference
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True, min_frames=5)
+        results = [gate.should_infer(_frame(0 if i % 2 else 200), now=0.03 * i) for i in range(20)]
+        assert [i for i, r in enumerate(results) if r] == [0, 5, 10, 15]
+        assert gate.inferred == 4 and gate.skipped == 16
+
+    def test_min_frames_still_skips_static_scene(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True, min_frames=5)
+        assert sum(gate.should_infer(_frame(100), now=0.03 * i) for i in range(20)) == 1
+
+    def test_disabled_gate_always_infers(self):
+        gate = SceneChangeGate(enabled=False)
+        assert all(gate.should_infer(_frame(100)) for _ in range(3))
+        assert gate.skipped == 0
+
+    def test_stats(self):
+        gate = SceneChangeGate(threshold=4.0, max_interval=10.0, enabled=True)
+        gate.should_infer(_frame(100), now=0.0)
+        gate.should_infer(_frame(100), now=0.1)
+        stats = gate.stats()
+        assert stats['threshold'] == 4.0
+        assert stats['inferred'] == 1 and stats['skipped'] == 1
+        assert stats['skip_ratio'] == 0.5
+        assert stats['last_score'] == 0.0
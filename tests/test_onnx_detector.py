@@ -0,0 +1,253 @@
+"""
+Dogrudan ONNX Runtime backend testleri — NumPy decode, NMS ve on isleme.
+Gercek model gerektirmez; oturum sahte bir nesneyle degistirilir.
+"""
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core import config
+from app.core.onnx_detector import OnnxDetector, decode_predictions, nms
+from app.core.detector import create_detector
+from app.utils.image import Preprocessor, apply_clahe
+
+
+class _Input:
+    def __init__(self, dtype='tensor(float)', batch=1):
+        self.name = 'images'
+        self.type = dtype
+        self.shape = [batch, 3, config.DETECTOR_IMGSZ, config.DETECTOR_IMGSZ]
+
+
+class FakeSession:
+    """InferenceSession yerine gecen, sabit cikti donduren oturum"""
+    def __init__(self, output, dtype='tensor(float)', batch=1):
+        self.output = output
+        self.inputs = [_Input(dtype, batch)]
+        self.fed = []
+
+    def get_inputs(self):
+        return self.inputs
+
+    def run(self, names, feed):
+        tensor = feed['images']
+        self.fed.append(tensor)
+        return [np.repeat(self.output, tensor.shape[0], axis=0)]
+
+
+def _raw_pred(rows, n=32):
+    """(cx, cy, w, h, skor) satirlarindan (1, 5, N) YOLO ham cikti tensoru"""
+    pred = np.zeros((1, 5, n), dtype=np.float32)
+    for i, row in enumerate(rows):
+        pred[0, :, i] = row
+    return pred
+
+
+class TestNMS:
+    def test_overlapping_boxes_suppressed(self):
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+        scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+        keep = nms(boxes, scores, 0.5)
+        assert list(keep) == [0, 2]
+
+    def test_empty(self):
+        assert len(nms(np.empty((0, 4)), np.empty(0), 0.5)) == 0
+
+
+class TestDecode:
+    def test_confidence_filter_and_xyxy(self):
+        pred = _raw_pred([(100, 100, 20, 40, 0.9), (300, 300, 10, 10, 0.2)])[0]
+        boxes, scores = decode_predictions(pred, conf_thresh=0.5)
+        assert len(boxes) == 1
+        np.testing.assert_allclose(boxes[0], [90, 80, 110, 120])
+        assert scores[0] == pytest.approx(0.9)
+
+    def test_sorted_by_score(self):
+        pred = _raw_pred([(100, 100, 20, 20, 0.6), (400, 400, 20, 20, 0.95)])[0]
+        _, scores = decode_predictions(pred, conf_thresh=0.5)
+        assert list(scores) == sorted(scores, reverse=True)
+
+    def test_multiclass_uses_best_class(self):
+        pred = np.zeros((6, 8), dtype=np.float32)
+        pred[:, 0] = (100, 100, 20, 20, 0.1, 0.8)
+        boxes, scores = decode_predictions(pred, conf_thresh=0.5)
+        assert len(boxes) == 1
+        assert scores[0] == pytest.approx(0.8)
+
+    def test_end_to_end_output(self):
+        pred = np.zeros((300, 6), dtype=np.float32)
+        pred[0] = (10, 10, 50, 50, 0.9, 0)
+        pred[1] = (60, 60, 90, 90, 0.3, 0)
+        boxes, scores = decode_predictions(pred, conf_thresh=0.5, end2end=True)
+        assert len(boxes) == 1
+        np.testing.assert_allclose(boxes[0], [10, 10, 50, 50])
+
+    def test_small_end_to_end_output(self):
+        # Dinamik NMS ciktisi: az tespit -> (N <= 6, 6); ham anchor yoluna dusmemeli
+        pred = np.array([(10, 10, 50, 50, 0.9, 0), (60, 60, 90, 90, 0.8, 0)], dtype=np.float32)
+        boxes, scores = decode_predictions(pred, conf_thresh=0.5, end2end=True)
+        np.testing.assert_allclose(boxes, [[10, 10, 50, 50], [60, 60, 90, 90]])
+        assert list(scores) == pytest.approx([0.9, 0.8])
+
+
+class _Meta:
+    def __init__(self, **props):
+        self.custom_metadata_map = props
+
+
+class _Output:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+class TestEnd2EndDetection:
+    def _session(self, output, meta=None, out_shape=None):
+        session = FakeSession(output)
+        session.get_modelmeta = lambda: _Meta(**(meta or {}))
+        session.get_outputs = lambda: [_Output(out_shape or list(output.shape))]
+        return session
+
+    def test_layout_from_metadata_or_static_shape(self):
+        from app.core.onnx_detector import is_end2end
+        out = np.zeros((1, 3, 6), dtype=np.float32)
+        assert is_end2end(self._session(out, {'end2end': 'True'}))
+        assert is_end2end(self._session(out, {'args': "{'batch': 1, 'nms': True}"}))
+        assert is_end2end(self._session(out, out_shape=[1, 300, 6]))
+        assert is_end2end(self._session(out, out_shape=[1, 'num_dets', 6]))
+        assert not is_end2end(self._session(out, {'end2end': 'False'}, out_shape=[1, 300, 6]))
+        assert not is_end2end(self._session(out, out_shape=[1, 6, 8400]))  # ham, 2 sinif
+        assert not is_end2end(FakeSession(out))
+
+    def test_detector_decodes_few_end_to_end_rows(self):
+        size = config.DETECTOR_IMGSZ
+        out = np.array([[(size / 4, size / 4, size / 2, size / 2, 0.9, 0)]], dtype=np.float32)
+        det = OnnxDetector("fake.onnx", session=self._session(out, {'end2end': 'True'}))
+        boxes, confs = det.detect(np.zeros((size, size, 3), dtype=np.uint8), conf=0.5)
+        assert boxes == [(size // 4, size // 4, size // 2, size // 2)]
+        assert confs == [pytest.approx(0.9)]
+
+
+class TestOnnxDetector:
+    def test_detect_scales_to_original_resolution(self):
+        size = config.DETECTOR_IMGSZ
+        session = FakeSession(_raw_pred([(size / 2, size / 2, size / 4, size / 4, 0.9)]))
+        det = OnnxDetector("fake.onnx", session=session)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        boxes, confs = det.detect(frame, conf=0.5, use_clahe=False)
+        assert isinstance(boxes, list) and isinstance(confs, list)
+        assert boxes == [(240, 180, 400, 300)]
+        assert confs[0] == pytest.approx(0.9)
+
+    def test_input_buffer_reused_and_normalized(self):
+        session = FakeSession(_raw_pred([]))
+        det = OnnxDetector("fake.onnx", session=session)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[:, :, 2] = 255  # BGR kirmizi -> RGB kanal 0
+
+        det.detect(frame, conf=0.5, use_clahe=False)
+        det.detect(frame, conf=0.5, use_clahe=False)
+        assert np.shares_memory(session.fed[0], session.fed[1])
+        tensor = session.fed[0]
+        assert tensor.shape == (1, 3, config.DETECTOR_IMGSZ, config.DETECTOR_IMGSZ)
+        assert tensor.dtype == np.float32
+        assert tensor[0, 0].max() == pytest.approx(1.0)
+        assert tensor[0, 2].max() == 0.0
+
+    def test_uint8_input_model(self):
+        session = FakeSession(_raw_pred([]), dtype='tensor(uint8)')
+        det = OnnxDetector("fake.onnx", session=session)
+        det.detect(np.full((480, 640, 3), 200, dtype=np.uint8), conf=0.5, use_clahe=True)
+        assert session.fed[0].dtype == np.uint8
+
+    def test_no_detections(self):
+        det = OnnxDetector("fake.onnx", session=FakeSession(_raw_pred([])))
+        boxes, confs = det.detect(np.zeros((480, 640, 3), dtype=np.uint8), conf=0.5)
+        assert boxes == [] and confs == []
+
+
+class TestBatchInference:
+    def test_dynamic_batch_single_run(self):
+        """Dinamik batch modelde N frame tek run() cagrisinda islenmeli"""
+        size = config.DETECTOR_IMGSZ
+        session = FakeSession(_raw_pred([(size / 2, size / 2, size / 4, size / 4, 0.9)]), batch='batch')
+        det = OnnxDetector("fake.onnx", session=session)
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(3)]
+
+        results = det.detect_batch(frames, conf=0.5, use_clahe=False)
+        assert len(session.fed) == 1
+        assert session.fed[0].shape[0] == 3
+        assert len(results) == 3
+        for boxes, confs in results:
+            assert boxes == [(240, 180, 400, 300)]
+
+    def test_fixed_batch_falls_back_to_single(self):
+        session = FakeSession(_raw_pred([]), batch=1)
+        det = OnnxDetector("fake.onnx", session=session)
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(2)]
+
+        results = det.detect_batch(frames, conf=0.5, use_clahe=False)
+        assert len(session.fed) == 2
+        assert all(t.shape[0] == 1 for t in session.fed)
+        assert results == [([], []), ([], [])]
+
+
+def _textured_frame():
+    rng = np.random.default_rng(0)
+    return cv2.GaussianBlur(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8), (7, 7), 0)
+
+
+class TestPreprocessor:
+    def test_lab_path_matches_apply_clahe(self):
+        """LAB yolu eski resize + apply_clahe zinciriyle ayni sonucu vermeli"""
+        frame = _textured_frame()
+        out = np.zeros((3, 64, 64), dtype=np.float32)
+        Preprocessor(64, space='lab')(frame, out, use_clahe=True, clip=3.0)
+        expected = apply_clahe(cv2.resize(frame, (64, 64)), clip=3.0)[:, :, ::-1].transpose(2, 0, 1) / 255.0
+        np.testing.assert_allclose(out, expected, atol=1e-6)
+
+    def test_ycrcb_path_close_to_reference(self):
+        frame = _textured_frame()
+        out = np.zeros((3, 64, 64), dtype=np.float32)
+        Preprocessor(64, space='ycrcb')(frame, out, use_clahe=True, clip=3.0)
+        expected = apply_clahe(cv2.resize(frame, (64, 64)), clip=3.0)[:, :, ::-1].transpose(2, 0, 1) / 255.0
+        assert np.abs(out - expected).mean() < 0.05
+
+    def test_writes_uint8_tensor_without_clahe(self):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[:, :, 0] = 200  # BGR mavi -> RGB kanal 2
+        out = np.zeros((3, 32, 32), dtype=np.uint8)
+        Preprocessor(32)(frame, out, use_clahe=False)
+        assert out[2].min() == 200 and out[0].max() == 0
+
+    def test_buffers_reused(self):
+        pre = Preprocessor(32)
+        buf = pre._rgb
+        out = np.zeros((3, 32, 32), dtype=np.float32)
+        pre(_textured_frame(), out, clip=2.0)
+        pre(_textured_frame(), out, clip=2.0)
+        assert pre._rgb is buf
+
+    def test_unknown_space(self):
+        with pytest.raises(ValueError):
+            Preprocessor(32, space='hsv')
+
+
+class TestBackendSelection:
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_detector("fake.onnx", backend="tensorrt")
+
+    def test_startup_does_not_import_torch_or_ultralytics(self):
+        """app.core importu ultralytics / torch yuklememeli"""
+        import os
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = ("import sys, app.core; "
+                "print('ultralytics' in sys.modules, 'torch' in sys.modules)")
+        out = subprocess.run([sys.executable, "-c", code], cwd=root,
+                             capture_output=True, text=True, timeout=120)
+        assert out.returncode == 0, out.stderr
+        assert out.stdout.split() == ['False', 'False']
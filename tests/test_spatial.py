@@ -10,8 +10,18 @@ import tempfile
 from unittest.mock import patch, MagicMock
 import pytest
 
+from app.db import pool
 from app.db.spatial import get_db_connection
 
+
+@pytest.fixture
+def fresh_probe():
+    """SpatiaLite extension onbellegini test basinda ve sonunda sifirla"""
+    pool.reset_extension_cache()
+    yield
+    pool.reset_extension_cache()
+
+
 class TestSpatialFallback:
     """SpatiaLite olmayan ortamda (Windows/CI) düz SQLite ile test"""
 
@@ -107,7 +117,7 @@ class TestSpatialFallback:
         assert rows[0] == 0
 
     @patch('app.db.spatial.sqlite3.connect')
-    def test_get_db_connection_fallback_warning(self, mock_connect, capsys):
+    def test_get_db_connection_fallback_warning(self, mock_connect, capsys, fresh_probe):
         """Test the untested error path in get_db_connection"""
         # Create a mock connection
         mock_conn = MagicMock()
@@ -133,3 +143,132 @@ class TestSpatialFallback:
         assert calls[1][0][0] == "SELECT load_extension('libspatialite.so')"
         assert calls[2][0][0] == "SELECT load_extension('mod_spatialite.dylib')"
         assert calls[3][0][0] == "SELECT load_extension('mod_spatialite.dll')"
+
+    @patch('app.db.spatial.sqlite3.connect')
+    def test_get_db_connection_probes_once(self, mock_connect, capsys, fresh_probe):
+        """Extension adi ilk baglantida bulunur, sonraki baglantilar tekrar aramaz"""
+        def execute(sql):
+            if "'libspatialite.so'" not in sql:
+                raise sqlite3.OperationalError("not found")
+        first, second = MagicMock(), MagicMock()
+        first.execute.side_effect = second.execute.side_effect = execute
+        mock_connect.side_effect = [first, second]
+
+        get_db_connection()
+        get_db_connection()
+
+        assert first.execute.call_count == 2
+        second.execute.assert_called_once_with("SELECT load_extension('libspatialite.so')")
+        assert "WARNING" not in capsys.readouterr().out
+
+
+class TestBboxQuery:
+    """query_detections_bbox — R*Tree adaylari, kesin sinir ve keyset sayfalama (taklit SpatiaLite)"""
+
+    @pytest.fixture
+    def pool(self, tmp_path):
+        from app.db.pool import ReadPool
+        path = str(tmp_path / "bbox.sqlite")
+        conn = sqlite3.connect(path)
+        conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+        conn.execute("CREATE VIRTUAL TABLE idx_spatial_log_geom USING rtree(pkid, xmin, xmax, ymin, ymax)")
+        points = [(36.88, 30.70, 100.0), (36.89, 30.71, 101.0), (36.87, 30.69, 101.0),
+                  (34.05, 32.45, 102.0), (36.90, 30.72, 103.0)]
+        for i, (lat, lon, ts) in enumerate(points, start=1):
+            conn.execute("INSERT INTO spatial_log VALUES (?, 'Pufferfish', 0.9, ?, ?)", (i, ts, f"{lon} {lat}"))
+            conn.execute("INSERT INTO idx_spatial_log_geom VALUES (?, ?, ?, ?, ?)", (i, lon, lon, lat, lat))
+        conn.commit()
+        conn.close()
+
+        def connect():
+            c = sqlite3.connect(path, check_same_thread=False)
+            c.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+            c.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+            c.row_factory = sqlite3.Row
+            return c
+        return ReadPool(path, connect=connect)
+
+    def test_bbox_filters_and_orders(self, pool):
+        from app.db.spatial import query_detections_bbox
+        rows = query_detections_bbox(36.8, 30.6, 37.0, 30.8, pool=pool)
+        assert [r['id'] for r in rows] == [5, 3, 2, 1]  # yeniden eskiye, ayni ts'de id azalan
+        assert abs(rows[0]['latitude'] - 36.90) < 1e-9
+
+    def test_keyset_pagination(self, pool):
+        from app.db.spatial import query_detections_bbox
+        seen, cursor = [], {}
+        while True:
+            page = query_detections_bbox(36.8, 30.6, 37.0, 30.8, limit=2, pool=pool, **cursor)
+            seen += [r['id'] for r in page]
+            if len(page) < 2:
+                break
+            cursor = {'after_timestamp': page[-1]['timestamp'], 'after_id': page[-1]['id']}
+        assert seen == [5, 3, 2, 1]
+
+    def test_exact_bounds_after_index(self, pool):
+        from app.db.spatial import query_detections_bbox
+        rows = query_detections_bbox(36.875, 30.695, 36.885, 30.705, pool=pool)
+        assert [r['id'] for r in rows] == [1]
+
+
+class TestHistoryQuery:
+    """Sema gocleri (user_version) ve query_detections keyset sayfalama"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        path = str(tmp_path / "history.sqlite")
+        conn = sqlite3.connect(path)
+        conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+        rows = [("Pufferfish", 100.0), ("Lionfish", 101.0), ("Pufferfish", 101.0), ("Pufferfish", 102.0)]
+        conn.executemany("INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES (?, 0.9, ?, '30.7 36.9')",
+                         rows)
+        conn.commit()
+        conn.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+        conn.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+        yield path, conn
+        conn.close()
+
+    def _pool(self, path):
+        from app.db.pool import ReadPool
+
+        def connect():
+            c = sqlite3.connect(path, check_same_thread=False)
+            c.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+            c.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+            c.row_factory = sqlite3.Row
+            return c
+        return ReadPool(path, connect=connect)
+
+    def test_migration_adds_indexes_once(self, db):
+        from app.db.spatial import migrate, SCHEMA_VERSION
+        _, conn = db
+        assert migrate(conn) == SCHEMA_VERSION
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert {'idx_spatial_log_timestamp', 'idx_spatial_log_species_ts'} <= names
+        assert migrate(conn) == 0
+
+    def test_history_uses_index(self, db):
+        from app.db.spatial import migrate
+        _, conn = db
+        migrate(conn)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM spatial_log WHERE species = ? "
+                            "ORDER BY timestamp DESC, id DESC LIMIT 5", ("Pufferfish",)).fetchall()
+        assert 'idx_spatial_log_species_ts' in str(plan)
+        assert 'TEMP B-TREE' not in str(plan)
+
+    def test_keyset_pages(self, db):
+        from app.db.spatial import query_detections
+        pool = self._pool(db[0])
+        first = query_detections(2, pool=pool)
+        assert [r['id'] for r in first] == [4, 3]
+        rest = query_detections(2, after_timestamp=first[-1]['timestamp'], after_id=first[-1]['id'], pool=pool)
+        assert [r['id'] for r in rest] == [2, 1]
+        assert abs(rest[0]['latitude'] - 36.9) < 1e-9
+
+    def test_species_filter(self, db):
+        from app.db.spatial import query_detections
+        rows = query_detections(10, species="Lionfish", pool=self._pool(db[0]))
+        assert [r['id'] for r in rows] == [2]
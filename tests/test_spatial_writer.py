@@ -0,0 +1,100 @@
+"""
+SpatialWriter testleri — toplu commit, WAL baglantisi, dolu kuyruk ve hata sonrasi yeniden baglanma.
+SpatiaLite olmayan ortamda MakePoint, duz SQLite'a Python fonksiyonu olarak eklenir.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from app.db.writer import SpatialWriter
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "writer.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE spatial_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        species TEXT NOT NULL, confidence REAL NOT NULL, timestamp REAL NOT NULL, geom TEXT)''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _connector(path, opened):
+    def connect():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.create_function("MakePoint", 3, lambda x, y, srid: f"POINT({x} {y})")
+        opened.append(conn)
+        return conn
+    return connect
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT species, confidence, timestamp, geom FROM spatial_log ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+class TestSpatialWriter:
+    def test_group_commit_on_one_connection(self, db_path):
+        opened = []
+        writer = SpatialWriter(connect=_connector(db_path, opened), batch_size=10, flush_interval=0.05)
+        for i in range(25):
+            assert writer.submit("Pufferfish", 0.9, 36.0 + i, 30.0, 1000.0 + i)
+
+        thread = threading.Thread(target=writer.run, daemon=True)
+        thread.start()
+        assert writer.stop(timeout=5.0)
+        thread.join(timeout=2.0)
+
+        rows = _rows(db_path)
+        assert len(rows) == 25
+        assert rows[0][3] == "POINT(30.0 36.0)"  # MakePoint(lon, lat)
+        assert len(opened) == 1
+        assert writer.stats()['batches'] == 3
+
+    def test_wal_mode(self, db_path):
+        writer = SpatialWriter(connect=_connector(db_path, []), flush_interval=0.05)
+        writer.submit("Pufferfish", 0.9, 36.0, 30.0, 1.0)
+        thread = threading.Thread(target=writer.run, daemon=True)
+        thread.start()
+        writer.stop()
+        thread.join(timeout=2.0)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        conn.close()
+
+    def test_full_queue_drops_without_blocking(self, db_path):
+        writer = SpatialWriter(connect=_connector(db_path, []), maxsize=2)
+        assert writer.submit("Pufferfish", 0.9, 36.0, 30.0, 1.0)
+        assert writer.submit("Pufferfish", 0.9, 36.0, 30.0, 2.0)
+        assert not writer.submit("Pufferfish", 0.9, 36.0, 30.0, 3.0)
+        assert writer.stats()['dropped'] == 1
+
+    def test_failed_batch_reconnects(self, db_path):
+        """Yazim hatasinda batch atlanir ve sonraki batch icin yeni baglanti acilir"""
+        opened = []
+        writer = SpatialWriter(connect=_connector(db_path, opened), batch_size=1, flush_interval=0.05)
+        writer._write([("Pufferfish", 0.9, 1.0, 30.0, 36.0)])
+        opened[0].execute("DROP TABLE spatial_log")
+        writer._write([("Pufferfish", 0.9, 2.0, 30.0, 36.0)])
+        assert writer.failed == 1 and writer._conn is None
+
+    def test_executor_hook_used(self, db_path):
+        calls = []
+
+        def executor(fn, *args):
+            calls.append(fn.__name__)
+            return fn(*args)
+
+        writer = SpatialWriter(connect=_connector(db_path, []), flush_interval=0.05, executor=executor)
+        writer.submit("Pufferfish", 0.9, 36.0, 30.0, 1.0)
+        thread = threading.Thread(target=writer.run, daemon=True)
+        thread.start()
+        writer.stop()
+        thread.join(timeout=2.0)
+        assert '_write' in calls
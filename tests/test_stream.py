@@ -0,0 +1,160 @@
+"""
+Stream testleri — akis bazli sira numaralari, Condition ile bekleme ve tek kodlamali JpegHub.
+"""
+import base64
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.dashboard.stream import (FrameBuffer, JpegHub, generate_mjpeg, get_base64_frame, get_hub,
+                                  pack_ws_frame, unpack_ws_frame)
+
+
+def _frame(value=128, shape=(240, 320, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+class TestStreamSequences:
+    def test_sequences_are_per_stream(self):
+        buf = FrameBuffer()
+        buf.update(raw=_frame())
+        buf.update(detection=_frame())
+        buf.update(raw=_frame())
+        assert buf.sequences == {'raw': 2, 'clahe': 0, 'detection': 1}
+
+    def test_wait_for_timeout(self):
+        buf = FrameBuffer()
+        assert buf.wait_for('detection', 0, timeout=0.01) is None
+
+    def test_wait_for_wakes_on_update(self):
+        buf = FrameBuffer()
+        threading.Timer(0.05, lambda: buf.update(detection=_frame())).start()
+        start = time.time()
+        assert buf.wait_for('detection', 0, timeout=2.0) == 1
+        assert time.time() - start < 1.0
+
+    def test_other_stream_does_not_satisfy_wait(self):
+        buf = FrameBuffer()
+        buf.update(raw=_frame())
+        assert buf.wait_for('detection', 0, timeout=0.01) is None
+
+
+class TestJpegHub:
+    def test_encodes_each_sequence_once(self):
+        buf = FrameBuffer()
+        hub = JpegHub(buf)
+        buf.update(detection=_frame())
+        first = hub.get('detection', 70)
+        second = hub.get('detection', 70)
+        assert first is second
+        assert hub.encodes == 1 and hub.hits == 1
+        assert first.jpeg[:2] == b'\xff\xd8'
+
+    def test_new_frame_is_reencoded(self):
+        buf = FrameBuffer()
+        hub = JpegHub(buf)
+        buf.update(detection=_frame(10))
+        first = hub.get('detection', 70)
+        buf.update(detection=_frame(200))
+        second = hub.get('detection', 70, after_seq=first.seq, timeout=0)
+        assert second.seq == first.seq + 1
+        assert hub.encodes == 2
+
+    def test_separate_encoder_per_quality_and_size(self):
+        buf = FrameBuffer()
+        hub = JpegHub(buf)
+        buf.update(raw=_frame(shape=(480, 640, 3)))
+        hub.get('raw', 60, (320, 240))
+        hub.get('raw', 40, (320, 240))
+        hub.get('raw', 60, None)
+        assert hub.stats()['encoders'] == 3
+
+    def test_no_frame_returns_none(self):
+        hub = JpegHub(FrameBuffer())
+        assert hub.get('detection', 70, timeout=0) is None
+
+    def test_concurrent_viewers_share_one_encode(self):
+        buf = FrameBuffer()
+        hub = JpegHub(buf)
+        results = []
+        viewers = [threading.Thread(target=lambda: results.append(hub.get('detection', 70, timeout=2.0)))
+                   for _ in range(5)]
+        for t in viewers:
+            t.start()
+        time.sleep(0.05)
+        buf.update(detection=_frame())
+        for t in viewers:
+            t.join()
+        assert len({id(r) for r in results}) == 1
+        assert hub.encodes == 1
+
+
+class TestStreamConsumers:
+    def test_mjpeg_generators_share_encoding(self):
+        buf = FrameBuffer()
+        buf.update(detection=_frame())
+        gens = [generate_mjpeg(buf, 'detection', target_fps=1000) for _ in range(3)]
+        parts = [next(g) for g in gens]
+        assert all(p.startswith(b'--frame\r\nContent-Type: image/jpeg') for p in parts)
+        assert parts[0] is parts[1] is parts[2]
+        assert get_hub(buf).encodes == 1
+
+    def test_base64_frame(self):
+        buf = FrameBuffer()
+        assert get_base64_frame(buf) is None
+        buf.update(detection=_frame())
+        b64 = get_base64_frame(buf, quality=50)
+        assert base64.b64decode(b64)[:2] == b'\xff\xd8'
+        assert get_base64_frame(buf, quality=50) is b64
+
+
+class TestBinaryWsFrames:
+    def test_pack_unpack_roundtrip(self):
+        buf = FrameBuffer()
+        buf.update(detection=_frame())
+        entry = get_hub(buf).get('detection', 50)
+        packet = pack_ws_frame('detection', entry)
+        assert len(packet) == len(entry.jpeg) + 6  # base64 yok, sadece 6 byte baslik
+        version, stream_type, seq, jpeg = unpack_ws_frame(packet)
+        assert (version, stream_type, seq) == (1, 'detection', entry.seq)
+        assert jpeg == entry.jpeg
+
+    def test_unknown_version_rejected(self):
+        with pytest.raises(ValueError):
+            unpack_ws_frame(b'\x09\x02\x00\x00\x00\x01jpeg')
+
+    def test_binary_frames_only_reach_subscribed_clients(self):
+        from app.dashboard import server as srv
+        viewer = srv.socketio.test_client(srv.app)
+        idle = srv.socketio.test_client(srv.app)
+        buf = FrameBuffer()
+        buf.update(detection=_frame())
+        try:
+            viewer.emit('ws_stream', {'enabled': True})
+            srv._send_ws_frames(get_hub(buf))
+
+            received = [m for m in viewer.get_received() if m['name'] == 'ws_frame_bin']
+            assert len(received) == 1
+            _, stream_type, seq, jpeg = unpack_ws_frame(received[0]['args'][0])
+            assert stream_type == 'detection' and jpeg[:2] == b'\xff\xd8'
+            assert not [m for m in idle.get_received() if m['name'] == 'ws_frame_bin']
+
+            # Ack gelmeden ayni kare tekrar gonderilmez; ack RTT olarak kaydedilir
+            srv._send_ws_frames(get_hub(buf))
+            assert not [m for m in viewer.get_received() if m['name'] == 'ws_frame_bin']
+            viewer.emit('ws_ack', {'seq': seq})
+            stats = [c for c in srv.stream_clients.stats() if c['kind'] == 'ws']
+            assert stats[0]['latency_ms'] is not None and stats[0]['backlog'] == 0
+        finally:
+            viewer.disconnect()
+            idle.disconnect()
+        assert srv.stream_clients.clients('ws') == []
+
+    def test_unknown_video_stream_is_404(self):
+        from app.dashboard import server as srv
+        client = srv.app.test_client()
+        resp = client.get('/video/thermal')
+        assert resp.status_code == 404 and resp.get_json()['status'] == 'error'
+        assert srv.stream_clients.clients('mjpeg') == []
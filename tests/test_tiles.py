@@ -0,0 +1,98 @@
+"""
+Harita karo toplamlari testleri — karo hesabi, artimli guncelleme (writer / goc) ve karo sorgusu.
+SpatiaLite yerine ST_X/ST_Y/MakePoint duz SQLite'a Python fonksiyonu olarak eklenir.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from app.db import tiles
+from app.db.pool import ReadPool
+from app.db.spatial import migrate
+from app.db.writer import SpatialWriter
+
+
+def _functions(conn):
+    conn.create_function("ST_X", 1, lambda g: float(g.split()[0]))
+    conn.create_function("ST_Y", 1, lambda g: float(g.split()[1]))
+    conn.create_function("MakePoint", 3, lambda x, y, srid: f"{x} {y}")
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "tiles.sqlite")
+    conn = _functions(sqlite3.connect(path))
+    conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        species TEXT NOT NULL, confidence REAL NOT NULL, timestamp REAL NOT NULL, geom TEXT)''')
+    conn.execute("INSERT INTO spatial_log (species, confidence, timestamp, geom) VALUES ('Pufferfish', 0.8, 1.0, '30.70 36.88')")
+    conn.commit()
+    migrate(conn)
+    conn.close()
+    return path
+
+
+def _pool(path):
+    def connect():
+        conn = _functions(sqlite3.connect(path, check_same_thread=False))
+        conn.row_factory = sqlite3.Row
+        return conn
+    return ReadPool(path, connect=connect)
+
+
+class TestTileMath:
+    def test_tile_xy(self):
+        assert tiles.tile_xy(0.0, 0.0, 0) == (0, 0)
+        assert tiles.tile_xy(10.0, 10.0, 1) == (1, 0)
+        assert tiles.tile_xy(-10.0, -10.0, 1) == (0, 1)
+        assert tiles.tile_xy(90.0, 180.0, 3) == (7, 0)  # kenarlar kirpilir
+
+    def test_center_is_inside_tile(self):
+        x, y = tiles.tile_xy(36.88, 30.70, 12)
+        lat, lon = tiles.tile_center(x, y, 12)
+        assert tiles.tile_xy(lat, lon, 12) == (x, y)
+
+    def test_rows_aggregate_per_zoom(self):
+        rows = tiles.tile_rows([(0.8, 1.0, 30.70, 36.88), (0.6, 2.0, 30.70001, 36.88001), (0.9, 3.0, None, None)],
+                               max_zoom=2)
+        assert len(rows) == 3  # her zoom icin tek karo
+        assert all(r[3] == 2 and abs(r[4] - 1.4) < 1e-9 and r[5] == 2.0 for r in rows)
+
+
+class TestTileAggregates:
+    def test_migration_backfills_existing_rows(self, db_path):
+        zoom, found = tiles.query_tiles(10, 36.0, 30.0, 37.0, 31.0, pool=_pool(db_path))
+        assert zoom == 10
+        assert len(found) == 1 and found[0]['count'] == 1 and found[0]['avg_conf'] == 0.8
+
+    def test_writer_updates_tiles_incrementally(self, db_path):
+        writer = SpatialWriter(connect=lambda: _functions(sqlite3.connect(db_path, check_same_thread=False)),
+                               flush_interval=0.05)
+        writer.submit("Pufferfish", 0.6, 36.88, 30.70, 5.0)
+        writer.submit("Pufferfish", 0.9, 41.01, 29.00, 6.0)
+        thread = threading.Thread(target=writer.run, daemon=True)
+        thread.start()
+        writer.stop()
+        thread.join(timeout=2.0)
+
+        pool = _pool(db_path)
+        _, antalya = tiles.query_tiles(10, 36.0, 30.0, 37.0, 31.0, pool=pool)
+        assert antalya[0]['count'] == 2 and antalya[0]['last_ts'] == 5.0
+        _, world = tiles.query_tiles(0, -80.0, -170.0, 80.0, 170.0, pool=pool)
+        assert len(world) == 1 and world[0]['count'] == 3
+
+    def test_zoom_is_clamped(self, db_path):
+        zoom, found = tiles.query_tiles(25, 36.0, 30.0, 37.0, 31.0, pool=_pool(db_path))
+        assert zoom == tiles.config.MAP_TILE_MAX_ZOOM and len(found) == 1
+
+    def test_writer_without_tile_table(self, tmp_path):
+        """Goc uygulanmamis DB'de writer sadece spatial_log'a yazar"""
+        path = str(tmp_path / "old.sqlite")
+        conn = sqlite3.connect(path)
+        conn.execute('''CREATE TABLE spatial_log (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            species TEXT, confidence REAL, timestamp REAL, geom TEXT)''')
+        conn.close()
+        writer = SpatialWriter(connect=lambda: _functions(sqlite3.connect(path, check_same_thread=False)))
+        writer._write([("Pufferfish", 0.9, 1.0, 30.0, 36.0)])
+        assert writer.written == 1 and writer.failed == 0
@@ -0,0 +1,103 @@
+"""
+Takipci testleri — IoU eslestirme, kalici ID, Kalman ilerletme ve inference zorlama.
+"""
+import numpy as np
+import pytest
+
+from app.core import Tracker
+from app.core.tracker import iou_matrix
+from app.utils.image import draw_boxes
+
+
+def _tracker(**kwargs):
+    params = dict(iou_thresh=0.3, max_age=1.0, min_hits=2, conf_decay=0.5,
+                  min_conf=0.4, reinfer_interval=0.5)
+    params.update(kwargs)
+    return Tracker(**params)
+
+
+class TestIoU:
+    def test_identical_and_disjoint(self):
+        m = iou_matrix([(0, 0, 10, 10)], [(0, 0, 10, 10), (20, 20, 30, 30)])
+        assert m.shape == (1, 2)
+        assert m[0, 0] == pytest.approx(1.0)
+        assert m[0, 1] == 0.0
+
+    def test_empty(self):
+        assert iou_matrix([], [(0, 0, 1, 1)]).shape == (0, 1)
+
+
+class TestTracker:
+    def test_track_confirmed_after_min_hits(self):
+        tracker = _tracker()
+        assert tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.0) == []
+        tracks = tracker.update([(102, 100, 152, 150)], [0.9], timestamp=0.1)
+        assert len(tracks) == 1
+
+    def test_stable_id_across_updates(self):
+        tracker = _tracker()
+        ids = []
+        for i in range(5):
+            x = 100 + 5 * i
+            tracks = tracker.update([(x, 100, x + 50, 150)], [0.9], timestamp=0.1 * i)
+            ids.extend(t.id for t in tracks)
+        assert len(set(ids)) == 1
+
+    def test_two_fish_get_distinct_ids(self):
+        tracker = _tracker(min_hits=1)
+        tracks = tracker.update([(0, 0, 50, 50), (300, 300, 350, 350)], [0.9, 0.8], timestamp=0.0)
+        assert len({t.id for t in tracks}) == 2
+
+    def test_predict_propagates_motion(self):
+        """Sabit hizla giden balik icin kutu inference olmayan karede ilerlemeli"""
+        tracker = _tracker()
+        for i in range(6):
+            x = 100 + 20 * i  # 200 piksel/saniye
+            tracker.update([(x, 100, x + 50, 150)], [0.9], timestamp=0.1 * i)
+        boxes, confs, ids = tracker.predict(timestamp=0.7)
+        assert len(boxes) == 1
+        # Son olcum x=200'de; 0.2 sn sonra yaklasik 240
+        assert 225 <= boxes[0][0] <= 255
+
+    def test_confidence_decays_between_inferences(self):
+        tracker = _tracker()
+        tracker.update([(100, 100, 150, 150)], [0.8], timestamp=0.0)
+        tracker.update([(100, 100, 150, 150)], [0.8], timestamp=0.1)
+        _, confs, _ = tracker.predict(timestamp=1.1)
+        assert confs[0] == pytest.approx(0.4)
+
+    def test_stale_tracks_removed(self):
+        tracker = _tracker(min_hits=1)
+        tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.0)
+        tracker.update([], [], timestamp=2.0)
+        assert tracker.predict(timestamp=2.0) == ([], [], [])
+
+    def test_needs_inference(self):
+        tracker = _tracker()
+        assert not tracker.needs_inference(timestamp=0.0)  # iz yok
+        tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.0)
+        assert tracker.needs_inference(timestamp=0.05)  # dogrulanmamis iz
+        tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.1)
+        assert not tracker.needs_inference(timestamp=0.2)
+        assert tracker.needs_inference(timestamp=0.7)  # yeniden inference zamani
+
+    def test_logged_flag_persists_per_track(self):
+        """Her iz bir kez loglanmali"""
+        tracker = _tracker(min_hits=1)
+        tracks = tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.0)
+        tracks[0].logged = True
+        tracks = tracker.update([(101, 100, 151, 150)], [0.9], timestamp=0.1)
+        assert tracks[0].logged
+
+    def test_stats(self):
+        tracker = _tracker()
+        tracker.update([(100, 100, 150, 150)], [0.9], timestamp=0.0)
+        assert tracker.stats() == {'active': 0, 'tentative': 1, 'total': 1}
+
+
+class TestDrawTrackIds:
+    def test_draw_boxes_with_ids(self):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        result = draw_boxes(frame, [(10, 30, 100, 100)], [0.9], ids=[7])
+        assert result.shape == frame.shape
+        assert not np.shares_memory(result, frame)
@@ -0,0 +1,159 @@
+"""
+Webhook dagitici testleri — keep-alive baglanti havuzu, devre kesici, kalici yeniden
+deneme kuyrugu (geri cekilme / sure asimi) ve baglanti yokken thread acmadan kuyruklama.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from app.export.webhook import CircuitBreaker, ConnectionPool, RetryQueue, WebhookNotifier
+
+
+class FakeClock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def http_server():
+    """HTTP/1.1 keep-alive destekli yerel sunucu; gelen istekleri ve baglantilari sayar"""
+    seen = {'requests': [], 'connections': set(), 'status': 200}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            seen['requests'].append(body)
+            seen['connections'].add(self.client_address)
+            self.send_response(seen['status'])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seen['url'] = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    yield seen
+    server.shutdown()
+    server.server_close()
+
+
+def _notifier(url=None, **kwargs):
+    n = WebhookNotifier(rate_limit_seconds=0, **kwargs)
+    if url:
+        n._targets['custom'] = url  # add_target loopback'i (SSRF) reddeder
+    return n
+
+
+class TestConnectionPool:
+    def test_reuses_keep_alive_connection(self, http_server):
+        pool = ConnectionPool(timeout=2.0)
+        for i in range(3):
+            assert pool.post(http_server['url'], b'{}', {'Content-Type': 'application/json'}) == 200
+        assert pool.created == 1 and pool.reused == 2
+        assert len(http_server['connections']) == 1
+        pool.close()
+
+    def test_notify_uses_pool(self, http_server):
+        n = _notifier(http_server['url'])
+        assert n.notify(species="test", confidence=0.9) == {'custom': True}
+        assert n.notify(species="test", confidence=0.8) == {'custom': True}
+        stats = n.get_stats()
+        assert stats['sent'] == 2 and stats['connections'] == {'created': 1, 'reused': 1}
+        assert b'pufferfish_detection' in http_server['requests'][0]
+
+
+class TestCircuitBreaker:
+    def test_open_half_open_close(self):
+        clock = FakeClock(1000.0)
+        b = CircuitBreaker(threshold=2, reset_timeout=30, clock=clock)
+        b.record(False)
+        assert b.state == 'closed' and b.allow()
+        b.record(False)
+        assert b.state == 'open' and not b.allow() and b.retry_in() == 30
+        clock.t += 31
+        assert b.state == 'half-open'
+        assert b.allow() and not b.allow()  # tek deneme
+        b.record(False)
+        assert b.state == 'open' and b.trips == 1
+        clock.t += 31
+        assert b.allow()
+        b.record(True)
+        assert b.state == 'closed' and b.allow()
+
+
+class TestRetryQueue:
+    def test_backoff_lease_and_expiry(self, tmp_path):
+        clock = FakeClock(1000.0)
+        q = RetryQueue(tmp_path / "retry.sqlite", base_delay=10, max_delay=40, max_attempts=4, clock=clock)
+        q.push("slack", '{"a": 1}', delay=0)
+        rows = q.claim()
+        assert [r['target'] for r in rows] == ["slack"]
+        assert q.claim() == []  # lease suresince tekrar verilmez
+
+        row = rows[0]
+        for attempts, limit in ((1, 12), (2, 24), (3, 48)):
+            assert q.failed(row)
+            clock.t += limit
+            row = q.claim()[0]
+            assert row['attempts'] == attempts
+        assert not q.failed(row)  # max_attempts
+        assert len(q) == 0 and q.expired == 1
+
+    def test_persists_across_restart_and_caps_rows(self, tmp_path):
+        path = tmp_path / "retry.sqlite"
+        q = RetryQueue(path, max_rows=3)
+        for i in range(5):
+            q.push("t", str(i), delay=0)
+        assert q.dropped == 2
+        q.close()
+        q = RetryQueue(path)
+        assert [r['payload'] for r in q.claim()] == ["2", "3", "4"]
+
+
+class TestDispatcher:
+    def test_failures_queue_then_deliver_later(self, http_server):
+        n = _notifier(http_server['url'])
+        with patch.object(n._pool, 'post', side_effect=OSError("Network is unreachable")):
+            assert n.notify(species="test", confidence=0.9) == {'custom': False}
+        assert len(n.retry) == 1 and n.get_stats()['failed'] == 1
+
+        n.retry.clock = lambda: time.time() + 3600  # geri cekilme suresi doldu
+        assert n._drain_retries() == 1
+        assert len(n.retry) == 0 and n.get_stats()['retried'] == 1
+        assert len(http_server['requests']) == 1
+
+    def test_open_breaker_defers_without_network(self, http_server):
+        n = _notifier(http_server['url'])
+        with patch.object(n._pool, 'post', side_effect=OSError("down")) as post:
+            for _ in range(10):
+                n.notify(species="test", confidence=0.9)
+        assert post.call_count == 5  # WEBHOOK_BREAKER_THRESHOLD
+        stats = n.get_stats()
+        assert stats['breakers'] == {'custom': 'open'} and stats['deferred'] == 5
+        assert stats['retry_pending'] == 10
+
+    def test_async_uses_fixed_workers(self, http_server):
+        n = _notifier(http_server['url'], workers=2)
+        for _ in range(20):
+            n.notify_async(species="test", confidence=0.9)
+        assert n.flush(timeout=5.0)
+        assert len([t for t in threading.enumerate() if t.name.startswith('webhook-')]) == 2
+        assert len(http_server['requests']) == 20 and n.get_stats()['sent'] == 20
+        n.stop()
+
+    def test_full_queue_spools_to_retry(self):
+        n = _notifier("https://example.com/hook", queue_size=1)
+        n._targets['second'] = "https://example.org/hook"
+        n._running = True  # worker'lar calisiyormus gibi; kuyruk bosalmaz
+        n.notify_async(species="test", confidence=0.9)
+        assert n._jobs.qsize() == 1 and n.get_stats()['spooled'] == 1 and len(n.retry) == 1
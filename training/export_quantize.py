@@ -1,4 +1,5 @@
 # ONNX export ve INT8 quantization
+import argparse
 import glob
 import numpy as np
 from PIL import Image
@@ -9,6 +10,8 @@ from onnxruntime.quantization import quantize_static, CalibrationDataReader, Qua
 MODEL_PT = Path(__file__).parent.parent / "models" / "yolo11m_pufferfish.pt"
 MODEL_ONNX = MODEL_PT.with_suffix('.onnx')
 MODEL_INT8 = Path(__file__).parent.parent / "models" / "pufferfish_pi_int8.onnx"
+# Dinamik batch boyutlu model (dashboard batch inference modu icin)
+MODEL_INT8_DYNAMIC = Path(__file__).parent.parent / "models" / "pufferfish_pi_int8_dynamic.onnx"
 CALIB_DIR = Path(__file__).parent.parent / "dataset" / "valid" / "images"
 
 
@@ -32,7 +35,10 @@ class CalibReader(CalibrationDataReader):
         return {"images": data}
 
 
-def export():
+def export(dynamic_batch=False):
+    """ONNX export + INT8 quantization. dynamic_batch=True ise batch boyutu sabitlenmez"""
+    output = MODEL_INT8_DYNAMIC if dynamic_batch else MODEL_INT8
+
     if not MODEL_PT.exists():
         print(f"Model yok: {MODEL_PT}")
         return
@@ -40,7 +46,7 @@ def export():
     # ONNX export
     print("ONNX'e cevriliyor...")
     model = YOLO(MODEL_PT)
-    model.export(format='onnx', opset=12, simplify=True)
+    model.export(format='onnx', opset=12, simplify=True, dynamic=dynamic_batch)
     
     if not MODEL_ONNX.exists():
         print("Export basarisiz")
@@ -52,15 +58,19 @@ def export():
     
     quantize_static(
         model_input=str(MODEL_ONNX),
-        model_output=str(MODEL_INT8),
+        model_output=str(output),
         calibration_data_reader=reader,
         quant_format=QuantFormat.QDQ,
         weight_type=QuantType.QInt8,
         activation_type=QuantType.QUInt8
     )
     
-    print(f"Tamamlandi: {MODEL_INT8}")
+    print(f"Tamamlandi: {output}")
 
 
 if __name__ == "__main__":
-    export()
+    parser = argparse.ArgumentParser(description="ONNX export + INT8 quantization")
+    parser.add_argument('--dynamic-batch', action='store_true',
+                        help='Dinamik batch boyutuyla export et (batch inference modu icin)')
+    args = parser.parse_args()
+    export(dynamic_batch=args.dynamic_batch)